@@ -0,0 +1,25 @@
+"""
+--+--bench
+  +--合成考试 & 端到端基准测试
+===================================================================
+* `spec.py`：合成参数 `SynthSpec`（不依赖 core）。
+* `synth.py`：生成合成扫描件（页数、分辨率、学生数可调）、`default.json`（大题 / 小题数可调）
+  与带批注曲线的 `result.json`（每小题平均曲线数可调）。
+* `run.py`：在临时工作区（QUICKGRADE_DATA）中逐阶段计时，结果写成 JSON 供跨版本比较：
+  stitch、切片读取（同 Teacher._crop）、批改窗口每次鼠标事件的渲染、export_excel、save_all_marked_images，
+  以及各子命令的启动开销（`startup.py`，按预算检查）。
+* 全程无窗口，普通 Linux 服务器即可运行：
+
+      cd src && python -m bench --students 200 --out bench.json
+      cd src && python -m bench --students 200 --baseline old.json
+
+依赖：OpenCV‑Python、NumPy；export 阶段另需 pandas + openpyxl（缺失时该阶段记为错误，其余照常）。
+===================================================================
+"""
+import sys
+from pathlib import Path
+
+# core 内模块按 `from path import ...` 互相引用，与 main.py 一样把 core 加入搜索路径
+CORE_DIR = Path(__file__).resolve().parent.parent / "core"
+if str(CORE_DIR) not in sys.path:
+    sys.path.insert(0, str(CORE_DIR))
@@ -0,0 +1,270 @@
+"""
+--+--bench.run
+  +--端到端基准测试
+===================================================================
+* 先设置 QUICKGRADE_DATA 指向临时工作区，再导入 core 各模块（path.py 在导入时确定数据根目录）。
+* 阶段：
+    generate —— 合成数据（不属于被测代码，单列便于扣除）
+    stitch   —— stitched.stitch（force=True），附各子步骤 CPU 时间
+    crop     —— CropCache.get + prefetch，遍历顺序与 Teacher（题 → 小题 → 学生）一致，统计单次取图延迟
+    render   —— StrokeCanvas 在每次鼠标事件上的开销（换图 / 落笔 / 拖动 / 抬笔 / 缩放），即 _render_with_marks 的各路径
+    export   —— output.export_excel
+    mark     —— output.save_all_marked_images
+    startup  —— 各子命令的启动 + 导入开销（startup.py），超出 STARTUP_BUDGET 记入 errors
+* 各阶段输出（原本打印到终端的进度）被吞掉，只在 stderr 打印一行摘要；某阶段报错记入 "errors"，其余阶段照常。
+* 结果 JSON：spec / env / stages / errors；`--baseline` 给出与旧结果的逐阶段耗时比。
+===================================================================
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+from dataclasses import asdict, fields
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from bench.spec import SynthSpec
+
+SCHEMA = 1
+STAGES = ("stitch", "crop", "render", "export", "mark", "startup")
+RENDER_ITEMS = 20           # render 阶段模拟批改的切片数
+RENDER_STROKES = 3          # 每个切片上新画的曲线数
+ZOOM_STEPS = (1.1, 1.21, 1 / 1.1, 1.0)
+
+
+def latency(samples: List[float]) -> Dict[str, float]:
+    """秒 → 毫秒分位数"""
+    if not samples:
+        return {"n": 0}
+    ms = np.asarray(samples) * 1000
+    p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+    return {"n": len(ms), "mean_ms": float(ms.mean()), "p50_ms": float(p50), "p95_ms": float(p95),
+            "p99_ms": float(p99), "max_ms": float(ms.max())}
+
+
+def _timed(fn: Callable[[], Any], verbose: bool):
+    sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    t0 = time.perf_counter()
+    with sink:
+        res = fn()
+    return res, time.perf_counter() - t0
+
+# -------------------------------------------------- 各阶段 --------------------------------------------------
+
+def _bench_stitch(workers: Optional[int], verbose: bool) -> Dict[str, Any]:
+    from stitched import stitch
+
+    stats, secs = _timed(lambda: stitch(workers=workers, force=True), verbose)
+    return {"seconds": secs, "items": stats.students, "per_sec": stats.students / secs if secs else 0.0,
+            "cpu_seconds": {k: round(v, 4) for k, v in stats.stages.items()}}
+
+
+def _bench_crop(questions, verbose: bool) -> Dict[str, Any]:
+    from crop import CropCache, item_regions
+    from index import student_index
+    from process import Teacher
+
+    index = student_index()
+    total = len(index)
+    cache = CropCache(questions, index.read, total, budget_mb=Teacher.CACHE_MB, prefetch=Teacher.PREFETCH)
+    samples: List[float] = []
+    t0 = time.perf_counter()
+    try:
+        for q_idx, sub_idx in item_regions(questions):
+            for stu in range(total):
+                t = time.perf_counter()
+                cache.get(stu, q_idx, sub_idx)
+                cache.prefetch(stu, q_idx, sub_idx)
+                samples.append(time.perf_counter() - t)
+    finally:
+        cache.close()
+    secs = time.perf_counter() - t0
+    return {"seconds": secs, "items": len(samples), "per_sec": len(samples) / secs if secs else 0.0,
+            "latency": latency(samples)}
+
+
+def _bench_render(questions, seed: int) -> Dict[str, Any]:
+    from crop import CropCache, item_regions
+    from index import student_index
+    from render import StrokeCanvas
+    from strokes import simplify
+
+    index = student_index()
+    rng = np.random.default_rng(seed)
+    item = next(iter(item_regions(questions)))
+    cache = CropCache(questions, index.read, len(index), prefetch=0)
+    canvas = StrokeCanvas()
+    events: Dict[str, List[float]] = {"show": [], "down": [], "move": [], "up": [], "zoom": []}
+
+    def tick(kind: str, fn: Callable[[], Any]):
+        t = time.perf_counter()
+        fn()
+        events[kind].append(time.perf_counter() - t)
+
+    try:
+        for stu in range(min(RENDER_ITEMS, len(index))):
+            img, _ = cache.get(stu, *item)
+            strokes: List[np.ndarray] = []
+            canvas.set_zoom(1.0)
+            tick("show", lambda: (canvas.set_image(img), canvas.committed(strokes)))
+            h, w = img.shape[:2]
+            for _ in range(RENDER_STROKES):
+                pts = np.clip(rng.uniform((0, 0), (w, h)) + np.cumsum(rng.normal(0, 4, (60, 2)), axis=0),
+                              0, (w - 1, h - 1)).astype(int)
+                tick("down", lambda: canvas.begin_stroke(strokes))
+                for p0, p1 in zip(pts[:-1], pts[1:]):
+                    tick("move", lambda: canvas.extend_stroke(tuple(p0), tuple(p1)))
+                stroke = simplify([tuple(p) for p in pts], 1.0)
+                strokes.append(stroke)
+                tick("up", lambda: canvas.commit_stroke(stroke, strokes))
+            for z in ZOOM_STEPS:
+                tick("zoom", lambda: (canvas.set_zoom(z), canvas.committed(strokes)))
+    finally:
+        cache.close()
+    all_events = [t for v in events.values() for t in v]
+    return {"seconds": float(sum(all_events)), "items": len(all_events),
+            "events": {k: latency(v) for k, v in events.items()}}
+
+
+def _bench_export(verbose: bool) -> Dict[str, Any]:
+    from output import export_excel
+
+    _, secs = _timed(export_excel, verbose)
+    return {"seconds": secs}
+
+
+def _bench_mark(workers: Optional[int], students: int, verbose: bool) -> Dict[str, Any]:
+    from output import ExportOptions, save_all_marked_images
+
+    _, secs = _timed(lambda: save_all_marked_images(ExportOptions(workers=workers)), verbose)
+    return {"seconds": secs, "items": students, "per_sec": students / secs if secs else 0.0}
+
+def _bench_startup() -> Dict[str, Any]:
+    from bench.startup import measure_all
+
+    t0 = time.perf_counter()
+    res = measure_all()
+    bad = {cmd: r["violations"] for cmd, r in res.items() if r.get("violations")}
+    if bad:
+        raise RuntimeError("超出启动预算：" + "；".join(f"{c} {'，'.join(v)}" for c, v in bad.items()))
+    return {"seconds": time.perf_counter() - t0, "commands": res}
+
+# -------------------------------------------------- 主流程 --------------------------------------------------
+
+def run(spec: SynthSpec, root: str | Path, workers: Optional[int] = None, stages: Optional[List[str]] = None,
+        verbose: bool = False) -> Dict[str, Any]:
+    """在 root 工作区内生成数据并逐阶段计时。须在导入任何 core 模块之前把 QUICKGRADE_DATA 设为 root。"""
+    import cv2
+    from path import DATA_PATH
+    from bench.synth import generate, layout
+
+    if Path(DATA_PATH).resolve() != Path(root).resolve():
+        raise RuntimeError(f"core 的数据根目录为 {DATA_PATH}，不是基准工作区 {root}；请先设置 QUICKGRADE_DATA 再导入 core")
+
+    stages = stages or list(STAGES)
+    result: Dict[str, Any] = {
+        "schema": SCHEMA,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "spec": asdict(spec),
+        "env": {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+                "workers": workers or os.cpu_count(), "opencv": cv2.__version__, "numpy": np.__version__},
+        "stages": {},
+        "errors": {},
+    }
+    info, secs = _timed(lambda: generate(spec, root, workers=workers), verbose)
+    result["stages"]["generate"] = {"seconds": secs, **info}
+    _log("generate", result["stages"]["generate"])
+
+    questions = layout(spec)
+    runners: Dict[str, Callable[[], Dict[str, Any]]] = {
+        "stitch": lambda: _bench_stitch(workers, verbose),
+        "crop": lambda: _bench_crop(questions, verbose),
+        "render": lambda: _bench_render(questions, spec.seed),
+        "export": lambda: _bench_export(verbose),
+        "mark": lambda: _bench_mark(workers, spec.students, verbose),
+        "startup": _bench_startup,
+    }
+    for name in stages:
+        try:
+            result["stages"][name] = runners[name]()
+            _log(name, result["stages"][name])
+        except Exception as e:                       # 某阶段失败（如缺 pandas）不影响其余阶段
+            result["errors"][name] = f"{type(e).__name__}: {e}"
+            print(f"⚠ {name} 失败：{e}", file=sys.stderr)
+            if verbose:
+                traceback.print_exc()
+    return result
+
+
+def _log(name: str, st: Dict[str, Any]):
+    extra = ""
+    if "latency" in st:
+        extra = f"，p50 {st['latency']['p50_ms']:.2f}ms / p95 {st['latency']['p95_ms']:.2f}ms"
+    elif "events" in st:
+        extra = "，" + " ".join(f"{k} p95 {v['p95_ms']:.2f}ms" for k, v in st["events"].items() if v.get("n"))
+    rate = f"（{st['per_sec']:.1f}/s）" if "per_sec" in st else ""
+    print(f"✔ {name:<8} {st['seconds']:.2f}s{rate}{extra}", file=sys.stderr)
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, float]:
+    """各阶段耗时比 新 / 旧（>1 为变慢）"""
+    ratios = {}
+    for name, st in new.get("stages", {}).items():
+        prev = old.get("stages", {}).get(name)
+        if prev and prev.get("seconds"):
+            ratios[name] = st["seconds"] / prev["seconds"]
+    return ratios
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(prog="python -m bench", description="QuickGrade 合成考试端到端基准")
+    from_spec = {f.name: f.default for f in fields(SynthSpec)}
+    for name, default in from_spec.items():
+        ap.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+    ap.add_argument("--workers", type=int, default=None, help="并行进程数（默认 CPU 核数）")
+    ap.add_argument("--stages", default=",".join(STAGES), help=f"逗号分隔，可选 {','.join(STAGES)}")
+    ap.add_argument("--root", default=None, help="工作区目录（默认临时目录，结束后删除）")
+    ap.add_argument("--keep", action="store_true", help="保留临时工作区")
+    ap.add_argument("--out", default=None, help="结果 JSON 路径（默认打印到 stdout）")
+    ap.add_argument("--baseline", default=None, help="旧结果 JSON，输出逐阶段耗时比")
+    ap.add_argument("--verbose", action="store_true", help="显示各阶段原有输出")
+    ns = ap.parse_args(argv)
+
+    stages = [s for s in ns.stages.split(",") if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        ap.error(f"未知阶段：{sorted(unknown)}")
+
+    root = Path(ns.root) if ns.root else Path(tempfile.mkdtemp(prefix="quickgrade-bench-"))
+    root.mkdir(parents=True, exist_ok=True)
+    os.environ["QUICKGRADE_DATA"] = str(root.resolve())
+    try:
+        spec = SynthSpec(**{k: getattr(ns, k) for k in from_spec})
+        result = run(spec, root, workers=ns.workers, stages=stages, verbose=ns.verbose)
+    finally:
+        if not ns.root and not ns.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    if ns.baseline:
+        with open(ns.baseline, "r", encoding="utf-8") as f:
+            result["baseline"] = {"path": ns.baseline, "ratio": compare(json.load(f), result)}
+        for name, r in result["baseline"]["ratio"].items():
+            print(f"  {name:<8} ×{r:.2f}{'  ⚠ 变慢' if r > 1.1 else ''}", file=sys.stderr)
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if ns.out:
+        Path(ns.out).write_text(text, encoding="utf-8")
+        print(f"✅ 基准结果 → {ns.out}", file=sys.stderr)
+    else:
+        print(text)
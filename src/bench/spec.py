@@ -0,0 +1,22 @@
+"""
+--+--bench.spec
+  +--合成考试参数（不依赖 core，可在设置 QUICKGRADE_DATA 之前导入）
+===================================================================
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass
+class SynthSpec:
+    students: int = 100
+    pages: int = 2
+    width: int = 1240           # 单页宽（A4 150dpi）
+    height: int = 1754          # 单页高
+    questions: int = 8
+    subs: int = 3               # 每道大题的小题数（0 表示不分小题）
+    strokes: float = 1.5        # 每名学生每小题的平均批注曲线数
+    stroke_points: int = 24     # 每条曲线的点数
+    max_score: int = 10
+    seed: int = 0
@@ -0,0 +1,114 @@
+"""
+--+--bench.startup
+  +--子命令启动开销预算
+===================================================================
+* 在空工作区里逐个执行 `python -X importtime main.py <子命令>`：各子命令导入所需模块后，
+  因缺少输入数据立即报错退出，测得的就是“启动 + 导入”的代价，不含实际工作。
+* 每个子命令记录：进程总耗时、导入总耗时、导入模块数，并按 STARTUP_BUDGET 检查：
+    - ms     —— 导入耗时上限（毫秒，宽松值，跨机器比较请看 --baseline 的耗时比）
+    - forbid —— 不允许被导入的模块（如 stitch 不得加载 pandas，export 不得加载批改界面）
+* 单独运行：`cd src && python -m bench.startup`，有超出预算时退出码为 1。
+===================================================================
+"""
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+MAIN = Path(__file__).resolve().parent.parent / "main.py"
+
+GUI = ("process", "render", "grid")          # 批改 / 网格界面
+HEAVY = ("cv2", "numpy", "pandas")
+
+
+@dataclass
+class Budget:
+    ms: float
+    forbid: Tuple[str, ...] = ()
+
+
+STARTUP_BUDGET: Dict[str, Budget] = {
+    "stitch": Budget(600, ("pandas",) + GUI),
+    "align": Budget(600, ("pandas",) + GUI),
+    "slice": Budget(600, ("pandas",) + GUI),
+    "omr": Budget(600, ("pandas",) + GUI),
+    "export": Budget(1200, GUI),
+    "mark": Budget(600, ("pandas",) + GUI),
+    "pdf": Budget(600, ("pandas",) + GUI),
+    "compact": Budget(300, ("cv2", "pandas") + GUI),
+    "merge": Budget(300, ("cv2", "pandas") + GUI),
+    "stats": Budget(300, ("cv2", "pandas") + GUI),
+    "batch": Budget(150, HEAVY + GUI),
+}
+
+
+def _parse_importtime(stderr: str) -> Tuple[float, List[str]]:
+    """-X importtime 输出 → (顶层导入累计毫秒, 模块名列表)
+
+    行格式 `import time:  self | cumulative | name`，name 前每多两个空格深一层；顶层导入的累计之和即导入总耗时。
+    """
+    total_us, modules = 0, []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue                                    # 表头
+        name = fields[2]
+        modules.append(name.strip())
+        if not name.startswith("  "):
+            total_us += int(fields[1])
+    return total_us / 1000, modules
+
+
+def measure(command: str, workspace: Path) -> Dict[str, Any]:
+    env = {**os.environ, "QUICKGRADE_DATA": str(workspace)}
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", str(MAIN), command, "--root", str(workspace)],
+                          env=env, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    wall = (time.perf_counter() - t0) * 1000
+    import_ms, modules = _parse_importtime(proc.stderr)
+    loaded = set(modules)
+
+    budget = STARTUP_BUDGET.get(command, Budget(float("inf")))
+    violations = [f"导入了 {m}" for m in budget.forbid if m in loaded or f"core.{m}" in loaded]
+    if import_ms > budget.ms:
+        violations.append(f"导入 {import_ms:.0f}ms > 预算 {budget.ms:.0f}ms")
+    return {"wall_ms": round(wall, 1), "import_ms": round(import_ms, 1), "modules": len(loaded),
+            "heavy": [m for m in HEAVY if m in loaded], "budget_ms": budget.ms, "violations": violations}
+
+
+def measure_all(commands: Iterable[str] = STARTUP_BUDGET) -> Dict[str, Dict[str, Any]]:
+    with tempfile.TemporaryDirectory(prefix="quickgrade-startup-") as tmp:
+        subprocess.run([sys.executable, "-c", "pass"], capture_output=True)        # 预热文件缓存
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], capture_output=True)
+        res: Dict[str, Dict[str, Any]] = {"python": {"wall_ms": round((time.perf_counter() - t0) * 1000, 1)}}
+        for cmd in commands:
+            res[cmd] = measure(cmd, Path(tmp))
+    return res
+
+
+def report(res: Dict[str, Dict[str, Any]]) -> bool:
+    """打印表格，返回是否全部在预算内"""
+    ok = True
+    print(f"{'子命令':<10}{'进程':>10}{'导入':>10}{'模块数':>8}  重量级依赖", file=sys.stderr)
+    for cmd, r in res.items():
+        if cmd == "python":
+            print(f"{'(python)':<10}{r['wall_ms']:>8.0f}ms", file=sys.stderr)
+            continue
+        flag = "✔" if not r["violations"] else "⚠ " + "；".join(r["violations"])
+        ok &= not r["violations"]
+        print(f"{cmd:<10}{r['wall_ms']:>8.0f}ms{r['import_ms']:>8.0f}ms{r['modules']:>8}  "
+              f"{','.join(r['heavy']) or '-':<18}{flag}", file=sys.stderr)
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if report(measure_all()) else 1)
@@ -0,0 +1,110 @@
+"""
+--+--bench.synth
+  +--合成考试生成
+===================================================================
+* 版面：stitch 后的整卷高 = 页高 × 页数；大题沿纵向等分为横带，小题在横带内横向等分。
+* 每页为白底 + 题框 + 随机“手写”折线 + 轻微噪声，JPEG 编码，体积与真实扫描件同量级。
+* `result.json` 按 journal.write_result 的格式写出：随机分数 + 每小题平均 `strokes` 条批注曲线（整卷坐标）。
+* 同一 seed 生成的数据逐字节一致，便于跨版本对比。
+===================================================================
+"""
+from __future__ import annotations
+
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from input import Question, Region, StudentProcessing
+from journal import JournalState, write_result
+from pool import ordered_map
+
+from bench.spec import SynthSpec
+
+MARGIN = 40                 # 题框与版面边缘 / 彼此之间的留白（像素）
+INK = (40, 40, 40)
+JPEG_QUALITY = 90
+
+
+def layout(spec: SynthSpec) -> List[Question]:
+    """整卷坐标下的大题 / 小题区域"""
+    band = (spec.height * spec.pages - MARGIN) // spec.questions
+    inner_w = spec.width - 2 * MARGIN
+    questions = []
+    for qi in range(spec.questions):
+        y, h = MARGIN + qi * band, band - MARGIN
+        q = Question(qi + 1, [Region(MARGIN, y, inner_w, h)])
+        if spec.subs:
+            col = (inner_w + MARGIN) // spec.subs
+            for si in range(spec.subs):
+                q.add_sub(Region(MARGIN + si * col, y, col - MARGIN, h))
+        questions.append(q)
+    return questions
+
+
+def _regions(questions: List[Question]) -> List[Region]:
+    """与批改遍历一致的批改单元区域"""
+    return [sub.segments[0] for q in questions for sub in q.subs] or [q.segments[0] for q in questions]
+
+
+def _scribble(rng: np.random.Generator, r: Region, n: int) -> np.ndarray:
+    """区域内的随机游走折线，(n,2) int32"""
+    start = rng.uniform((r.x, r.y), (r.x + r.w, r.y + r.h))
+    steps = rng.normal(0, min(r.w, r.h) / 12, size=(n, 2))
+    pts = np.clip(start + np.cumsum(steps, axis=0), (r.x, r.y), (r.x + r.w - 1, r.y + r.h - 1))
+    return pts.astype(np.int32)
+
+
+def _write_student(stu: int, spec: SynthSpec, regions: List[Tuple[int, int, int, int]], students_dir: str):
+    """一名学生的各页扫描件（在子进程中运行）"""
+    rng = np.random.default_rng((spec.seed, stu))
+    full = np.full((spec.height * spec.pages, spec.width, 3), 255, np.uint8)
+    for x, y, w, h in regions:
+        r = Region(x, y, w, h)
+        cv2.rectangle(full, (x, y), (x + w, y + h), INK, 1)
+        for _ in range(int(rng.integers(2, 6))):
+            cv2.polylines(full, [_scribble(rng, r, 40).reshape(-1, 1, 2)], False, INK, 2, cv2.LINE_AA)
+    noise = rng.integers(0, 12, size=full.shape[:2], dtype=np.uint8)
+    full = cv2.subtract(full, cv2.merge([noise] * 3))
+
+    for p in range(spec.pages):
+        page = full[p * spec.height:(p + 1) * spec.height]
+        ok, buf = cv2.imencode(".jpg", page, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        buf.tofile(str(Path(students_dir, f"p{p + 1}", f"{stu + 1}.jpg")))
+    return stu
+
+
+def generate(spec: SynthSpec, root: str | Path, workers: int | None = None) -> Dict[str, int]:
+    """在 root（一个工作区）下写出 students/、configs/default.json、configs/result.json"""
+    root = Path(root)
+    students_dir = root / "students"
+    for p in range(spec.pages):
+        (students_dir / f"p{p + 1}").mkdir(parents=True, exist_ok=True)
+
+    questions = layout(spec)
+    StudentProcessing(questions, target_dir=str(root / "configs"), config_name="default.json").save()
+
+    regions = [r.to_tuple() for r in _regions(questions)]
+    for _ in ordered_map(partial(_write_student, spec=spec, regions=regions, students_dir=str(students_dir)),
+                         range(spec.students), workers=workers):
+        pass
+
+    # ---- 分数 & 批注 ----
+    rng = np.random.default_rng(spec.seed)
+    max_sub = max(spec.subs, 1)
+    scores = rng.integers(0, spec.max_score + 1, size=(spec.students, spec.questions, max_sub))
+    marks: Dict[Tuple[int, int, int], List[np.ndarray]] = {}
+    n_strokes = 0
+    for stu in range(spec.students):
+        for qi, q in enumerate(questions):
+            for si in range(max_sub):
+                k = int(rng.poisson(spec.strokes))
+                if k:
+                    r = q.subs[si].segments[0] if q.subs else q.segments[0]
+                    marks[(stu, qi, si)] = [_scribble(rng, r, spec.stroke_points).astype(np.int32) for _ in range(k)]
+                    n_strokes += k
+    write_result(JournalState(spec.students, spec.questions, max_sub, scores, marks), root / "configs" / "result.json")
+
+    return {"pages": spec.students * spec.pages, "strokes": n_strokes}
@@ -1,19 +1,49 @@
-﻿from .input     import Redistricting,StudentProcessing
-from .process   import Teacher
-from .output    import show_result
-from .path      import WORK_PATH,SRC_PATH,CORE_PATH,DATA_PATH,CONFIGS_PATH,RESULTS_PATH,STUDENTS_PATH,STITCHED_PATH
+﻿"""
+--+--core
+  +--包入口（懒加载）
+===================================================================
+* 导入 core 不加载任何子模块：下列名字在首次访问时才导入对应模块（PEP 562 `__getattr__`），
+  `from core import Teacher` 只付 process 及其依赖的启动时间，导出 / 拼接等子命令互不牵连。
+* 子模块之间以 `from path import ...` 互相引用，故把 core 目录加入 sys.path（不创建目录、不打开窗口）。
+===================================================================
+"""
+import importlib
+import os
+import sys
 
-__all__ = [
-    'Redistricting',
-    'StudentProcessing',
-    'Teacher',
-    'show_result',
-    'WORK_PATH',
-    'SRC_PATH',
-    'CORE_PATH',
-    'DATA_PATH',
-    'CONFIGS_PATH',
-    'RESULTS_PATH',
-    'STUDENTS_PATH',
-    'STITCHED_PATH'
-]
\ No newline at end of file
+_CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+if _CORE_DIR not in sys.path:
+    sys.path.insert(0, _CORE_DIR)
+
+# 名字 -> 所在子模块
+_LAZY = {
+    'Redistricting': 'input',
+    'StudentProcessing': 'input',
+    'Teacher': 'process',
+    'export_excel': 'output',
+    'save_all_marked_images': 'output',
+    'export_pdf': 'output',
+    'WORK_PATH': 'path',
+    'SRC_PATH': 'path',
+    'CORE_PATH': 'path',
+    'DATA_PATH': 'path',
+    'CONFIGS_PATH': 'path',
+    'RESULTS_PATH': 'path',
+    'STUDENTS_PATH': 'path',
+    'STITCHED_PATH': 'path',
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,199 @@
+"""
+--+--align
+  +--整卷对齐 / 纠偏（stitch → align → slice / teacher）
+===================================================================
+* 以 Redistricting 划区所用的模板整卷为基准，对每张 stitched 整卷做 ORB 特征匹配，
+  RANSAC 估计 模板坐标 → 卷面坐标 的变换（默认仿射，可选单应 homography）。
+* 每张卷面只算一次，结果（3×3 矩阵）缓存到 `data/configs/align.json`；卷面大小 / mtime 未变时重跑直接跳过。
+* 不改写整卷图片：切片时（crop.cut_regions / sliced.slice_all）才按变换只对区域做 warp。
+* 进程池并行，每个进程只在初始化时提取一次模板特征。
+
+依赖：OpenCV‑Python、NumPy。
+===================================================================
+"""
+from __future__ import annotations
+
+import json
+import os
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from path import CONFIGS_PATH, STITCHED_PATH
+from input import Redistricting, Region
+from pool import Progress, ordered_map, in_worker
+from index import student_index
+
+ALIGN_JSON = Path(CONFIGS_PATH, "align.json")
+MODELS = ("affine", "homography")
+
+MAX_SIDE = 1200         # 特征检测前把长边缩到该像素
+N_FEATURES = 3000       # ORB 特征点上限
+RATIO = 0.75            # Lowe 比值检验
+RANSAC_PX = 5.0         # RANSAC 重投影阈值（原图像素）
+MIN_INLIERS = 25        # 内点少于此数视为对齐失败，按原坐标切片
+
+_WHITE = (255, 255, 255)
+
+# (文件名主干, 路径)
+AlignJob = Tuple[str, str]
+
+# -------------------------------------------------- 变换应用 --------------------------------------------------
+
+def warp_region(page: np.ndarray, M: np.ndarray, r: Region) -> np.ndarray:
+    """按 模板 → 卷面 变换 M 取出模板坐标系下的区域 r，只计算区域内像素"""
+    T = np.array([[1, 0, r.x], [0, 1, r.y], [0, 0, 1]], dtype=np.float64)
+    return cv2.warpPerspective(page, M @ T, (r.w, r.h), flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                               borderMode=cv2.BORDER_CONSTANT, borderValue=_WHITE)
+
+
+def warp_page(page: np.ndarray, M: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """整卷校正到模板坐标系（仅导出批注图时使用）"""
+    return cv2.warpPerspective(page, M, size, flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                               borderMode=cv2.BORDER_CONSTANT, borderValue=_WHITE)
+
+
+class Alignment:
+    """学生下标 → 模板到卷面的 3×3 变换；近似恒等或对齐失败的卷面返回 None"""
+
+    def __init__(self, data: Dict[str, Any], stamp: int):
+        self.stamp = stamp
+        self.template_size: Tuple[int, int] = tuple(data["template_size"])  # type: ignore[assignment]
+        self._pages: Dict[str, np.ndarray] = {}
+        for stem, ent in data["pages"].items():
+            if ent.get("M") is None:
+                continue
+            M = np.array(ent["M"], dtype=np.float64)
+            if not _near_identity(M):
+                self._pages[stem] = M
+
+    def __call__(self, stu: int) -> Optional[np.ndarray]:
+        stem = student_index().stem(stu)
+        return self._pages.get(stem) if stem is not None else None
+
+
+def _near_identity(M: np.ndarray) -> bool:
+    return np.allclose(M[:2, :2], np.eye(2), atol=1e-4) and np.abs(M[:2, 2]).max() < 0.5 and np.allclose(M[2, :2], 0)
+
+
+def load_alignment(path: str | Path = ALIGN_JSON) -> Optional[Alignment]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return Alignment(json.load(f), path.stat().st_mtime_ns)
+
+# -------------------------------------------------- 特征 & 配准（在子进程中运行） --------------------------------------------------
+
+_TEMPLATE: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+
+def _detect(gray: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """缩小后提取 ORB 特征；返回原图坐标的关键点 (N,2) 与描述子"""
+    s = min(1.0, MAX_SIDE / max(gray.shape))
+    small = cv2.resize(gray, None, fx=s, fy=s, interpolation=cv2.INTER_AREA) if s < 1 else gray
+    kp, des = cv2.ORB_create(N_FEATURES).detectAndCompute(small, None)
+    return np.float32([k.pt for k in kp]).reshape(-1, 2) / s, des
+
+
+def _init_worker(template_path: str):
+    global _TEMPLATE
+    if in_worker():
+        cv2.setNumThreads(1)    # 并行度由进程池提供；串行执行时不限制主进程
+    _TEMPLATE = _detect(cv2.imread(template_path, cv2.IMREAD_GRAYSCALE))
+
+
+def _align_one(job: AlignJob, model: str = "affine") -> Tuple[str, Optional[List[List[float]]], int, Optional[str]]:
+    """返回 (文件名主干, 3×3 变换或 None, 内点数, 错误信息)"""
+    stem, path = job
+    gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return stem, None, 0, f"无法读取：{path}"
+    t_pts, t_des = _TEMPLATE
+    p_pts, p_des = _detect(gray)
+    if t_des is None or p_des is None or len(p_des) < 2:
+        return stem, None, 0, f"特征点不足：{path}"
+
+    pairs = cv2.BFMatcher(cv2.NORM_HAMMING).knnMatch(t_des, p_des, k=2)
+    good = [p[0] for p in pairs if len(p) == 2 and p[0].distance < RATIO * p[1].distance]
+    if len(good) < MIN_INLIERS:
+        return stem, None, len(good), f"匹配点不足（{len(good)}）：{path}"
+    src = t_pts[[m.queryIdx for m in good]]
+    dst = p_pts[[m.trainIdx for m in good]]
+
+    if model == "homography":
+        M, mask = cv2.findHomography(src, dst, cv2.RANSAC, RANSAC_PX)
+    else:
+        A, mask = cv2.estimateAffine2D(src, dst, method=cv2.RANSAC, ransacReprojThreshold=RANSAC_PX)
+        M = None if A is None else np.vstack([A, [0, 0, 1]])
+    inliers = int(mask.sum()) if mask is not None else 0
+    if M is None or inliers < MIN_INLIERS:
+        return stem, None, inliers, f"内点不足（{inliers}）：{path}"
+    return stem, M.tolist(), inliers, None
+
+# -------------------------------------------------- 对外接口 --------------------------------------------------
+
+def _fingerprint(path: str) -> Dict[str, int]:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def align(stitched_dir: str = STITCHED_PATH, out: str | Path = ALIGN_JSON, template: Optional[str] = None,
+          model: str = "affine", workers: Optional[int] = None, force: bool = False) -> Path:
+    """并行计算全部整卷的对齐变换；force=True 时忽略缓存全部重算"""
+    if model not in MODELS:
+        raise ValueError(f"model 只能是 {MODELS}")
+    template = template or Redistricting._auto_find_template()
+    th, tw = cv2.imread(template, cv2.IMREAD_GRAYSCALE).shape[:2]
+
+    index = student_index(stitched_dir)
+    pages = {e.stem: e.path for e in index.entries}
+    out = Path(out)
+    old: Dict[str, Any] = {}
+    if out.exists() and not force:
+        with open(out, "r", encoding="utf-8") as f:
+            old = json.load(f)
+    same_setup = old.get("template") == Path(template).name and old.get("model") == model
+    cached = old.get("pages", {}) if same_setup else {}
+
+    entries: Dict[str, Any] = {}
+    jobs: List[AlignJob] = []
+    for stem, path in pages.items():
+        fp = _fingerprint(path)
+        ent = cached.get(stem)
+        if ent and ent.get("size") == fp["size"] and ent.get("mtime_ns") == fp["mtime_ns"]:
+            entries[stem] = ent
+        else:
+            jobs.append((stem, path))
+
+    prog = Progress(len(jobs), "对齐")
+    failed = 0
+    for stem, M, inliers, err in ordered_map(partial(_align_one, model=model), jobs, workers=workers,
+                                             initializer=partial(_init_worker, template)):
+        if err:
+            failed += 1
+            print("⚠", err, "→ 按模板原坐标切片")
+        entries[stem] = {**_fingerprint(pages[stem]), "M": M, "inliers": inliers}
+        prog.step()
+
+    if not jobs and same_setup and set(entries) == set(cached):
+        print(f"✅ 全部 {len(pages)} 张卷面未变化，沿用 {out}")
+        return out
+
+    data = {"version": 1, "template": Path(template).name, "template_size": [tw, th], "model": model,
+            "pages": entries}
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, out)
+
+    print(f"\n✅ 对齐完成！计算 {len(jobs)} 张，沿用缓存 {len(pages) - len(jobs)} 张，失败 {failed} 张 → {out}")
+    return out
+
+
+if __name__ == "__main__":
+    align()
@@ -0,0 +1,110 @@
+"""
+--+--analysis
+  +--成绩统计（向量化）
+===================================================================
+* 输入为分数张量 `(学生数, 大题数, 最大小题数)`（store.ResultStore.score_tensor），全部计算为 NumPy 整列运算：
+    - 列矩阵：大题小计（及可选小题列）、总分、名次（并列同名次）
+    - 题目分析：平均分、标准差、难度（平均分 / 满分）、区分度（高低分组各 27%）、题总相关（扣除本题）
+    - 分数分布：总分分段人数、占比、累计占比
+* 满分优先取配置（涂卡区 rows × points），否则以本次考试该列实际最高分近似。
+
+依赖：NumPy。
+===================================================================
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+GROUP_FRAC = 0.27                       # 区分度高 / 低分组比例
+_BIN_WIDTHS = (1, 2, 5, 10, 20, 50, 100)
+MAX_BINS = 20
+
+
+@dataclass
+class ScoreColumns:
+    names: List[str]            # 列名："1"、"1.1"…
+    matrix: np.ndarray          # (学生数, 列数)
+    is_question: np.ndarray     # (列数,) bool，大题列为 True
+
+
+def score_columns(tensor: np.ndarray, sub_counts: Sequence[int], with_subs: bool = False) -> ScoreColumns:
+    """张量 → 列矩阵；sub_counts[q] 为第 q 题的小题数（0 表示无小题）"""
+    q_tot = tensor.sum(axis=2)                                  # 补位的小题分为 0，直接求和
+    if not with_subs:
+        n = q_tot.shape[1]
+        return ScoreColumns([str(q + 1) for q in range(n)], q_tot, np.ones(n, dtype=bool))
+
+    names: List[str] = []
+    src: List[int] = []                                         # 列来源在拼接矩阵中的下标
+    flat = np.concatenate([q_tot, tensor.reshape(tensor.shape[0], -1)], axis=1)
+    n_q, m = tensor.shape[1], tensor.shape[2]
+    for q in range(n_q):
+        names.append(str(q + 1))
+        src.append(q)
+        for s in range(sub_counts[q] if q < len(sub_counts) else 0):
+            names.append(f"{q + 1}.{s + 1}")
+            src.append(n_q + q * m + s)
+    is_q = np.array(["." not in n for n in names])
+    return ScoreColumns(names, flat[:, src], is_q)
+
+
+def ranks(total: np.ndarray) -> np.ndarray:
+    """名次（1 起），同分同名次，下一名次跳过并列人数"""
+    desc = -np.sort(total)[::-1]
+    return np.searchsorted(desc, -total, side="left") + 1
+
+
+def full_marks(matrix: np.ndarray, configured: Optional[np.ndarray] = None) -> np.ndarray:
+    """每列满分：有配置用配置（≤0 视为未配置），否则取实际最高分"""
+    observed = matrix.max(axis=0) if len(matrix) else np.zeros(matrix.shape[1])
+    if configured is None:
+        return observed.astype(float)
+    return np.where(configured > 0, configured, observed).astype(float)
+
+
+def item_stats(matrix: np.ndarray, total: np.ndarray, full: np.ndarray) -> dict:
+    """各列题目分析指标，返回列名 → (列数,) 数组"""
+    n = len(matrix)
+    mean = matrix.mean(axis=0)
+    std = matrix.std(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        difficulty = np.where(full > 0, mean / full, np.nan)
+
+        g = max(1, int(round(n * GROUP_FRAC)))
+        order = np.argsort(-total, kind="stable")
+        upper = matrix[order[:g]].mean(axis=0)
+        lower = matrix[order[-g:]].mean(axis=0)
+        discrimination = np.where(full > 0, (upper - lower) / full, np.nan)
+
+        rest = total[:, None] - matrix                          # 扣除本题后的总分
+        xc = matrix - mean
+        rc = rest - rest.mean(axis=0)
+        denom = np.sqrt((xc ** 2).sum(axis=0) * (rc ** 2).sum(axis=0))
+        item_total = np.where(denom > 0, (xc * rc).sum(axis=0) / denom, np.nan)
+
+    return {
+        "满分": full,
+        "平均分": mean,
+        "标准差": std,
+        "难度": difficulty,
+        "区分度": discrimination,
+        "题总相关": item_total,
+        "得满分人数": (matrix >= full[None, :]).sum(axis=0) if n else np.zeros_like(full),
+        "零分人数": (matrix <= 0).sum(axis=0),
+    }
+
+
+def distribution(total: np.ndarray, top: Optional[float] = None):
+    """总分分段：返回 (分段标签, 人数, 占比, 累计占比)，分段自高到低"""
+    top = float(top if top else (total.max() if len(total) else 0)) or 1.0
+    width = next((w for w in _BIN_WIDTHS if top / w <= MAX_BINS), _BIN_WIDTHS[-1])
+    edges = np.arange(0, top + width, width, dtype=float)
+    edges[-1] = max(edges[-1], top)
+    counts, _ = np.histogram(np.clip(total, 0, edges[-1]), bins=edges)
+    labels = [f"[{lo:g}, {hi:g})" for lo, hi in zip(edges[:-2], edges[1:-1])] + [f"[{edges[-2]:g}, {edges[-1]:g}]"]
+    counts, labels = counts[::-1], labels[::-1]
+    share = counts / max(len(total), 1)
+    return labels, counts, share, np.cumsum(share)
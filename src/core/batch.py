@@ -0,0 +1,237 @@
+"""
+--+--batch
+  +--多工作区批量运行（多场考试 / 多个班级）
+===================================================================
+* 工作区 = 一个与 `src/data` 同结构的目录（students/、configs/、stitched/ …），每场考试或每个班级一个。
+  `--root DIR` 下凡含 students/ 的子目录都视为工作区。
+* 只跑无需人工交互的阶段：stitch → align → slice → omr → export → mark（define / teacher 仍需人工）。
+* 每个阶段在子进程中运行，环境变量 QUICKGRADE_DATA 指向该工作区（path.py 据此取数据根目录），工作区之间互不干扰。
+* 全局进程预算：所有工作区共享 `budget` 个令牌，并行阶段（stitch / align / mark）一次领取多个，
+  单进程阶段领取 1 个；同时运行的进程数总和不超过预算。
+* 阶段状态记录在 `{工作区}/configs/batch_state.json`：已完成且输入未变化（按每个输入文件的路径 / 大小 / mtime 指纹）
+  的阶段直接跳过，原地覆盖的同名扫描件也会触发重跑；
+  前置条件不满足（未 define / 未批改）的阶段记为 blocked，下次再试。
+* 各阶段输出写入 `{工作区}/configs/batch_logs/{阶段}.log`。
+
+依赖：仅标准库（阶段本身的依赖见各模块）。
+===================================================================
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+STAGES = ("stitch", "align", "slice", "omr", "export", "mark")
+PARALLEL_STAGES = {"stitch", "align", "mark"}      # 阶段内部使用进程池
+
+# 阶段输入（相对工作区）：任一文件增删或大小 / mtime 变化即需重跑
+_INPUTS: Dict[str, Tuple[str, ...]] = {
+    "stitch": ("students/*/*",),
+    "align": ("stitched.manifest.json",),
+    "slice": ("configs/default.json", "configs/align.json", "stitched.manifest.json"),
+    "omr": ("configs/default.json", "sliced/index.json"),
+    "export": ("configs/default.json", "configs/result.json", "configs/result.db", "configs/result.db-wal",
+               "configs/student_ids.json"),
+    "mark": ("configs/default.json", "configs/result.json", "configs/result.db", "configs/result.db-wal",
+             "configs/align.json", "configs/student_ids.json"),
+}
+# 前置条件：列出的文件至少存在一个
+_REQUIRES: Dict[str, Tuple[Tuple[str, ...], str]] = {
+    "stitch": (("students",), "缺少 students/"),
+    "slice": (("configs/default.json",), "未划分题目区域（需先 define）"),
+    "omr": (("configs/default.json",), "未划分题目区域（需先 define）"),
+    "export": (("configs/result.json", "configs/result.db"), "尚未批改"),
+    "mark": (("configs/result.json", "configs/result.db"), "尚未批改"),
+}
+
+
+@dataclass
+class Workspace:
+    name: str
+    root: Path
+
+    @property
+    def state_path(self) -> Path:
+        return self.root / "configs" / "batch_state.json"
+
+    def log_path(self, stage: str) -> Path:
+        return self.root / "configs" / "batch_logs" / f"{stage}.log"
+
+    def load_state(self) -> Dict[str, Dict]:
+        if not self.state_path.exists():
+            return {}
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_state(self, state: Dict[str, Dict]):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.state_path)
+
+    def inputs_stamp(self, stage: str) -> str:
+        """输入文件指纹：按相对路径排序的 (路径, 大小, mtime) 的 SHA‑1"""
+        files = set()
+        for pattern in _INPUTS.get(stage, ()):
+            for p in (self.root.glob(pattern) if "*" in pattern else [self.root / pattern]):
+                if p.is_file():
+                    files.add(p)
+        h = hashlib.sha1()
+        for p in sorted(files):
+            st = p.stat()
+            h.update(f"{p.relative_to(self.root).as_posix()}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    def blocked(self, stage: str) -> Optional[str]:
+        req = _REQUIRES.get(stage)
+        if req and not any((self.root / p).exists() for p in req[0]):
+            return req[1]
+        return None
+
+
+def discover(root: str | Path) -> List[Workspace]:
+    """root 下含 students/ 的子目录（root 本身含 students/ 时也算一个）"""
+    root = Path(root)
+    dirs = [root] if (root / "students").is_dir() else []
+    dirs += sorted(d for d in root.iterdir() if d.is_dir() and (d / "students").is_dir())
+    return [Workspace(d.name, d.resolve()) for d in dirs]
+
+# -------------------------------------------------- 全局进程预算 --------------------------------------------------
+
+class Budget:
+    """计数令牌：acquire(n) 阻塞到有 n 个空闲令牌（n 超过总数时按总数算）"""
+
+    def __init__(self, total: int):
+        self.total = max(1, total)
+        self._free = self.total
+        self._cond = threading.Condition()
+
+    def acquire(self, n: int) -> int:
+        n = max(1, min(n, self.total))
+        with self._cond:
+            self._cond.wait_for(lambda: self._free >= n)
+            self._free -= n
+        return n
+
+    def release(self, n: int):
+        with self._cond:
+            self._free += n
+            self._cond.notify_all()
+
+# -------------------------------------------------- 运行 --------------------------------------------------
+
+def _run_stage(ws: Workspace, stage: str, workers: int) -> Tuple[bool, float]:
+    log = ws.log_path(stage)
+    log.parent.mkdir(parents=True, exist_ok=True)
+    env = {**os.environ, "QUICKGRADE_DATA": str(ws.root), "PYTHONIOENCODING": "utf-8"}
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--stage", stage, "--workers", str(workers)]
+    t0 = time.perf_counter()
+    with open(log, "w", encoding="utf-8") as f:
+        rc = subprocess.call(cmd, env=env, stdout=f, stderr=subprocess.STDOUT)
+    return rc == 0, time.perf_counter() - t0
+
+
+def _run_workspace(ws: Workspace, stages: Sequence[str], budget: Budget, per_stage: int,
+                   force: bool, lock: threading.Lock) -> Dict[str, str]:
+    state = {} if force else ws.load_state()
+    result: Dict[str, str] = {}
+    rerun = False                                       # 上游重跑后，下游一律重跑
+    for stage in stages:
+        reason = ws.blocked(stage)
+        if reason:
+            result[stage] = f"blocked：{reason}"
+            state.pop(stage, None)
+            break
+        stamp = ws.inputs_stamp(stage)
+        prev = state.get(stage, {})
+        if not rerun and prev.get("status") == "done" and prev.get("inputs") == stamp:
+            result[stage] = "skipped"
+            continue
+
+        want = per_stage if stage in PARALLEL_STAGES else 1
+        n = budget.acquire(want)
+        try:
+            with lock:
+                print(f"▶ [{ws.name}] {stage}（{n} 进程）")
+            ok, secs = _run_stage(ws, stage, n)
+        finally:
+            budget.release(n)
+
+        rerun = True
+        state[stage] = {"status": "done" if ok else "failed", "inputs": stamp,
+                        "seconds": round(secs, 2), "finished_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+        ws.save_state(state)
+        result[stage] = f"done {secs:.1f}s" if ok else f"failed（见 {ws.log_path(stage)}）"
+        with lock:
+            print(f"{'✔' if ok else '✘'} [{ws.name}] {stage} {result[stage]}")
+        if not ok:
+            break
+    ws.save_state(state)
+    return result
+
+
+def run_batch(workspaces: List[Workspace], stages: Sequence[str] = STAGES, budget: Optional[int] = None,
+              per_stage: Optional[int] = None, force: bool = False) -> Dict[str, Dict[str, str]]:
+    """多个工作区并发执行；budget 为全局进程数上限（默认 CPU 核数）"""
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"未知阶段：{sorted(unknown)}，可选 {STAGES}")
+    total = budget or os.cpu_count() or 1
+    per_stage = per_stage or max(1, total // max(1, min(len(workspaces), total)))
+    tokens, lock = Budget(total), threading.Lock()
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, len(workspaces))) as pool:
+        futs = {ws.name: pool.submit(_run_workspace, ws, stages, tokens, per_stage, force, lock) for ws in workspaces}
+        report = {name: f.result() for name, f in futs.items()}
+
+    print(f"\n✅ 批量完成：{len(workspaces)} 个工作区，预算 {total} 进程，用时 {time.perf_counter() - t0:.1f}s")
+    for name, res in report.items():
+        print(f"  {name:<20} " + " | ".join(f"{s}: {r}" for s, r in res.items()))
+    return report
+
+# -------------------------------------------------- 子进程入口：在当前 QUICKGRADE_DATA 下执行单个阶段 --------------------------------------------------
+
+def _stage_main(stage: str, workers: int):
+    if stage == "stitch":
+        from stitched import stitch
+        stitch(workers=workers)
+    elif stage == "align":
+        from align import align
+        align(workers=workers)
+    elif stage == "slice":
+        from sliced import slice_all
+        slice_all()
+    elif stage == "omr":
+        from omr import recognize_all
+        recognize_all()
+    elif stage == "export":
+        from output import export_excel
+        export_excel()
+    elif stage == "mark":
+        from output import ExportOptions, save_all_marked_images
+        save_all_marked_images(ExportOptions(workers=workers))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="多工作区批量运行")
+    ap.add_argument("--stage", choices=STAGES, help="（内部）在 QUICKGRADE_DATA 指定的工作区执行单个阶段")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--root", default=None, help="工作区所在目录")
+    ap.add_argument("--force", action="store_true")
+    ns = ap.parse_args()
+    if ns.stage:
+        _stage_main(ns.stage, ns.workers or 1)
+    else:
+        run_batch(discover(ns.root or "."), budget=ns.workers, force=ns.force)
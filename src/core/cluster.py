@@ -0,0 +1,184 @@
+"""
+--+--cluster
+  +--答案聚类（批改前预处理）
+===================================================================
+* 每个批改单元的每份切片计算廉价特征：
+    - 墨迹占比（判空白）
+    - 墨迹外接框内的二值化缩略图 32×32
+    - dHash 64 位感知哈希
+* 对同一小题的全部学生做向量化两两距离（缩略图 Jaccard 距离 + 哈希汉明距离），
+  贪心选取“邻居最多”的切片为代表，阈值内的未归类切片并入该簇。
+* 空白答案单独成簇（blank=True），离代表较远的成员记为 outliers 供快速复核。
+* 无法读取卷面的学生以空白特征占位，不参与空白判定与选代表，并入首个非空白簇并记为 outliers，
+  单份读图失败不会中断整场聚类。
+* 结果写入 `data/configs/clusters.json`；`Teacher(cluster=True)` 每簇只批代表一份，分数套用到全簇。
+
+依赖：OpenCV‑Python、NumPy。
+===================================================================
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from path import CONFIGS_PATH
+from input import StudentProcessing, Question
+from crop import CropCache, item_regions
+from sliced import SliceStore
+from index import student_index
+from align import load_alignment
+
+CLUSTERS_JSON = Path(CONFIGS_PATH, "clusters.json")
+
+THUMB = 32              # 缩略图边长
+INK_LEVEL = 160         # 灰度低于此值视为墨迹
+BLANK_INK = 0.004       # 墨迹占比低于此值视为空白
+MATCH_THR = 0.2         # 缩略图 Jaccard 距离阈值（异或 / 并集）
+HASH_THR = 10           # dHash 汉明距离阈值（64 位）
+OUTLIER_FRAC = 0.5      # 距代表超过 MATCH_THR × 该比例的成员需复核
+
+_POP8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+@dataclass
+class Cluster:
+    rep: int
+    members: List[int]
+    blank: bool = False
+    outliers: List[int] = field(default_factory=list)
+
+# -------------------------------------------------- 特征 --------------------------------------------------
+
+def feature(crop: np.ndarray) -> Tuple[np.ndarray, np.ndarray, float]:
+    """单份切片的 (缩略图位 (THUMB²,) bool, dHash (8,) uint8, 墨迹占比)"""
+    g = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    b = (g < INK_LEVEL).astype(np.uint8) * 255
+    ink = float(b.mean() / 255)
+    # 只取墨迹外接框：答案在区域内的平移不影响特征
+    x, y, w, h = cv2.boundingRect(b)
+    if w == 0 or h == 0:
+        return np.zeros(THUMB * THUMB, dtype=bool), np.zeros(8, dtype=np.uint8), ink
+    b, g = b[y:y + h, x:x + w], g[y:y + h, x:x + w]
+    bits = (cv2.resize(b, (THUMB, THUMB), interpolation=cv2.INTER_AREA) > 64).ravel()
+    small = cv2.resize(g, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+    dhash = np.packbits((small[:, 1:] > small[:, :-1]).ravel())
+    return bits, dhash, ink
+
+
+class _Features:
+    """一个批改单元的全部学生特征（预分配，逐份填入）"""
+
+    def __init__(self, n: int):
+        self.bits = np.zeros((n, THUMB * THUMB), dtype=bool)
+        self.hashes = np.zeros((n, 8), dtype=np.uint8)
+        self.ink = np.zeros(n, dtype=np.float32)
+
+    def put(self, i: int, crop: np.ndarray):
+        self.bits[i], self.hashes[i], self.ink[i] = feature(crop)
+
+# -------------------------------------------------- 聚类 --------------------------------------------------
+
+def distances(bits: np.ndarray, hashes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """两两距离矩阵：(缩略图 Jaccard 距离 float32, dHash 汉明距离 uint8)"""
+    b = bits.astype(np.float32)
+    s = b.sum(axis=1)
+    inter = b @ b.T
+    union = s[:, None] + s[None, :] - inter
+    d_bits = 1.0 - inter / np.maximum(union, 1.0)
+    d_hash = _POP8[hashes[:, None, :] ^ hashes[None, :, :]].sum(axis=-1, dtype=np.uint8)
+    return d_bits, d_hash
+
+
+def cluster_item(bits: np.ndarray, hashes: np.ndarray, ink: np.ndarray,
+                 missing: Optional[np.ndarray] = None) -> List[Cluster]:
+    """missing 为卷面无法读取的学生 (N,) bool：不参与聚类，并入首个非空白簇待复核"""
+    missing = np.zeros(len(ink), dtype=bool) if missing is None else missing
+    blank = (ink < BLANK_INK) & ~missing
+    d_bits, d_hash = distances(bits, hashes)
+    close = (d_bits <= MATCH_THR) & (d_hash <= HASH_THR)
+
+    clusters: List[Cluster] = []
+    if blank.any():
+        idx = np.flatnonzero(blank).tolist()
+        clusters.append(Cluster(rep=idx[0], members=idx, blank=True))
+
+    # 邻居最多者优先做代表，一次排序后顺序扫描
+    free = ~blank & ~missing
+    deg = close.sum(axis=1)
+    for rep in np.argsort(-deg, kind="stable"):
+        if not free[rep]:
+            continue
+        rep = int(rep)
+        members = np.flatnonzero(close[rep] & free)
+        free[members] = False
+        outliers = members[d_bits[rep, members] > MATCH_THR * OUTLIER_FRAC]
+        clusters.append(Cluster(rep=rep, members=members.tolist(), outliers=outliers.tolist()))
+
+    lost = np.flatnonzero(missing).tolist()
+    if lost:
+        host = next((c for c in clusters if not c.blank), None)
+        if host is None:
+            clusters.append(Cluster(rep=lost[0], members=lost, outliers=lost[1:]))
+        else:
+            host.members += lost
+            host.outliers += lost
+    return clusters
+
+# -------------------------------------------------- 预处理入口 --------------------------------------------------
+
+def build_clusters(config: str | Path = Path(CONFIGS_PATH, "default.json"),
+                   out: str | Path = CLUSTERS_JSON) -> Dict[str, List[Cluster]]:
+    questions: List[Question] = StudentProcessing.load(config)
+    index = student_index()
+    total = len(index)
+    source = SliceStore.open(questions, total) or CropCache(questions, index.read, total, transform=load_alignment())
+
+    # 按学生遍历：整卷来源时每张只解码一次；只保留特征，不保留切片
+    feats = {k: _Features(total) for k in item_regions(questions)}
+    missing = np.zeros(total, dtype=bool)
+    try:
+        for stu in range(total):
+            try:
+                for (q_idx, sub_idx), f in feats.items():
+                    f.put(stu, source.get(stu, q_idx, sub_idx)[0])
+            except FileNotFoundError as e:
+                missing[stu] = True                 # 特征保持全零占位
+                print(f"⚠ {e}，该生各小题列入复核")
+            source.prefetch(stu, 0, 0)
+    finally:
+        source.close()
+
+    result: Dict[str, List[Cluster]] = {}
+    for (q_idx, sub_idx), f in feats.items():
+        cl = cluster_item(f.bits, f.hashes, f.ink, missing)
+        result[f"{q_idx}|{sub_idx}"] = cl
+        n_blank = sum(len(c.members) for c in cl if c.blank)
+        print(f"✔ 第 {q_idx+1} 题第 {sub_idx+1} 小题：{total} 份 → {len(cl)} 簇（空白 {n_blank} 份）")
+
+    Path(out).parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"total_students": total, "items": {k: [asdict(c) for c in v] for k, v in result.items()}},
+                  f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 聚类完成！→ {out}")
+    return result
+
+
+def load_clusters(total_students: int, path: str | Path = CLUSTERS_JSON) -> Optional[Dict[Tuple[int, int], List[Cluster]]]:
+    """读取 clusters.json；不存在或学生数不符时返回 None"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("total_students") != total_students:
+        return None
+    return {tuple(map(int, k.split("|"))): [Cluster(**c) for c in v] for k, v in data["items"].items()}  # type: ignore[misc]
+
+
+if __name__ == "__main__":
+    build_clusters()
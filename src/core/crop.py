@@ -0,0 +1,141 @@
+"""
+--+--crop
+  +--区域裁剪缓存 & 预取
+===================================================================
+* 每张 stitched 整卷只解码一次，按 `default.json` 的大题 / 小题坐标一次性切出全部区域。
+* 切片存入有内存上限的 LRU 缓存，键为 `(学生, 大题, 小题)`。
+* 后台线程预取接下来 N 名学生的整卷，翻到下一份时无需等待磁盘与 JPEG 解码。
+* 传入 transform（align.py 的对齐结果）时，只对各区域按该卷面的变换做 warp，整卷不改写。
+
+依赖：OpenCV‑Python、NumPy。
+===================================================================
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from input import Question, Region
+from align import warp_region
+
+Key = Tuple[int, int, int]                        # (stu, q, sub)
+Crop = Tuple[np.ndarray, Tuple[int, int]]          # (切片, 切片左上角在整卷中的坐标)
+Transform = Callable[[int], Optional[np.ndarray]]  # 学生下标 -> 模板到卷面的 3×3 变换
+
+
+def region_of(q: Question, sub_idx: int) -> Region:
+    """与批改遍历一致的『第 sub_idx 个批改单元』对应区域"""
+    if not q.subs:
+        return q.segments[sub_idx] if len(q.segments) > 1 else q.segments[0]
+    return q.subs[sub_idx].segments[0]
+
+
+def item_regions(questions: List[Question]) -> Dict[Tuple[int, int], Region]:
+    """(q_idx, sub_idx) -> Region，覆盖 Teacher.run 会遍历到的全部批改单元"""
+    res: Dict[Tuple[int, int], Region] = {}
+    for q_idx, q in enumerate(questions):
+        for sub_idx in range(max(1, len(q.subs))):
+            res[(q_idx, sub_idx)] = region_of(q, sub_idx)
+    return res
+
+
+def cut_regions(page: np.ndarray, regions: Dict[Tuple[int, int], Region],
+                M: Optional[np.ndarray] = None) -> Dict[Tuple[int, int], Crop]:
+    """一次遍历切出整卷上的全部区域；结果为独立副本，整卷可随即释放。
+    M 为模板到卷面的变换时按模板坐标 warp 出各区域，坐标系与未对齐时一致。"""
+    res: Dict[Tuple[int, int], Crop] = {}
+    for k, r in regions.items():
+        x, y, w, h = r.to_tuple()
+        if M is not None:
+            res[k] = (warp_region(page, M, r), (x, y))
+        else:
+            res[k] = (np.ascontiguousarray(page[y:y + h, x:x + w]).copy(), (x, y))
+    return res
+
+
+class CropCache:
+    """按学生整卷解码、按批改单元缓存的 LRU 切片缓存（线程安全）"""
+
+    def __init__(
+        self,
+        questions: List[Question],
+        reader: Callable[[int], Optional[np.ndarray]],
+        total_students: int,
+        budget_mb: int = 512,
+        prefetch: int = 4,
+        transform: Optional[Transform] = None,
+    ):
+        self.regions = item_regions(questions)
+        self.reader = reader
+        self.transform = transform
+        self.total_students = total_students
+        self.budget = budget_mb * 1024 * 1024
+        self.prefetch_n = prefetch
+
+        self._items: "OrderedDict[Key, Crop]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}       # 正在解码的学生 -> Future
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crop-prefetch")
+
+    # ---------- 对外接口 ---------- #
+    def get(self, stu: int, q_idx: int, sub_idx: int) -> Crop:
+        key = (stu, q_idx, sub_idx)
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is not None:
+                self._items.move_to_end(key)
+                return hit
+            fut = self._pending.get(stu)
+            owner = fut is None
+            if owner:
+                fut = self._pending[stu] = Future()
+
+        if owner:                                   # 当前线程负责解码
+            self._load(stu, fut)
+        return fut.result()[(q_idx, sub_idx)]
+
+    def prefetch(self, stu: int, q_idx: int, sub_idx: int, n: Optional[int] = None):
+        """预取 stu 之后 n（默认 prefetch_n）名学生在当前批改单元上的切片"""
+        for s in range(stu + 1, min(stu + 1 + (n or self.prefetch_n), self.total_students)):
+            with self._lock:
+                if (s, q_idx, sub_idx) in self._items or s in self._pending:
+                    continue
+                fut = self._pending[s] = Future()
+            self._pool.submit(self._load, s, fut)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ---------- 内部 ---------- #
+    def _load(self, stu: int, fut: Future):
+        try:
+            page = self.reader(stu)
+            if page is None:
+                raise FileNotFoundError(f"无法读取学生卷面：第 {stu + 1} 份")
+            crops = cut_regions(page, self.regions, self.transform(stu) if self.transform else None)
+        except BaseException as e:
+            with self._lock:
+                self._pending.pop(stu, None)
+            fut.set_exception(e)
+            return
+
+        with self._lock:
+            for k, crop in crops.items():
+                self._put((stu, *k), crop)
+            self._pending.pop(stu, None)
+        fut.set_result(crops)
+
+    def _put(self, key: Key, crop: Crop):
+        old = self._items.pop(key, None)
+        if old is not None:
+            self._bytes -= old[0].nbytes
+        self._items[key] = crop
+        self._bytes += crop[0].nbytes
+        while self._bytes > self.budget and len(self._items) > 1:
+            _, (img, _) = self._items.popitem(last=False)
+            self._bytes -= img.nbytes
@@ -0,0 +1,105 @@
+"""
+--+--grid
+  +--网格批改页（同一小题、多名学生平铺）
+===================================================================
+* 把 N 名学生同一小题的切片缩放后平铺到一张画布，一键一格打分。
+* 按键：
+    0‑9        给当前格打分并跳到下一格
+    空格       跳过当前格          退格       回到上一格
+    f + 0‑9    其余未打分的格全部记为该分（“除这些外全部满分”）
+    ↵          全部格均已打分时提交本页
+  鼠标左键单击某格即选中该格。
+* 可传入预填分数（聚类复核时为所在簇的分数），确认无误直接 ↵ 提交。
+* 仅支持一位数分数，适合客观 / 短答小题；多位分数请用逐份批改模式。
+
+依赖：OpenCV‑Python、NumPy。
+===================================================================
+"""
+from __future__ import annotations
+
+import math
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+_FONT = cv2.FONT_HERSHEY_SIMPLEX
+_RED = (0, 0, 255)
+_BLUE = (255, 0, 0)
+_GRAY = (180, 180, 180)
+_LABEL_H = 24           # 每格顶部的学生编号 / 考号栏高度
+
+
+class GridPage:
+    COLS = 4
+
+    def __init__(self, students: List[int], crops: List[np.ndarray], tile: Tuple[int, int] = (320, 160),
+                 scores: Optional[List[Optional[int]]] = None, labels: Optional[List[str]] = None):
+        self.students = students
+        self.labels = labels or [f"#{stu + 1}" for stu in students]
+        self.scores: List[Optional[int]] = list(scores) if scores is not None else [None] * len(students)
+        self.cursor = 0
+        self.tile_w, self.tile_h = tile
+        self.cols = min(self.COLS, len(students))
+        self.rows = math.ceil(len(students) / self.cols)
+        self._fill_pending = False
+        self._base = self._layout([self._fit(c) for c in crops])
+
+    # ---------- 布局 ---------- #
+    def _fit(self, img: np.ndarray) -> np.ndarray:
+        h, w = img.shape[:2]
+        s = min(self.tile_w / max(w, 1), (self.tile_h - _LABEL_H) / max(h, 1))
+        size = (max(1, int(w * s)), max(1, int(h * s)))
+        return cv2.resize(img, size, interpolation=cv2.INTER_AREA if s < 1 else cv2.INTER_LINEAR)
+
+    def _origin(self, i: int) -> Tuple[int, int]:
+        return (i % self.cols) * self.tile_w, (i // self.cols) * self.tile_h
+
+    def _layout(self, tiles: List[np.ndarray]) -> np.ndarray:
+        canvas = np.full((self.rows * self.tile_h, self.cols * self.tile_w, 3), 255, np.uint8)
+        for i, (label, t) in enumerate(zip(self.labels, tiles)):
+            x, y = self._origin(i)
+            canvas[y + _LABEL_H:y + _LABEL_H + t.shape[0], x:x + t.shape[1]] = t
+            cv2.putText(canvas, label, (x + 4, y + 18), _FONT, 0.5, (0, 0, 0), 1)
+        return canvas
+
+    # ---------- 渲染 ---------- #
+    def render(self) -> np.ndarray:
+        disp = self._base.copy()
+        for i, sc in enumerate(self.scores):
+            x, y = self._origin(i)
+            cur = i == self.cursor
+            cv2.rectangle(disp, (x, y), (x + self.tile_w - 1, y + self.tile_h - 1),
+                          _BLUE if cur else _GRAY, 3 if cur else 1)
+            if sc is not None:
+                cv2.putText(disp, str(sc), (x + self.tile_w - 40, y + self.tile_h - 12), _FONT, 1.2, _RED, 2)
+        if self._fill_pending:
+            cv2.putText(disp, "fill: ?", (10, disp.shape[0] - 10), _FONT, 0.8, _RED, 2)
+        return disp
+
+    def hit(self, x: int, y: int) -> Optional[int]:
+        c, r = x // self.tile_w, y // self.tile_h
+        i = r * self.cols + c
+        return i if 0 <= c < self.cols and 0 <= i < len(self.students) else None
+
+    # ---------- 键盘 ---------- #
+    def handle_key(self, key: int) -> bool:
+        """处理一次按键；本页提交时返回 True"""
+        n = len(self.students)
+        if ord("0") <= key <= ord("9"):
+            val = key - ord("0")
+            if self._fill_pending:
+                self.scores = [val if sc is None else sc for sc in self.scores]
+                self._fill_pending = False
+            else:
+                self.scores[self.cursor] = val
+                self.cursor = min(self.cursor + 1, n - 1)
+        elif key == ord("f"):
+            self._fill_pending = True
+        elif key == ord(" "):
+            self.cursor = min(self.cursor + 1, n - 1)
+        elif key in (8, 127):           # 退格
+            self.cursor = max(self.cursor - 1, 0)
+        elif key == 13 and all(sc is not None for sc in self.scores):
+            return True
+        return False
@@ -0,0 +1,148 @@
+"""
+--+--identify
+  +--考号识别（OCR）
+===================================================================
+* 只对 `default.json` 中的考号区域（define 时按 i 框选）做 OCR，不对整卷调用 Tesseract。
+* 预处理：灰度 → 缩放到统一行高 → Otsu 二值化；存在 align.json 时按对齐变换取区域。
+* 批量：每 BATCH 名学生的考号条纵向拼成一张图，一次 Tesseract 调用（--psm 6，仅数字），
+  按识别框的纵坐标分回各学生；多个批次在进程池中并行。
+* 结果写入 `data/configs/student_ids.json`（按整卷文件名对应）；空结果、位数异常、重复考号列入 review 供人工核对。
+* 学生索引（index.py）载入考号后，Teacher 窗口标题、export_excel 的“学生”列、save_all_marked_images 的文件名均使用。
+
+依赖：pytesseract（需本机安装 Tesseract）、OpenCV‑Python、NumPy。
+===================================================================
+"""
+from __future__ import annotations
+
+import json
+import os
+from collections import Counter
+from functools import partial
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from path import CONFIGS_PATH
+from input import Region, StudentProcessing
+from index import ID_INDEX, reset_index, student_index
+from align import Alignment, load_alignment, warp_region
+from pool import Progress, ordered_map, in_worker
+
+ID_CHARS = "0123456789"
+SLOT_H = 64             # 每条考号预处理后的高度（像素）
+GAP = 32                # 拼接时条与条之间的空白
+BATCH = 24              # 每次 Tesseract 调用处理的学生数
+_TESS_CONFIG = f"--psm 6 -c tessedit_char_whitelist={ID_CHARS}"
+
+# (学生下标, 考号, 置信度)
+IdResult = Tuple[int, str, float]
+
+# -------------------------------------------------- 预处理 & OCR（在子进程中运行） --------------------------------------------------
+
+_REGION: Optional[Region] = None
+_ALIGN: Optional[Alignment] = None
+
+
+def _init_worker(region: Tuple[int, int, int, int]):
+    global _REGION, _ALIGN
+    if in_worker():
+        cv2.setNumThreads(1)    # 并行度由进程池提供；串行执行时不限制主进程
+    _REGION = Region(*region)
+    _ALIGN = load_alignment()
+
+
+def preprocess(crop: np.ndarray) -> np.ndarray:
+    """考号条 → 行高 SLOT_H 的白底黑字二值图"""
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    s = SLOT_H / max(gray.shape[0], 1)
+    gray = cv2.resize(gray, (max(1, int(gray.shape[1] * s)), SLOT_H),
+                      interpolation=cv2.INTER_AREA if s < 1 else cv2.INTER_CUBIC)
+    _, bw = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return bw
+
+
+def _cut_id(stu: int) -> Optional[np.ndarray]:
+    page = student_index().read(stu)
+    if page is None:
+        return None
+    r = _REGION
+    M = _ALIGN(stu) if _ALIGN else None
+    return warp_region(page, M, r) if M is not None else page[r.y:r.y + r.h, r.x:r.x + r.w]
+
+
+def _ocr_batch(students: List[int]) -> List[IdResult]:
+    import pytesseract      # 仅 identify 需要 Tesseract；读取索引的模块不依赖它
+
+    strips = [_cut_id(s) for s in students]
+    slots = [preprocess(c) if c is not None else None for c in strips]
+    width = max((s.shape[1] for s in slots if s is not None), default=1) + 2 * GAP
+    canvas = np.full((len(students) * (SLOT_H + GAP) + GAP, width), 255, np.uint8)
+    for i, s in enumerate(slots):
+        if s is not None:
+            y = GAP + i * (SLOT_H + GAP)
+            canvas[y:y + SLOT_H, GAP:GAP + s.shape[1]] = s
+
+    data = pytesseract.image_to_data(canvas, config=_TESS_CONFIG, output_type=pytesseract.Output.DICT)
+    words: List[List[Tuple[int, str, float]]] = [[] for _ in students]
+    for text, left, top, h, conf in zip(data["text"], data["left"], data["top"], data["height"], data["conf"]):
+        text = "".join(ch for ch in str(text) if ch in ID_CHARS)
+        if not text:
+            continue
+        row = (int(top) + int(h) // 2 - GAP // 2) // (SLOT_H + GAP)
+        if 0 <= row < len(students):
+            words[row].append((int(left), text, float(conf)))
+
+    res: List[IdResult] = []
+    for stu, ws in zip(students, words):
+        ws.sort()
+        res.append((stu, "".join(w[1] for w in ws), min((w[2] for w in ws), default=-1.0)))
+    return res
+
+# -------------------------------------------------- 对外接口 --------------------------------------------------
+
+def identify(config: str | Path = Path(CONFIGS_PATH, "default.json"), out: str | Path = ID_INDEX,
+             workers: Optional[int] = None) -> Path:
+    region = StudentProcessing.load_id_region(config)
+    if region is None:
+        raise RuntimeError("default.json 中没有考号区域！请在 define 时按 i 框选考号后再确认。")
+    index = student_index()
+    total = len(index)
+    batches = [list(range(s, min(s + BATCH, total))) for s in range(0, total, BATCH)]
+
+    ids: List[str] = [""] * total
+    conf: List[float] = [-1.0] * total
+    prog = Progress(total, "考号")
+    for res in ordered_map(_ocr_batch, batches, workers=workers, initializer=partial(_init_worker, region.to_tuple())):
+        for stu, text, c in res:
+            ids[stu], conf[stu] = text, c
+        prog.step(len(res))
+
+    # ---- 核对：空结果 / 位数与多数不同 / 重复 ----
+    lengths = Counter(len(t) for t in ids if t)
+    usual = lengths.most_common(1)[0][0] if lengths else 0
+    dup = {t for t, n in Counter(t for t in ids if t).items() if n > 1}
+    review = [i for i, t in enumerate(ids) if not t or len(t) != usual or t in dup]
+
+    data = {
+        "total_students": total,
+        "students": [{"index": i, "stem": index.stem(i), "id": ids[i] or None, "conf": conf[i]} for i in range(total)],
+        "review": review,
+    }
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, out)
+
+    for i in review:
+        print(f"⚠ 第 {i+1} 份考号待核对：{ids[i] or '（未识别）'}")
+    print(f"\n✅ 考号识别完成！{total} 份，待核对 {len(review)} 份，用时 {prog.elapsed():.1f}s → {out}")
+    reset_index()       # 下次取索引时载入新考号
+    return out
+
+
+if __name__ == "__main__":
+    identify()
@@ -0,0 +1,150 @@
+"""
+--+--index
+  +--学生索引（学生下标 ↔ 文件名 ↔ 路径 ↔ 考号 ↔ 尺寸）
+===================================================================
+* 对 stitched/ 只做一次目录扫描，按文件名自然序（纯数字按数值）排出学生下标，
+  之后每次取图都是 O(1) 查表，不再逐个扩展名 `Path.exists()` 试探。
+* 不再假定整卷命名为 1..N：stitch 以数字文件名（如 2023001.jpg）命名的输出同样能被找到。
+* 考号来自 identify 写出的 `student_ids.json`（按文件名对应）；图片宽高只读文件头、首次访问时才取。
+* `student_index()` 为进程内缓存的单例；stitch 重建输出后调用 `reset_index()` 失效。
+
+依赖：OpenCV‑Python、NumPy。
+===================================================================
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from path import CONFIGS_PATH, STITCHED_PATH
+
+ID_INDEX = Path(CONFIGS_PATH, "student_ids.json")
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+@dataclass
+class StudentEntry:
+    index: int                      # 学生下标（0 起）
+    stem: str                       # 文件名主干
+    path: str
+    id: Optional[str] = None        # OCR 考号
+    _size: Optional[Tuple[int, int]] = field(default=None, repr=False)
+
+    @property
+    def size(self) -> Optional[Tuple[int, int]]:
+        """(宽, 高)；只解析文件头，读不出时返回 None"""
+        if self._size is None:
+            self._size = _image_size(self.path)
+        return self._size
+
+
+class StudentIndex:
+    def __init__(self, entries: List[StudentEntry], root: str):
+        self.root = root
+        self.entries = entries
+        self._by_stem: Dict[str, int] = {e.stem: e.index for e in entries}
+        self._by_id: Dict[str, int] = {}
+
+    @classmethod
+    def scan(cls, root: str = STITCHED_PATH, ids_path: str | Path = ID_INDEX) -> "StudentIndex":
+        files = []
+        if os.path.isdir(root):
+            with os.scandir(root) as it:
+                files = [(os.path.splitext(e.name)[0], e.path) for e in it
+                         if e.is_file() and os.path.splitext(e.name)[1].lower() in IMAGE_EXTS]
+        files.sort(key=lambda f: _natural_key(f[0]))
+        index = cls([StudentEntry(i, stem, p) for i, (stem, p) in enumerate(files)], root)
+        index._load_ids(Path(ids_path))
+        return index
+
+    def _load_ids(self, path: Path):
+        if not path.exists():
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for ent in data.get("students", []):
+            i = self._by_stem.get(ent.get("stem", ""))
+            if i is not None and ent.get("id"):
+                self.entries[i].id = ent["id"]
+                self._by_id.setdefault(ent["id"], i)
+
+    # ---------- 查询 ---------- #
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getitem__(self, i: int) -> StudentEntry:
+        return self.entries[i]
+
+    def path(self, i: int) -> Path:
+        return Path(self.entries[i].path)
+
+    def stem(self, i: int) -> Optional[str]:
+        return self.entries[i].stem if 0 <= i < len(self.entries) else None
+
+    def read(self, i: int) -> Optional[np.ndarray]:
+        """第 i 名学生的整卷（BGR）；下标越界或无法解码时返回 None"""
+        if not 0 <= i < len(self.entries):
+            return None
+        return cv2.imread(self.entries[i].path)
+
+    def label(self, i: int) -> str:
+        """考号优先，未识别时用序号（1 起）"""
+        sid = self.entries[i].id if 0 <= i < len(self.entries) else None
+        return sid or str(i + 1)
+
+    def find(self, key: str) -> Optional[int]:
+        """按考号或文件名主干查学生下标"""
+        return self._by_id.get(key, self._by_stem.get(key))
+
+
+_CACHE: Dict[str, StudentIndex] = {}
+
+
+def student_index(root: str = STITCHED_PATH) -> StudentIndex:
+    idx = _CACHE.get(root)
+    if idx is None:
+        idx = _CACHE[root] = StudentIndex.scan(root)
+    return idx
+
+
+def reset_index():
+    _CACHE.clear()
+
+# -------------------------------------------------- 辅助 --------------------------------------------------
+
+def _natural_key(stem: str):
+    return tuple((0, int(t), "") if t.isdigit() else (1, 0, t) for t in re.split(r"(\d+)", stem) if t)
+
+
+def _image_size(path: str) -> Optional[Tuple[int, int]]:
+    """从 PNG / JPEG / BMP 文件头读取 (宽, 高)，不解码像素"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(26)
+            if head[:8] == b"\x89PNG\r\n\x1a\n":
+                return struct.unpack(">II", head[16:24])
+            if head[:2] == b"BM":
+                w, h = struct.unpack("<ii", head[18:26])
+                return w, abs(h)
+            if head[:2] == b"\xff\xd8":
+                f.seek(2)
+                while True:
+                    marker = f.read(2)
+                    if len(marker) < 2 or marker[0] != 0xFF:
+                        return None
+                    seg_len = struct.unpack(">H", f.read(2))[0]
+                    if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                        h, w = struct.unpack(">xHH", f.read(5))
+                        return w, h
+                    f.seek(seg_len - 2, os.SEEK_CUR)
+    except (OSError, struct.error):
+        pass
+    return None
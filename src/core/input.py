@@ -7,6 +7,10 @@
 * 自动缩放（Fit‑to‑Window），鼠标坐标 ↔ 原图坐标双向映射。
 * 大题 / 小题 / 连续大题划分逻辑。
 * JSON 结构化保存 & 读取。
+* 考号区域：按 i 后确认的选区记为考号条（id_region），供 identify 做 OCR。
+* 选择题涂卡区（ChoiceGrid）：按 g 后确认的选区记为“行 × 选项”涂卡网格，并在终端录入答案。
+* 事件驱动重绘：已确认的选区 + 标签 + 提示文字缓存为底图（overlay），仅在题目结构变化时重建；
+  鼠标 / 按键只置脏标记，主循环按需 imshow，拖动时只擦除上一帧的临时框四边再画新框。
 
 依赖：OpenCV‑Python ≥4.6、NumPy。
 """
@@ -14,7 +18,7 @@ from __future__ import annotations
 
 import ctypes
 import json
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
 from typing import List, Optional, Tuple
 
@@ -46,10 +50,23 @@ class Region:
         )
 
 
+@dataclass
+class ChoiceGrid:
+    """涂卡网格：区域按 rows 行 × options 列均分，key[i] 为第 i 行正确选项（如 "A"、"BD"）"""
+    rows: int
+    options: int
+    key: List[str]
+    points: int = 1  # 每行分值
+
+    def max_score(self) -> int:
+        return self.rows * self.points
+
+
 @dataclass
 class SubQuestion:
     index: int  # 1‑based
     segments: List[Region] = field(default_factory=list)
+    choice: Optional[ChoiceGrid] = None
 
     @property
     def id(self) -> str:  # 仅返回小题序号，完整 ID 由上级补全
@@ -61,14 +78,16 @@ class Question:
     id: int
     segments: List[Region] = field(default_factory=list)
     subs: List[SubQuestion] = field(default_factory=list)
+    choice: Optional[ChoiceGrid] = None
 
     def add_segment(self, r: Region):
         self.segments.append(r)
 
-    def add_sub(self, r: Region):
+    def add_sub(self, r: Region) -> SubQuestion:
         sq = SubQuestion(len(self.subs) + 1)
         sq.segments.append(r)
         self.subs.append(sq)
+        return sq
 
     def contains(self, r: Region) -> bool:
         return any(seg.contains(r) for seg in self.segments)
@@ -81,16 +100,23 @@ class Redistricting:
     cname = "Redistricting"
     color = {"saved": (0, 0, 0), "temp": (0, 0, 0), "text": (0, 0, 0)}
     wit = {"saved": 1, "temp": 2, "text": 1}
+    FRAME_MS = 15       # 无事件时 waitKey 阻塞的上限（≈60 fps），取代 1 ms 空转
 
     # ---- 屏幕分辨率 & 缩放因子 ---- #
-    _user32 = ctypes.windll.user32
-    _SCREEN_W = _user32.GetSystemMetrics(0)
-    _SCREEN_H = _user32.GetSystemMetrics(1)
+    _DEFAULT_SCREEN = (1920, 1080)  # 非 Windows（无 user32）时按此分辨率缩放
+
+    @classmethod
+    def _screen_size(cls) -> Tuple[int, int]:
+        user32 = getattr(getattr(ctypes, "windll", None), "user32", None)
+        if user32 is None:
+            return cls._DEFAULT_SCREEN
+        return user32.GetSystemMetrics(0), user32.GetSystemMetrics(1)
 
     @classmethod
     def _calc_scale(cls, img_w: int, img_h: int, margin: int = 80) -> float:
-        rw = (cls._SCREEN_W - margin) / img_w
-        rh = (cls._SCREEN_H - margin) / img_h
+        screen_w, screen_h = cls._screen_size()
+        rw = (screen_w - margin) / img_w
+        rh = (screen_h - margin) / img_h
         return min(1.0, rw, rh)
 
     # -------------------------------- #
@@ -118,6 +144,15 @@ class Redistricting:
         self.drawing = False
         self.start_pt = (-1, -1)
         self.merge_next = False
+        self.choice_next = False
+        self.id_next = False
+        self.id_region: Optional[Region] = None
+
+        # 绘制缓存
+        self._overlay: Optional[np.ndarray] = None      # base_display + 已确认选区 + 提示；None 表示需重建
+        self._frame: Optional[np.ndarray] = None        # 当前显示帧 = overlay + 临时框
+        self._temp_box: Optional[Tuple[int, int, int, int]] = None  # 帧上临时框的显示坐标 (x0, y0, x1, y1)
+        self._dirty = True
 
         cv2.namedWindow(self.cname)
         cv2.setMouseCallback(self.cname, self._mouse_cb)
@@ -134,7 +169,9 @@ class Redistricting:
     # ---------- 主循环 ---------- #
     def run(self) -> List[Question]:
         while True:
-            cv2.imshow(self.cname, self._draw())
+            if self._dirty:
+                cv2.imshow(self.cname, self._draw())
+                self._dirty = False
             if not self._wait_key():
                 break
         cv2.destroyAllWindows()
@@ -147,6 +184,7 @@ class Redistricting:
             self.drawing = True
             self.start_pt = (real_x, real_y)
             self.temp_region = Region(real_x, real_y, 0, 0)
+            self._dirty = True
         elif event == cv2.EVENT_MOUSEMOVE and self.drawing:
             x0, y0 = self.start_pt
             self.temp_region = Region(
@@ -155,21 +193,57 @@ class Redistricting:
                 w=abs(real_x - x0),
                 h=abs(real_y - y0),
             )
+            self._dirty = True
         elif event == cv2.EVENT_LBUTTONUP:
             self.drawing = False
 
     # ---------- 绘制 ---------- #
     def _draw(self) -> np.ndarray:
+        """在缓存帧上更新临时框：只还原上一帧临时框的四边，不整图复制"""
+        if self._overlay is None:
+            self._overlay = self._build_overlay()
+            self._frame = self._overlay.copy()
+            self._temp_box = None
+        elif self._temp_box is not None:
+            self._restore_box(self._temp_box)
+            self._temp_box = None
+        if self.temp_region:
+            r = self.temp_region
+            p1 = self._to_display(r.x, r.y)
+            p2 = self._to_display(r.x + r.w, r.y + r.h)
+            cv2.rectangle(self._frame, p1, p2, self.color["temp"], self.wit["temp"])
+            self._temp_box = (*p1, *p2)
+        return self._frame
+
+    def _restore_box(self, box: Tuple[int, int, int, int]):
+        """用 overlay 覆盖矩形框四条边（含线宽）所在的条带"""
+        x0, y0, x1, y1 = box
+        t = self.wit["temp"] + 1
+        h, w = self._frame.shape[:2]
+        xa, xb = max(x0 - t, 0), min(x1 + t + 1, w)
+        ya, yb = max(y0 - t, 0), min(y1 + t + 1, h)
+        for sl in (
+            np.s_[ya : min(y0 + t + 1, h), xa:xb],
+            np.s_[max(y1 - t, 0) : yb, xa:xb],
+            np.s_[ya:yb, xa : min(x0 + t + 1, w)],
+            np.s_[ya:yb, max(x1 - t, 0) : xb],
+        ):
+            self._frame[sl] = self._overlay[sl]
+
+    def _invalidate(self):
+        """题目结构 / 考号区变化后调用：下次绘制时重建 overlay"""
+        self._overlay = None
+        self._dirty = True
+
+    def _build_overlay(self) -> np.ndarray:
         disp = self.base_display.copy()
         for q in self.questions:
             self._draw_question(disp, q)
-        if self.temp_region:
-            p1 = self._to_display(self.temp_region.x, self.temp_region.y)
-            p2 = self._to_display(self.temp_region.x + self.temp_region.w, self.temp_region.y + self.temp_region.h)
-            cv2.rectangle(disp, p1, p2, self.color["temp"], self.wit["temp"])
+        if self.id_region:
+            self._rect_with_label(disp, self.id_region, "ID")
         cv2.putText(
             disp,
-            "↵ 保存 / esc 退出 / r 撤销 / c 并入上一题",
+            "↵ 保存 / esc 退出 / r 撤销 / c 并入上一题 / g 涂卡区 / i 考号",
             (10, 30),
             cv2.FONT_HERSHEY_SIMPLEX,
             0.6,
@@ -180,9 +254,9 @@ class Redistricting:
 
     def _draw_question(self, canvas: np.ndarray, q: Question):
         for seg in q.segments:
-            self._rect_with_label(canvas, seg, str(q.id))
+            self._rect_with_label(canvas, seg, f"{q.id} MC" if q.choice else str(q.id))
         for sub in q.subs:
-            label = f"{q.id}.{sub.index}"
+            label = f"{q.id}.{sub.index}" + (" MC" if sub.choice else "")
             for seg in sub.segments:
                 self._rect_with_label(canvas, seg, label)
 
@@ -202,15 +276,21 @@ class Redistricting:
 
     # ---------- 键盘 ---------- #
     def _wait_key(self) -> bool:
-        key = cv2.waitKey(1) & 0xFF
+        key = cv2.waitKey(self.FRAME_MS) & 0xFF
         if key == 13:  # ↵
             self._confirm_region()
+            self._dirty = True
         elif key == 27:  # esc
             return False
         elif key == ord("r"):
             self.temp_region = None
+            self._dirty = True
         elif key == ord("c"):
             self.merge_next = True
+        elif key == ord("g"):
+            self.choice_next = True
+        elif key == ord("i"):
+            self.id_next = True
         return True
 
     def _confirm_region(self):
@@ -223,37 +303,74 @@ class Redistricting:
             cv2.destroyWindow("preview")
             self.temp_region = None
             self.merge_next = False
+            self.choice_next = False
+            self.id_next = False
             return
         cv2.destroyWindow("preview")
-        self._dispatch_region(r)
+        if self.id_next:
+            self.id_region = r
+            self.id_next = False
+            self.temp_region = None
+            self._invalidate()
+            return
+        owner = self._dispatch_region(r)
+        self._invalidate()
+        if self.choice_next and owner is None:
+            # 涂卡参数挂在题目上，会作用于该题全部区块，故并入的区块不能单独设为涂卡区
+            print("⚠ 并入上一题的区块不能设为涂卡区，已忽略 g；如需涂卡请单独框选（不按 c）")
+        elif self.choice_next:
+            owner.choice = self._ask_choice()
+        self.choice_next = False
         self.temp_region = None
 
+    @staticmethod
+    def _ask_choice() -> Optional[ChoiceGrid]:
+        """终端录入涂卡参数：选项数 答案 [每行分值]，答案逐字符一行，多选用逗号分隔，如 `4 ABCDA` / `4 A,BD,C 2`"""
+        while True:
+            text = input("涂卡区：选项数 答案 [每行分值]（留空取消）> ").strip()
+            if not text:
+                return None
+            parts = text.split()
+            try:
+                options = int(parts[0])
+                key = parts[1].upper().split(",") if "," in parts[1] else list(parts[1].upper())
+                points = int(parts[2]) if len(parts) > 2 else 1
+            except (IndexError, ValueError):
+                print("格式错误，例如：4 ABCDA")
+                continue
+            letters = {chr(ord("A") + i) for i in range(options)}
+            if any(not k or set(k) - letters for k in key):
+                print(f"答案只能包含 A‑{chr(ord('A') + options - 1)}")
+                continue
+            return ChoiceGrid(len(key), options, key, points)
+
     # ---------- 逻辑分派 ---------- #
-    def _dispatch_region(self, r: Region):
+    def _dispatch_region(self, r: Region) -> Optional[Question | SubQuestion]:
+        """把选区归入题目结构；返回新建的大题 / 小题（并入上一题时返回 None）"""
         # 优先并入上一题（按 'c' 键）
         if self.questions:
             last_q = self.questions[-1]
             if self.merge_next:
                 last_q.add_segment(r)
                 self.merge_next = False
-                return
+                return None
 
         # ----- ① 判断是否落在任何已有大题内 -----
         for q in reversed(self.questions):  # 倒序更符合“离得近优先”
             if q.contains(r):
-                q.add_sub(r)
                 self.merge_next = False
-                return
+                return q.add_sub(r)
 
         # ----- ② 若 self.questions 为空 → 第 1 题 -----
         if not self.questions:
             self.questions.append(Question(1, segments=[r]))
-            return
+            return self.questions[-1]
 
         # ----- ③ 否则作为全新大题 -----
         new_id = self.questions[-1].id + 1
         self.questions.append(Question(new_id, segments=[r]))
         self.merge_next = False
+        return self.questions[-1]
 
     # ---------- 辅助 ---------- #
     @staticmethod
@@ -272,13 +389,17 @@ class Redistricting:
 # --------------------------------------------------
 
 class StudentProcessing:
-    def __init__(self, questions: List[Question], target_dir: str = CONFIGS_PATH, config_name: str = "default.json"):
+    def __init__(self, questions: List[Question], target_dir: str = CONFIGS_PATH, config_name: str = "default.json",
+                 id_region: Optional[Region] = None):
         self.questions = questions
         self.target_dir = Path(target_dir)
         self.config_name = config_name
+        self.id_region = id_region
 
     def save(self):
         obj = {"questions": [self._q2d(q) for q in self.questions]}
+        if self.id_region:
+            obj["id_region"] = self.id_region.to_tuple()
         self.target_dir.mkdir(parents=True, exist_ok=True)
         with open(self.target_dir / self.config_name, "w", encoding="utf-8") as f:
             json.dump(obj, f, ensure_ascii=False, indent=2)
@@ -290,29 +411,46 @@ class StudentProcessing:
             data = json.load(f)
         return [StudentProcessing._d2q(item) for item in data.get("questions", [])]
 
+    @staticmethod
+    def load_id_region(path: str | Path) -> Optional[Region]:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return Region(*data["id_region"]) if data.get("id_region") else None
+
     # --------- 序列化辅助 --------- #
     @staticmethod
     def _q2d(q: Question):
-        return {
+        d = {
             "id": q.id,
             "segments": [seg.to_tuple() for seg in q.segments],
-            "subs": [
-                {
-                    "id": f"{q.id}.{sub.index}",
-                    "segments": [seg.to_tuple() for seg in sub.segments],
-                }
-                for sub in q.subs
-            ],
+            "subs": [StudentProcessing._sub2d(q, sub) for sub in q.subs],
+        }
+        if q.choice:
+            d["choice"] = asdict(q.choice)
+        return d
+
+    @staticmethod
+    def _sub2d(q: Question, sub: SubQuestion):
+        d = {
+            "id": f"{q.id}.{sub.index}",
+            "segments": [seg.to_tuple() for seg in sub.segments],
         }
+        if sub.choice:
+            d["choice"] = asdict(sub.choice)
+        return d
 
     @staticmethod
     def _d2q(d: dict) -> Question:
         q = Question(d["id"])
         q.segments = [Region(*t) for t in d.get("segments", [])]
+        if d.get("choice"):
+            q.choice = ChoiceGrid(**d["choice"])
         for sub_d in d.get("subs", []):
             idx = int(sub_d["id"].split(".")[1])
             sub = SubQuestion(idx)
             sub.segments = [Region(*t) for t in sub_d.get("segments", [])]
+            if sub_d.get("choice"):
+                sub.choice = ChoiceGrid(**sub_d["choice"])
             q.subs.append(sub)
         return q
 
@@ -321,7 +459,7 @@ if __name__ == "__main__":
     red = Redistricting()  # 自动找模板并计算缩放
     qs = red.run()
 
-    sp = StudentProcessing(qs, config_name="default.json")
+    sp = StudentProcessing(qs, config_name="default.json", id_region=red.id_region)
     sp.save()
 
     loaded = StudentProcessing.load(Path(CONFIGS_PATH, "default.json"))
@@ -0,0 +1,163 @@
+"""
+--+--journal
+  +--批改日志（崩溃可恢复）
+===================================================================
+* 追加写 JSONL：每录入一个分数、画 / 撤销一条曲线即写一行并 fsync，崩溃最多丢失正在写的一行。
+* `replay()` 由日志重建 `score_matrix`、`marks` 与当前批改位置（题 / 小题 / 学生）。
+* `compact()` 把日志压缩成 `core/output.py` 读取的 `result.json`。
+
+事件格式（曲线坐标均为整卷坐标，pts 为 strokes.encode 的紧凑编码；旧日志中的点列表仍可读取）：
+    {"ev": "init",   "total_students": S, "total_questions": Q, "max_sub": M}
+    {"ev": "score",  "key": [stu, q, sub], "score": 5}
+    {"ev": "stroke", "key": [stu, q, sub], "pts": "<base64 差分>"}
+    {"ev": "undo",   "key": [stu, q, sub]}
+
+依赖：NumPy。
+===================================================================
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from path import CONFIGS_PATH
+from strokes import ENCODING, encode, to_array
+
+JOURNAL_PATH = Path(CONFIGS_PATH, "result.journal.jsonl")
+RESULT_PATH = Path(CONFIGS_PATH, "result.json")
+
+Key = Tuple[int, int, int]
+Stroke = np.ndarray        # (N,2) int32
+
+
+@dataclass
+class JournalState:
+    total_students: int
+    total_questions: int
+    max_sub: int
+    scores: np.ndarray
+    marks: Dict[Key, List[Stroke]] = field(default_factory=dict)
+    last_scored: Optional[Key] = None
+    scored: Optional[np.ndarray] = None     # 与 scores 同形的 bool：日志中记过分的格子（合并多份日志时区分“未批”与 0 分）
+
+
+class ResultJournal:
+    def __init__(self, path: str | Path = JOURNAL_PATH):
+        self.path = Path(path)
+        self._f = None
+
+    # ---------- 写入 ---------- #
+    def open(self, total_students: int, total_questions: int, max_sub: int):
+        """打开日志用于追加；新日志先写入 init 事件"""
+        fresh = not self.path.exists() or self.path.stat().st_size == 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not fresh:
+            self._truncate_torn_tail()
+        self._f = open(self.path, "a", encoding="utf-8")
+        if fresh:
+            self._write({"ev": "init", "total_students": total_students,
+                         "total_questions": total_questions, "max_sub": max_sub})
+
+    def score(self, key: Key, score: int):
+        self._write({"ev": "score", "key": list(key), "score": int(score)})
+
+    def stroke(self, key: Key, pts: Stroke):
+        self._write({"ev": "stroke", "key": list(key), "pts": encode(pts)})
+
+    def undo(self, key: Key):
+        self._write({"ev": "undo", "key": list(key)})
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def _truncate_torn_tail(self):
+        """截掉崩溃时写了一半的末行，避免新事件接在其后"""
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data.endswith(b"\n"):
+                return
+            f.truncate(data.rfind(b"\n") + 1)
+
+    def _write(self, ev: Dict[str, Any]):
+        self._f.write(json.dumps(ev, separators=(",", ":")) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    # ---------- 读取 ---------- #
+    def exists(self) -> bool:
+        return self.path.exists() and self.path.stat().st_size > 0
+
+    def replay(self) -> JournalState:
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+
+        state: Optional[JournalState] = None
+        for n, line in enumerate(lines):
+            try:
+                ev = json.loads(line)
+            except json.JSONDecodeError:
+                if n == len(lines) - 1:
+                    break           # 崩溃时写了一半的末行，忽略
+                raise ValueError(f"批改日志第 {n+1} 行损坏：{self.path}")
+
+            kind = ev["ev"]
+            if kind == "init":
+                state = JournalState(
+                    ev["total_students"], ev["total_questions"], ev["max_sub"],
+                    np.zeros((ev["total_students"], ev["total_questions"], ev["max_sub"]), dtype=int),
+                )
+                state.scored = np.zeros(state.scores.shape, dtype=bool)
+                continue
+            if state is None:
+                raise ValueError(f"批改日志缺少 init 事件：{self.path}")
+
+            key: Key = tuple(ev["key"])  # type: ignore[assignment]
+            if kind == "score":
+                state.scores[key] = ev["score"]
+                state.scored[key] = True
+                state.last_scored = key
+            elif kind == "stroke":
+                state.marks.setdefault(key, []).append(to_array(ev["pts"]))
+            elif kind == "undo":
+                if state.marks.get(key):
+                    state.marks[key].pop()
+
+        if state is None:
+            raise ValueError(f"批改日志缺少 init 事件：{self.path}")
+        return state
+
+    # ---------- 压缩 ---------- #
+    def compact(self, result_path: str | Path = RESULT_PATH) -> Path:
+        return write_result(self.replay(), result_path)
+
+
+def write_result(state: JournalState, result_path: str | Path = RESULT_PATH) -> Path:
+    """按 output.py 期望的格式写出 result.json（先写临时文件再原子替换）"""
+    # 曲线序列化：每条曲线为 strokes.encode 的 base64 字符串
+    serial_marks = {"|".join(map(str, k)): [encode(stroke) for stroke in v]
+                    for k, v in state.marks.items() if len(v)}
+    result = {
+        "total_students": int(state.total_students),
+        "total_questions": int(state.total_questions),
+        "scores": state.scores.tolist(),
+        "marks": serial_marks,
+        "mark_encoding": ENCODING,
+    }
+    result_path = Path(result_path)
+    result_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = result_path.with_suffix(result_path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, result_path)
+    return result_path
+
+
+if __name__ == "__main__":
+    print("✔ 已由批改日志生成 →", ResultJournal().compact())
@@ -0,0 +1,178 @@
+"""
+--+--omr
+  +--涂卡（选择题）自动识别
+===================================================================
+* 对 `default.json` 中标记为涂卡区（ChoiceGrid）的批改单元，按学生分块批量处理：
+    切片堆叠为 (N, h, w) → 阈值化 → 裁成 rows × options 个格子 → 每格去边后求填涂率 (N, rows, options)。
+* 填涂率 ≥ FILL_ON 视为涂选；落在 [FILL_OFF, FILL_ON) 的格子无法确定，该生本小题交由 Teacher 人工复核。
+* 每行涂选集合与答案完全一致得 points 分，否则 0 分（多涂 / 漏涂均不得分）。
+* 无切片库时经 CropCache 逐份取图：小于模板的切片以白色补齐到区域尺寸，无法读取的卷面记 0 分并列入待复核，
+  不中断整批识别（与 sliced.slice_all 的处理一致）。
+* 分数写入成绩库（store.py），识别结果与待复核名单写入 `data/configs/omr.json`，Teacher 启动时自动套用。
+
+依赖：NumPy。
+===================================================================
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from path import CONFIGS_PATH
+from input import ChoiceGrid, Question, StudentProcessing
+from crop import CropCache
+from sliced import SliceStore
+from index import student_index
+from align import load_alignment
+from store import ResultStore
+
+OMR_JSON = Path(CONFIGS_PATH, "omr.json")
+_PAD = 255          # 切片不足区域尺寸时以白色（无墨迹）补齐
+
+INK_LEVEL = 128     # 灰度低于此值视为涂黑
+CELL_MARGIN = 0.2   # 每格四周各去掉该比例，避开印刷框线
+FILL_ON = 0.35      # 填涂率达到此值视为已涂
+FILL_OFF = 0.15     # 低于此值视为未涂；两者之间为可疑
+CHUNK = 64          # 每批处理的学生数（限制内存占用）
+
+
+def choice_of(q: Question, sub_idx: int) -> Optional[ChoiceGrid]:
+    """批改单元 (q, sub_idx) 的涂卡定义；与 crop.region_of 的遍历规则一致"""
+    return q.subs[sub_idx].choice if q.subs else q.choice
+
+
+def choice_items(questions: List[Question]) -> Dict[Tuple[int, int], ChoiceGrid]:
+    return {
+        (q_idx, sub_idx): g
+        for q_idx, q in enumerate(questions)
+        for sub_idx in range(max(1, len(q.subs)))
+        if (g := choice_of(q, sub_idx)) is not None
+    }
+
+# -------------------------------------------------- 识别 --------------------------------------------------
+
+def fill_ratio(crops: np.ndarray, grid: ChoiceGrid) -> np.ndarray:
+    """crops: (N, h, w[, 3]) uint8 → 每格填涂率 (N, rows, options)"""
+    if crops.ndim == 4:
+        crops = crops.max(axis=-1)      # 三通道都暗才算墨迹，且保持 uint8 不放大内存
+    n, h, w = crops.shape
+    ch, cw = h // grid.rows, w // grid.options
+    ink = crops[:, :ch * grid.rows, :cw * grid.options] < INK_LEVEL
+    cells = ink.reshape(n, grid.rows, ch, grid.options, cw)
+    my, mx = int(ch * CELL_MARGIN), int(cw * CELL_MARGIN)
+    inner = cells[:, :, my:ch - my, :, mx:cw - mx]
+    return inner.mean(axis=(2, 4))
+
+
+def key_mask(grid: ChoiceGrid) -> np.ndarray:
+    """答案转为 (rows, options) 布尔矩阵"""
+    mask = np.zeros((grid.rows, grid.options), dtype=bool)
+    for r, ans in enumerate(grid.key):
+        for ch in ans:
+            mask[r, ord(ch) - ord("A")] = True
+    return mask
+
+
+def grade(fill: np.ndarray, grid: ChoiceGrid) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """返回 (涂选 (N, rows, options) bool, 分数 (N,) int, 待复核 (N,) bool)"""
+    marked = fill >= FILL_ON
+    correct = (marked == key_mask(grid)[None]).all(axis=2)
+    scores = correct.sum(axis=1) * grid.points
+    review = ((fill >= FILL_OFF) & ~marked).any(axis=(1, 2))
+    return marked, scores, review
+
+
+def answers(marked: np.ndarray) -> List[str]:
+    """涂选矩阵转为逐行答案串，行间以逗号分隔，未涂记为 -"""
+    letters = np.array([chr(ord("A") + i) for i in range(marked.shape[-1])])
+    return [",".join("".join(letters[row]) or "-" for row in sheet) for sheet in marked]
+
+# -------------------------------------------------- 入口 --------------------------------------------------
+
+def _stack_crops(source: CropCache, q_idx: int, sub_idx: int, start: int, stop: int
+                 ) -> Tuple[np.ndarray, np.ndarray]:
+    """学生 [start, stop) 的切片补齐为 (N, h, w, 3)；返回 (切片, 卷面缺失 (N,) bool)"""
+    r = source.regions[(q_idx, sub_idx)]
+    batch = np.full((stop - start, r.h, r.w, 3), _PAD, dtype=np.uint8)
+    missing = np.zeros(stop - start, dtype=bool)
+    for i, stu in enumerate(range(start, stop)):
+        try:
+            img = source.get(stu, q_idx, sub_idx)[0]
+        except FileNotFoundError:
+            missing[i] = True
+            continue
+        h, w = min(img.shape[0], r.h), min(img.shape[1], r.w)
+        batch[i, :h, :w] = img[:h, :w].reshape(h, w, -1)
+    return batch, missing
+
+
+def recognize_all(config: str | Path = Path(CONFIGS_PATH, "default.json"), out: str | Path = OMR_JSON):
+    questions: List[Question] = StudentProcessing.load(config)
+    items = choice_items(questions)
+    if not items:
+        print("ℹ default.json 中没有涂卡区，跳过。")
+        return
+    index = student_index()
+    total = len(index)
+    source = SliceStore.open(questions, total) or CropCache(questions, index.read, total, transform=load_alignment())
+    max_sub = max(max(len(q.subs), 1) for q in questions)
+
+    result: Dict[str, Dict] = {}
+    unreadable = np.zeros(total, dtype=bool)
+    try:
+        with ResultStore() as store:
+            store.ensure_shape(total, len(questions), max_sub)
+            for (q_idx, sub_idx), grid in items.items():
+                scores = np.zeros(total, dtype=int)
+                review = np.zeros(total, dtype=bool)
+                sheets: List[str] = []
+                for start in range(0, total, CHUNK):
+                    stop = min(start + CHUNK, total)
+                    if isinstance(source, SliceStore):
+                        batch = np.asarray(source.column(q_idx, sub_idx)[start:stop])
+                        missing = np.zeros(stop - start, dtype=bool)
+                    else:
+                        batch, missing = _stack_crops(source, q_idx, sub_idx, start, stop)
+                    marked, scores[start:stop], review[start:stop] = grade(fill_ratio(batch, grid), grid)
+                    scores[start:stop][missing] = 0
+                    review[start:stop] |= missing
+                    unreadable[start:stop] |= missing
+                    sheets += answers(marked)
+
+                store.set_scores(((s, q_idx, sub_idx), scores[s]) for s in range(total))
+                result[f"{q_idx}|{sub_idx}"] = {
+                    "scores": scores.tolist(),
+                    "review": np.flatnonzero(review).tolist(),
+                    "answers": sheets,
+                }
+                print(f"✔ 第 {q_idx+1} 题第 {sub_idx+1} 小题：均分 {scores.mean():.2f} / {grid.max_score()}，"
+                      f"待复核 {int(review.sum())} 份")
+    finally:
+        source.close()
+    if unreadable.any():
+        print(f"⚠ 无法读取 {int(unreadable.sum())} 份卷面（第 {', '.join(str(i + 1) for i in np.flatnonzero(unreadable))} 份），"
+              f"已记 0 分并列入待复核")
+
+    Path(out).parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"total_students": total, "items": result}, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 涂卡识别完成！→ {out}")
+
+
+def load_omr(total_students: int, path: str | Path = OMR_JSON) -> Optional[Dict[Tuple[int, int], Dict]]:
+    """读取 omr.json；不存在或学生数不符时返回 None"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("total_students") != total_students:
+        return None
+    return {tuple(map(int, k.split("|"))): v for k, v in data["items"].items()}  # type: ignore[misc]
+
+
+if __name__ == "__main__":
+    recognize_all()
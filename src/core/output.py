@@ -2,37 +2,54 @@
 --+--output
   +--输出脚本  v2.1  （成绩导表 + 自动“标分上图”）
 ===================================================================
-1. **成绩导表** (`export_excel`) —— 与 v1.8 相同，默认仅导出大题列，`EXPORT_SUBS=True` 可含小题。
+1. **成绩导表** (`export_excel`) —— 默认仅导出大题列，`EXPORT_SUBS=True` 可含小题；基于分数张量整列计算（analysis.py），
+   输出三张表：成绩（含总分、名次）、题目分析（平均分 / 标准差 / 难度 / 区分度 / 题总相关）、分数分布。
 2. **自动标分 & 批注写图** (`save_all_marked_images`)
    * 读取 `src/data/configs/default.json`（若有 `questions.json` 优先）的大题/小题坐标。
    * 读取 `result.json` 的 `scores` 矩阵 → 每题 / 小题得分。
-   * 在 `src/data/stitched/1.png、2.png…` 原卷上：
+   * 在 `src/data/stitched/` 原卷上（学生下标 → 文件经 index.py 查表）：
        - 用红框圈出大题区块，并在左上角写“大题总分”。
        - 在每个小题框左上角写对应得分（绿色）。
    * 叠加手工自由曲线记号：`result.json['marks']` 中的 `"stu|q|sub"` → 点集数组。
-   * 输出至 `src/data/save/{学生序号}_{原文件名}`，目录自动创建。
-
-依赖：pandas、openpyxl、opencv-python、numpy
+   * 输出至 `src/data/save/{考号或学生序号}_{原文件名}`，目录自动创建（考号来自学生索引）。
+   * 进程池并行渲染 / 编码（在途任务有上限、按学生顺序落盘），结束时报告张数、字节数与吞吐量。
+   * `ExportOptions`：输出格式（jpg / png / webp，默认沿用原图）、JPEG / WebP 质量、PNG 压缩级别；
+     `regions_only=True` 时只输出带手工批注的大题区块 `{考号或学生序号}_{原文件名}_{大题}_{区块}.{ext}`
+     （带原文件名：OCR 考号重复时也不会互相覆盖）。
+3. **合并 PDF** (`export_pdf`) —— 批注后的整卷逐页流式写入一个 PDF（有 `classes.json` 时每班一个），
+   每页只做一次 JPEG 编码并原样嵌入，峰值内存与学生数无关。
+   * 存在 `align.json` 时先把卷面按对齐变换校正到模板坐标系，框线 / 分数 / 曲线与批改时所见位置一致。
+4. **读取层** (`_open_store`) —— 成绩 / 批注统一经 `result.db`（SQLite，见 store.py）按索引读取；
+   仅当 `result.json` 晚于数据库最后一次写入时才重新导入（整体替换），旧流程产出的 JSON 仍可直接使用；
+   omr 等直接写入数据库的分数不会被较旧的 JSON 覆盖。
+
+依赖：opencv-python、numpy；pandas、openpyxl 仅 export_excel 需要（调用时才导入，mark / pdf 不加载）。
 ===================================================================
 """
 from __future__ import annotations
 
 import json
-import os
+from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import cv2
 import numpy as np
-import pandas as pd
 
-from path import CONFIGS_PATH, RESULTS_PATH, DATA_PATH, STUDENTS_PATH, STITCHED_PATH, WORK_PATH
+from path import CONFIGS_PATH, RESULTS_PATH, DATA_PATH, WORK_PATH
+from store import RESULT_DB, ResultStore
+from pool import Progress, ordered_map, in_worker
+from pdf import PdfStreamWriter
+from analysis import distribution, full_marks, item_stats, ranks, score_columns
+from align import Alignment, load_alignment, warp_page
+from index import student_index
 
 # -------------------------------------------------- 常量 --------------------------------------------------
 RESULT_JSON = Path(CONFIGS_PATH) / "result.json"
 RESULT_XLSX = Path(RESULTS_PATH) / "result.xlsx"
 SAVE_DIR = Path(DATA_PATH) / "save"
-SAVE_DIR.mkdir(parents=True, exist_ok=True)
+CLASSES_JSON = Path(CONFIGS_PATH) / "classes.json"   # 可选：{"班级名": [学生序号(1 起), ...]}
 
 _RED = (0, 0, 255)     # BGR
 _GREEN = (0, 255, 0)
@@ -42,6 +59,31 @@ _FONT = cv2.FONT_HERSHEY_SIMPLEX
 
 EXPORT_SUBS = False  # True → Excel 里包含小题列
 
+_ALIGN: Optional[Alignment] = None  # 渲染进程内的对齐变换（_init_worker 载入）
+
+
+@dataclass
+class ExportOptions:
+    fmt: Optional[str] = None          # None → 沿用原图格式；可选 "jpg" / "png" / "webp"
+    jpeg_quality: int = 95
+    png_compression: int = 3           # 0‑9
+    webp_quality: int = 90
+    regions_only: bool = False         # True → 只输出带手工批注的大题区块
+    workers: Optional[int] = None      # 并行进程数（默认 CPU 核数）
+
+    def ext(self, src: Path) -> str:
+        return f".{self.fmt.lower().lstrip('.')}" if self.fmt else src.suffix
+
+    def params(self, ext: str) -> List[int]:
+        ext = ext.lower()
+        if ext in (".jpg", ".jpeg"):
+            return [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        if ext == ".png":
+            return [cv2.IMWRITE_PNG_COMPRESSION, self.png_compression]
+        if ext == ".webp":
+            return [cv2.IMWRITE_WEBP_QUALITY, self.webp_quality]
+        return []
+
 # -------------------------------------------------- 工具 --------------------------------------------------
 
 def _pretty_path(p: Path) -> str:
@@ -53,66 +95,86 @@ def _pretty_path(p: Path) -> str:
     return str(p)
 
 
-def _nat_key(seg: str):
-    return int(seg) if seg.isdigit() else seg
+# -------------------------------------------------- JSON 读取 --------------------------------------------------
+
+def _open_store() -> ResultStore:
+    """打开 result.db；result.json 晚于数据库最后一次写入（或数据库尚不存在）时先导入"""
+    if not RESULT_JSON.exists() and not RESULT_DB.exists():
+        raise FileNotFoundError("未找到 result.json / result.db！请先运行批改流程。")
+    store = ResultStore(RESULT_DB)
+    if RESULT_JSON.exists() and store.needs_import(RESULT_JSON):
+        store.import_json(RESULT_JSON)
+    return store
 
 
-def _natural_sort(cols: List[str]) -> List[str]:
-    others = [c for c in cols if c not in ("学生", "总分")]
-    others.sort(key=lambda x: tuple(_nat_key(s) for s in x.split('.')))
-    return ["学生"] + others + (["总分"] if "总分" in cols else [])
+# -------------------------------------------------- Excel 导出 --------------------------------------------------
 
-# -------------------------------------------------- JSON 读取 --------------------------------------------------
+def _sub_counts(q_map: Dict[str, Any], total_q: int) -> List[int]:
+    return [len(q_map.get(str(q + 1), {}).get("subs", [])) for q in range(total_q)]
 
-def _load_result_raw() -> Dict[str, Any]:
-    if not RESULT_JSON.exists():
-        raise FileNotFoundError("未找到 result.json！请先运行批改流程。")
-    with open(RESULT_JSON, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def _from_matrix(obj: Dict[str, Any]) -> List[Dict]:
-    mat: List[List[List[Any]]] = obj.get("scores", [])
-    total_q: int = obj.get("total_questions", 0)
-    res: List[Dict] = []
-    for s_idx, stu_q_scores in enumerate(mat, 1):
-        scores_flat: Dict[str, float] = {}
-        for q_idx in range(total_q):
-            subs = stu_q_scores[q_idx] if q_idx < len(stu_q_scores) else []
-            if not isinstance(subs, list):
-                subs = []
-            big_id = str(q_idx + 1)
-            scores_flat[big_id] = sum(subs)
-            for sub_idx, val in enumerate(subs, 1):
-                scores_flat[f"{big_id}.{sub_idx}"] = val
-        res.append({"student": f"学生{s_idx}", "scores": scores_flat})
-    return res
-
-
-def _load_result_for_excel() -> List[Dict]:
-    raw = _load_result_raw()
-    if "scores" in raw and isinstance(raw["scores"], list):
-        return _from_matrix(raw)
-    raise ValueError("当前版本仅支持批改流程导出的矩阵格式 result.json！")
 
-# -------------------------------------------------- Excel 导出 --------------------------------------------------
+def _configured_full(q_map: Dict[str, Any], names: List[str]) -> np.ndarray:
+    """配置中可知的满分（涂卡区 rows × points）；未知为 0"""
+    def grid_full(d: Dict[str, Any]) -> float:
+        g = d.get("choice")
+        return float(g["rows"] * g.get("points", 1)) if g else 0.0
+
+    full = np.zeros(len(names))
+    for i, name in enumerate(names):
+        qid, _, sub = name.partition(".")
+        q_cfg = q_map.get(qid, {})
+        subs = q_cfg.get("subs", [])
+        if sub:
+            full[i] = grid_full(subs[int(sub) - 1]) if int(sub) <= len(subs) else 0.0
+        elif subs:
+            parts = [grid_full(d) for d in subs]
+            full[i] = sum(parts) if all(parts) else 0.0
+        else:
+            full[i] = grid_full(q_cfg)
+    return full
+
 
 def export_excel():
-    rows = []
-    for stu in _load_result_for_excel():
-        row = {"学生": stu["student"]}
-        for k, v in stu["scores"].items():
-            if not EXPORT_SUBS and "." in k:
-                continue
-            row[k] = v
-        row["总分"] = sum(v for k, v in row.items() if k.isdigit())
-        rows.append(row)
+    """成绩 / 题目分析 / 分数分布 三张工作表，统计全部基于分数张量整列计算"""
+    import pandas as pd     # 只有导表需要 pandas，mark / pdf 不为它付启动时间
+
+    with _open_store() as store:
+        tensor = store.score_tensor()
+    total_s, total_q, _ = tensor.shape
+    try:
+        q_map = _load_questions_cfg()
+    except FileNotFoundError:
+        q_map = {}
+
+    cols = score_columns(tensor, _sub_counts(q_map, total_q), with_subs=EXPORT_SUBS)
+    total = cols.matrix[:, cols.is_question].sum(axis=1)
+    index = student_index()
+    labels = [(index[i].id if i < len(index) else None) or f"学生{i + 1}" for i in range(total_s)]
+
+    scores_df = pd.DataFrame(cols.matrix, columns=cols.names)
+    scores_df.insert(0, "学生", labels)
+    scores_df["总分"] = total
+    scores_df["排名"] = ranks(total)
+
+    # 题目分析：各列 + 总分一行
+    full = full_marks(cols.matrix, _configured_full(q_map, cols.names))
+    items = np.column_stack([cols.matrix, total])
+    full_all = np.append(full, full[cols.is_question].sum())
+    stats = item_stats(items, total, full_all)
+    items_df = pd.DataFrame(stats)
+    items_df.insert(0, "题目", cols.names + ["总分"])
+    items_df = items_df.round(3)
+
+    seg, counts, share, cum = distribution(total, full_all[-1])
+    dist_df = pd.DataFrame({"分数段": seg, "人数": counts, "占比": share.round(4), "累计占比": cum.round(4)})
 
-    cols = _natural_sort(list({c for r in rows for c in r}))
-    df = pd.DataFrame(rows)[cols]
     RESULT_XLSX.parent.mkdir(parents=True, exist_ok=True)
-    df.to_excel(RESULT_XLSX, sheet_name="Sheet1", index=False)
-    print("✔ 成绩表已导出 →", _pretty_path(RESULT_XLSX))
+    with pd.ExcelWriter(RESULT_XLSX) as writer:
+        scores_df.to_excel(writer, sheet_name="成绩", index=False)
+        items_df.to_excel(writer, sheet_name="题目分析", index=False)
+        dist_df.to_excel(writer, sheet_name="分数分布", index=False)
+    print("✔ 成绩表已导出 →", _pretty_path(RESULT_XLSX),
+          f"（{total_s} 人，平均分 {total.mean() if total_s else 0:.2f}）")
 
 # -------------------------------------------------- 题目坐标 --------------------------------------------------
 
@@ -125,13 +187,11 @@ def _load_questions_cfg() -> Dict[str, Any]:
 # -------------------------------------------------- 图片 I/O --------------------------------------------------
 
 def _read_stitched(stu_idx: int) -> Tuple[np.ndarray, Path]:
-    base = Path(STITCHED_PATH, f"{stu_idx+1}")
-    for ext in (".png", ".jpg", ".jpeg", ".bmp"):
-        p = base.with_suffix(ext)
-        if p.exists():
-            img = cv2.imread(str(p))
-            return img, p
-    raise FileNotFoundError(f"未找到学生卷面：{base}.[png/jpg/jpeg/bmp]")
+    index = student_index()
+    img = index.read(stu_idx)
+    if img is None:
+        raise FileNotFoundError(f"未找到学生卷面：第 {stu_idx+1} 份（stitched/ 共 {len(index)} 份）")
+    return img, index.path(stu_idx)
 
 # -------------------------------------------------- 批注绘制 --------------------------------------------------
 
@@ -156,46 +216,165 @@ def _draw_polyline(img: np.ndarray, pts: List[List[int]]):
     if len(pts) < 2:
         return
     arr = np.array(pts, dtype=np.int32).reshape((-1, 1, 2))
-    cv2.polylines(img, [arr], isClosed=False, color=_BLUE, thickness=_THICK)
+    _draw_polylines(img, [arr])
+
+
+def _draw_polylines(img: np.ndarray, strokes: List[np.ndarray]):
+    """同一颜色的多条曲线一次 cv2.polylines 画完；strokes 为 (N,1,2) int32 数组"""
+    if strokes:
+        cv2.polylines(img, strokes, isClosed=False, color=_BLUE, thickness=_THICK)
 
 # -------------------------------------------------- 主批注函数 --------------------------------------------------
 
-def save_all_marked_images():
-    raw = _load_result_raw()
-    scores_mat: List[List[List[Any]]] = raw["scores"]
-    marks_dict: Dict[str, Any] = raw.get("marks", {})
+def _render_marked(stu_idx: int, q_scores_row: List[List[Any]], strokes: List[np.ndarray],
+                   q_map: Dict[str, Any]) -> Tuple[np.ndarray, Path]:
+    """读取整卷并画上分数与手工批注"""
+    img, src_path = _read_stitched(stu_idx)
+    # ---- 对齐：批注坐标均为模板坐标 ----
+    M = _ALIGN(stu_idx) if _ALIGN else None
+    if M is not None:
+        img = warp_page(img, M, _ALIGN.template_size)
+    # ---- 自动标分 ----
+    for q_idx, q_scores in enumerate(q_scores_row):
+        q_cfg = q_map.get(str(q_idx + 1))
+        if q_cfg:
+            _draw_scores(img, q_cfg, q_scores)
+    # ---- 叠加手工 marks ----
+    _draw_polylines(img, strokes)
+    return img, src_path
+
+
+def _annotated_regions(q_map: Dict[str, Any], strokes: List[np.ndarray]):
+    """与任一曲线外接框相交的大题区块：yield (大题号, 区块序号, (x, y, w, h))"""
+    if not strokes:
+        return
+    boxes = np.array([[s[:, 0, 0].min(), s[:, 0, 1].min(), s[:, 0, 0].max(), s[:, 0, 1].max()] for s in strokes])
+    for qid, q_cfg in q_map.items():
+        for seg_i, (x, y, w, h) in enumerate(q_cfg.get("segments", []), 1):
+            hit = (boxes[:, 0] <= x + w) & (boxes[:, 2] >= x) & (boxes[:, 1] <= y + h) & (boxes[:, 3] >= y)
+            if hit.any():
+                yield qid, seg_i, (x, y, w, h)
+
+
+def _init_worker():
+    global _ALIGN
+    if in_worker():
+        cv2.setNumThreads(1)    # 并行度由进程池提供；串行执行时不限制主进程
+    _ALIGN = load_alignment()
+
+
+def _export_one(job: Tuple[int, str, List[List[Any]], List[np.ndarray]], q_map: Dict[str, Any],
+                opts: ExportOptions, save_dir: Path) -> Tuple[List[Path], int, Optional[str]]:
+    """渲染并编码一名学生；返回 (输出路径, 字节数, 错误信息)"""
+    stu_idx, label, q_scores_row, strokes = job
+    try:
+        img, src_path = _render_marked(stu_idx, q_scores_row, strokes, q_map)
+    except FileNotFoundError as e:
+        return [], 0, str(e)
+
+    ext = opts.ext(src_path)
+    if opts.regions_only:
+        outputs = [(save_dir / f"{label}_{src_path.stem}_{qid}_{seg_i}{ext}", img[y:y + h, x:x + w])
+                   for qid, seg_i, (x, y, w, h) in _annotated_regions(q_map, strokes)]
+    else:
+        outputs = [(save_dir / f"{label}_{src_path.stem}{ext}", img)]
+
+    written, size = [], 0
+    for dst, mat in outputs:
+        ok, buf = cv2.imencode(ext, mat, opts.params(ext))
+        if not ok:
+            return written, size, f"编码失败：{dst}"
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        buf.tofile(str(dst))
+        written.append(dst)
+        size += buf.size
+    return written, size, None
+
+
+def save_all_marked_images(opts: Optional[ExportOptions] = None):
+    opts = opts or ExportOptions()
+    with _open_store() as store:
+        scores_mat: List[List[List[Any]]] = store.score_list()
+        marks_by_stu = store.marks_by_student()     # 一次解析，按学生分组
     q_map = _load_questions_cfg()
 
     total_students = len(scores_mat)
-    for stu_idx in range(total_students):
-        try:
-            img, src_path = _read_stitched(stu_idx)
-        except FileNotFoundError as e:
-            print("⚠", e)
-            continue
-
-        # ---- 自动标分 ----
-        for q_idx, q_scores in enumerate(scores_mat[stu_idx]):
-            q_cfg = q_map.get(str(q_idx + 1))
-            if q_cfg:
-                _draw_scores(img, q_cfg, q_scores)
-
-        # ---- 叠加手工 marks ----
-        for key, strokes in marks_dict.items():
-            try:
-                s, q, sub = map(int, key.split("|"))
-            except ValueError:
-                continue
-            if s != stu_idx:
+    index = student_index()
+    jobs = ((i, index.label(i), scores_mat[i], marks_by_stu.get(i, [])) for i in range(total_students))
+    worker = partial(_export_one, q_map=q_map, opts=opts, save_dir=SAVE_DIR)
+
+    prog = Progress(total_students, "批注图")
+    n_files = n_bytes = 0
+    for paths, size, err in ordered_map(worker, jobs, workers=opts.workers, initializer=_init_worker):
+        if err:
+            print("⚠", err)
+        for dst in paths:
+            print("✔ 批注图已保存 →", _pretty_path(dst))
+        n_files += len(paths)
+        n_bytes += size
+        prog.step()
+
+    print(f"✔ 共输出 {n_files} 个文件，{n_bytes / 2**20:.1f} MB，"
+          f"用时 {prog.elapsed():.1f}s（{prog.rate():.1f} 份/秒）")
+
+# -------------------------------------------------- 合并 PDF --------------------------------------------------
+
+def _load_classes(total_students: int) -> Dict[str, List[int]]:
+    """班级名 -> 学生下标（0 起）；无 classes.json 时全体学生合为一个 marked.pdf"""
+    if not CLASSES_JSON.exists():
+        return {"marked": list(range(total_students))}
+    with open(CLASSES_JSON, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {str(name): [i - 1 for i in ids if 1 <= i <= total_students] for name, ids in data.items()}
+
+
+def _render_jpeg(job: Tuple[str, int, List[List[Any]], List[np.ndarray]], q_map: Dict[str, Any],
+                 quality: int) -> Tuple[str, Optional[bytes], int, int, Optional[str]]:
+    """渲染一名学生并编码为 JPEG；返回 (班级, JPEG 字节, 宽, 高, 错误信息)"""
+    cls, stu_idx, q_scores_row, strokes = job
+    try:
+        img, _ = _render_marked(stu_idx, q_scores_row, strokes, q_map)
+    except FileNotFoundError as e:
+        return cls, None, 0, 0, str(e)
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        return cls, None, 0, 0, f"JPEG 编码失败：第 {stu_idx+1} 份"
+    h, w = img.shape[:2]
+    return cls, buf.tobytes(), w, h, None
+
+
+def export_pdf(quality: int = 90, dpi: int = 150, workers: Optional[int] = None) -> List[Path]:
+    with _open_store() as store:
+        scores_mat: List[List[List[Any]]] = store.score_list()
+        marks_by_stu = store.marks_by_student()
+    q_map = _load_questions_cfg()
+    classes = _load_classes(len(scores_mat))
+
+    jobs = ((cls, i, scores_mat[i], marks_by_stu.get(i, [])) for cls, members in classes.items() for i in members)
+    worker = partial(_render_jpeg, q_map=q_map, quality=quality)
+    prog = Progress(sum(len(m) for m in classes.values()), "PDF 页")
+
+    written: List[Path] = []
+    pdf: Optional[PdfStreamWriter] = None
+    cur_cls: Optional[str] = None
+    try:
+        for cls, data, w, h, err in ordered_map(worker, jobs, workers=workers, initializer=_init_worker):
+            if cls != cur_cls:                  # 按班级顺序产出，切换班级即换文件
+                if pdf is not None:
+                    pdf.close()
+                    print("✔ PDF 已保存 →", _pretty_path(pdf.path), f"（{pdf.page_count} 页）")
+                pdf, cur_cls = PdfStreamWriter(SAVE_DIR / f"{cls}.pdf", dpi=dpi), cls
+                written.append(pdf.path)
+            prog.step()
+            if err:
+                print("⚠", err)
                 continue
-            for stroke in strokes:
-                _draw_polyline(img, stroke)
-
-        # ---- 保存 ----
-        dst = SAVE_DIR / f"{stu_idx+1}_{src_path.name}"
-        dst.parent.mkdir(parents=True, exist_ok=True)
-        cv2.imwrite(str(dst), img)
-        print("✔ 批注图已保存 →", _pretty_path(dst))
+            pdf.add_jpeg(data, w, h)
+    finally:
+        if pdf is not None:
+            pdf.close()
+            print("✔ PDF 已保存 →", _pretty_path(pdf.path), f"（{pdf.page_count} 页）")
+    return written
 
 # -------------------------------------------------- CLI --------------------------------------------------
 if __name__ == "__main__":
@@ -0,0 +1,248 @@
+"""
+--+--partition
+  +--多人分题批改（认领 + 合并）
+===================================================================
+* 协调库 `data/configs/partition.db`（SQLite，WAL）：每个 (大题, 小题) 一行，记录认领人与状态 open / claimed / done。
+  认领用 `BEGIN IMMEDIATE` 的短事务完成，多台机器共享同一目录时也不会重复认领。
+* 每位阅卷人只写自己的批改日志 `data/configs/graders/{姓名}.journal.jsonl`，批改过程中互不加锁；
+  协调库只在认领 / 完成时各写一次。
+* `Teacher(grader="张三")` 循环认领 → 批改 → 完成，直到没有可认领的小题；`claim="question"` 时一次认领整道大题。
+* `merge()` 把全部阅卷人日志合并为 result.json（及 result.db）：
+    - 按阅卷人姓名排序处理，结果与日志发现顺序无关；
+    - 每个小题以协调库中的认领人为准；
+    - 同一格被多人记分且分数不同、或由非认领人记分，列为冲突写入 `merge_conflicts.json`（认领人的分数优先）；
+    - 尚未完成的小题给出提示。
+
+依赖：sqlite3（标准库）、NumPy。
+===================================================================
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from path import CONFIGS_PATH
+from journal import RESULT_PATH, JournalState, ResultJournal, write_result
+from store import ResultStore
+
+PARTITION_DB = Path(CONFIGS_PATH, "partition.db")
+GRADERS_DIR = Path(CONFIGS_PATH, "graders")
+CONFLICTS_PATH = Path(CONFIGS_PATH, "merge_conflicts.json")
+CLAIM_UNITS = ("sub", "question")
+
+Item = Tuple[int, int]      # (大题, 小题)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    q          INTEGER NOT NULL,
+    sub        INTEGER NOT NULL,
+    status     TEXT    NOT NULL DEFAULT 'open',
+    grader     TEXT,
+    claimed_at REAL,
+    done_at    REAL,
+    PRIMARY KEY (q, sub)
+) WITHOUT ROWID;
+"""
+
+
+def check_grader(name: str) -> str:
+    """阅卷人姓名同时用作日志文件名，只允许字母、数字、汉字、下划线与连字符"""
+    if not re.fullmatch(r"[\w\-]+", name or ""):
+        raise ValueError(f"阅卷人姓名不合法：{name!r}（只允许字母、数字、汉字、_ 和 -）")
+    return name
+
+
+def grader_journal(name: str) -> Path:
+    return GRADERS_DIR / f"{check_grader(name)}.journal.jsonl"
+
+
+class Coordinator:
+    def __init__(self, path: str | Path = PARTITION_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None：事务由 BEGIN IMMEDIATE 显式控制；timeout 内等待其他阅卷人的短事务
+        self.conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- 初始化 ---------- #
+    def shape(self) -> Tuple[int, int, int]:
+        meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+        return meta.get("total_students", 0), meta.get("total_questions", 0), meta.get("max_sub", 1)
+
+    def ensure(self, total_students: int, sub_counts: Sequence[int]):
+        """首次使用时登记全部小题；已登记时核对学生数与题目结构"""
+        shape = (total_students, len(sub_counts), max(sub_counts, default=1))
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.conn.execute("SELECT COUNT(*) FROM meta").fetchone()[0] == 0:
+                self.conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                                      zip(("total_students", "total_questions", "max_sub"), shape))
+                self.conn.executemany("INSERT INTO items (q, sub) VALUES (?, ?)",
+                                      ((q, s) for q, n in enumerate(sub_counts) for s in range(n)))
+            elif self.shape() != shape:
+                raise ValueError(f"协调库与当前配置 / 学生数不一致，请确认后删除 {self.path} 重新分题！")
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    # ---------- 认领 ---------- #
+    def claim(self, grader: str, unit: str = "sub") -> Optional[Item]:
+        """返回该阅卷人下一个要批的小题：优先未完成的自有认领，否则认领新的；全部认领完返回 None"""
+        if unit not in CLAIM_UNITS:
+            raise ValueError(f"认领单位只能是 {CLAIM_UNITS}")
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT q, sub FROM items WHERE status = 'claimed' AND grader = ? ORDER BY q, sub LIMIT 1", (grader,)
+            ).fetchone()
+            if row is None:
+                row = self.conn.execute("SELECT q, sub FROM items WHERE status = 'open' ORDER BY q, sub LIMIT 1").fetchone()
+                if row is not None:
+                    where, args = ("q = ? AND status = 'open'", (row[0],)) if unit == "question" \
+                        else ("q = ? AND sub = ? AND status = 'open'", row)
+                    self.conn.execute(f"UPDATE items SET status = 'claimed', grader = ?, claimed_at = ? WHERE {where}",
+                                      (grader, time.time(), *args))
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return tuple(row) if row else None  # type: ignore[return-value]
+
+    def complete(self, grader: str, item: Item):
+        cur = self.conn.execute("UPDATE items SET status = 'done', done_at = ? WHERE q = ? AND sub = ? AND grader = ?",
+                                (time.time(), *item, grader))
+        if cur.rowcount != 1:
+            raise RuntimeError(f"第 {item[0]+1} 题第 {item[1]+1} 小题不属于 {grader}，可能已被释放后重新认领！")
+
+    def release(self, grader: str) -> int:
+        """放回该阅卷人认领但未完成的小题（阅卷人离开时使用），返回放回数"""
+        return self.conn.execute(
+            "UPDATE items SET status = 'open', grader = NULL, claimed_at = NULL WHERE status = 'claimed' AND grader = ?",
+            (grader,),
+        ).rowcount
+
+    # ---------- 查询 ---------- #
+    def items(self) -> List[Tuple[int, int, str, Optional[str]]]:
+        """[(大题, 小题, 状态, 认领人)]，按题目顺序"""
+        return self.conn.execute("SELECT q, sub, status, grader FROM items ORDER BY q, sub").fetchall()
+
+    def summary(self) -> str:
+        lines = []
+        for grader, status, n in self.conn.execute(
+            "SELECT COALESCE(grader, '（未认领）'), status, COUNT(*) FROM items GROUP BY grader, status ORDER BY grader, status"
+        ):
+            lines.append(f"  {grader:<12} {status:<8} {n}")
+        return "\n".join(lines)
+
+# -------------------------------------------------- 合并 --------------------------------------------------
+
+@dataclass
+class MergeReport:
+    graders: List[str]
+    conflicts: List[Dict] = field(default_factory=list)
+    unfinished: List[Dict] = field(default_factory=list)
+
+
+def merge(db: str | Path = PARTITION_DB, graders_dir: str | Path = GRADERS_DIR,
+          out: str | Path = RESULT_PATH, conflicts_path: str | Path = CONFLICTS_PATH) -> MergeReport:
+    """把各阅卷人日志确定性地合并为 result.json / result.db"""
+    with Coordinator(db) as coord:
+        shape = coord.shape()
+        items = coord.items()
+    if not items:
+        raise RuntimeError(f"协调库为空：{db}，请先以 --grader 启动批改。")
+
+    paths = sorted(Path(graders_dir).glob("*.journal.jsonl"))
+    names = [p.name[:-len(".journal.jsonl")] for p in paths]
+    states: List[JournalState] = []
+    for name, p in zip(names, paths):
+        st = ResultJournal(p).replay()
+        if (st.total_students, st.total_questions, st.max_sub) != shape:
+            raise ValueError(f"{name} 的批改日志与协调库的学生数 / 题目结构不一致：{p}")
+        states.append(st)
+    gid = {n: i for i, n in enumerate(names)}
+
+    s, q, m = shape
+    owner = np.full((q, m), -1, dtype=int)          # 每个小题的认领人（日志下标），-1 为无人 / 无日志
+    report = MergeReport(names)
+    for qi, sub, status, grader in items:
+        owner[qi, sub] = gid.get(grader, -1)
+        if status != "done":
+            report.unfinished.append({"q": qi + 1, "sub": sub + 1, "status": status, "grader": grader})
+
+    # ---- 分数：认领人优先，其次按姓名顺序第一个记过分的人 ----
+    scores = np.zeros(shape, dtype=int)
+    if states:
+        written = np.stack([st.scored for st in states])                  # (阅卷人, 学生, 题, 小题)
+        values = np.stack([st.scores for st in states])
+        is_owner = owner[None, None, :, :] == np.arange(len(states))[:, None, None, None]
+        pick = np.where((written & is_owner).any(axis=0), (written & is_owner).argmax(axis=0), written.argmax(axis=0))
+        scores = np.take_along_axis(values, pick[None], axis=0)[0] * written.any(axis=0)
+
+        lo = np.where(written, values, np.iinfo(values.dtype).max).min(axis=0)
+        hi = np.where(written, values, np.iinfo(values.dtype).min).max(axis=0)
+        foreign = (written & ~is_owner).any(axis=0)
+        for stu, qi, sub in zip(*np.nonzero(((written.sum(axis=0) > 1) & (lo != hi)) | foreign)):
+            by = {names[g]: int(values[g, stu, qi, sub]) for g in np.nonzero(written[:, stu, qi, sub])[0]}
+            report.conflicts.append({
+                "key": [int(stu), int(qi), int(sub)],
+                "owner": names[owner[qi, sub]] if owner[qi, sub] >= 0 else None,
+                "scores": by,
+                "kept": int(scores[stu, qi, sub]),
+            })
+
+    # ---- 批注：同样以认领人为准 ----
+    marks: Dict[Tuple[int, int, int], List[np.ndarray]] = {}
+    for g, st in enumerate(states):
+        for key, strokes in st.marks.items():
+            if not strokes:
+                continue
+            o = owner[key[1], key[2]]
+            if key not in marks or o == g:
+                marks[key] = strokes
+
+    out = write_result(JournalState(s, q, m, scores, marks), out)
+    with ResultStore() as store:
+        store.import_json(out)
+
+    conflicts_path = Path(conflicts_path)
+    if report.conflicts:
+        with open(conflicts_path, "w", encoding="utf-8") as f:
+            json.dump({"graders": names, "conflicts": report.conflicts}, f, ensure_ascii=False, indent=2)
+    elif conflicts_path.exists():
+        os.remove(conflicts_path)
+
+    for u in report.unfinished:
+        print(f"⚠ 第 {u['q']} 题第 {u['sub']} 小题尚未完成（{u['status']}，{u['grader'] or '未认领'}）")
+    if report.conflicts:
+        print(f"⚠ {len(report.conflicts)} 处冲突（已按认领人取分）→ {conflicts_path}")
+    print(f"✅ 已合并 {len(names)} 位阅卷人的日志 → {out}")
+    return report
+
+
+if __name__ == "__main__":
+    with Coordinator() as c:
+        print(c.summary())
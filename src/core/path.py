@@ -7,9 +7,11 @@ WORK_PATH = _work_root()
 SRC_PATH = os.path.join(WORK_PATH,'src')
 
 CORE_PATH = os.path.join(SRC_PATH, 'core')
-DATA_PATH = os.path.join(SRC_PATH, 'data')
+# 数据根目录；批量运行时由环境变量 QUICKGRADE_DATA 指向各工作区
+DATA_PATH = os.environ.get('QUICKGRADE_DATA') or os.path.join(SRC_PATH, 'data')
 
 CONFIGS_PATH = os.path.join(DATA_PATH, 'configs')
 RESULTS_PATH = os.path.join(DATA_PATH, 'results')
 STUDENTS_PATH = os.path.join(DATA_PATH, 'students')
-STITCHED_PATH = os.path.join(DATA_PATH, 'stitched')
\ No newline at end of file
+STITCHED_PATH = os.path.join(DATA_PATH, 'stitched')
+SLICED_PATH = os.path.join(DATA_PATH, 'sliced')
\ No newline at end of file
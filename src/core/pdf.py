@@ -0,0 +1,87 @@
+"""
+--+--pdf
+  +--流式多页 PDF 写入（JPEG 直嵌）
+===================================================================
+* 每页一张图片：JPEG 字节以 `/DCTDecode` 原样嵌入，不做二次编码。
+* 边写边落盘，仅在内存中保留各对象的偏移量，峰值内存与页数无关。
+* 无第三方依赖。
+
+用法：
+    with PdfStreamWriter("out.pdf") as pdf:
+        pdf.add_jpeg(jpeg_bytes, width_px, height_px)
+===================================================================
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List
+
+
+class PdfStreamWriter:
+    _CATALOG = 1
+    _PAGES = 2          # 页树对象号预留，/Kids 在 close() 时写出
+
+    def __init__(self, path: str | Path, dpi: int = 150):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.dpi = dpi
+        self._f = open(self.path, "wb")
+        self._offsets: List[int] = [0, 0, 0]       # 下标即对象号；0 号为空闲对象
+        self._pages: List[int] = []
+        self._f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    # ---------- 对外接口 ---------- #
+    def add_jpeg(self, data: bytes, width: int, height: int, gray: bool = False):
+        pw, ph = width * 72 / self.dpi, height * 72 / self.dpi
+        img = self._obj(
+            f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace /{'DeviceGray' if gray else 'DeviceRGB'} /BitsPerComponent 8 "
+            f"/Filter /DCTDecode /Length {len(data)} >>".encode(),
+            data,
+        )
+        content = f"q {pw:.2f} 0 0 {ph:.2f} 0 0 cm /Im0 Do Q".encode()
+        cont = self._obj(f"<< /Length {len(content)} >>".encode(), content)
+        page = self._obj(
+            f"<< /Type /Page /Parent {self._PAGES} 0 R /MediaBox [0 0 {pw:.2f} {ph:.2f}] "
+            f"/Resources << /XObject << /Im0 {img} 0 R >> >> /Contents {cont} 0 R >>".encode()
+        )
+        self._pages.append(page)
+
+    @property
+    def page_count(self) -> int:
+        return len(self._pages)
+
+    def close(self):
+        if self._f.closed:
+            return
+        kids = " ".join(f"{p} 0 R" for p in self._pages)
+        self._obj(f"<< /Type /Pages /Kids [{kids}] /Count {len(self._pages)} >>".encode(), num=self._PAGES)
+        self._obj(f"<< /Type /Catalog /Pages {self._PAGES} 0 R >>".encode(), num=self._CATALOG)
+
+        xref = self._f.tell()
+        n = len(self._offsets)
+        self._f.write(f"xref\n0 {n}\n0000000000 65535 f \n".encode())
+        for off in self._offsets[1:]:
+            self._f.write(f"{off:010d} 00000 n \n".encode())
+        self._f.write(f"trailer\n<< /Size {n} /Root {self._CATALOG} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- 内部 ---------- #
+    def _obj(self, head: bytes, stream: bytes | None = None, num: int | None = None) -> int:
+        if num is None:
+            num = len(self._offsets)
+            self._offsets.append(0)
+        self._offsets[num] = self._f.tell()
+        self._f.write(f"{num} 0 obj\n".encode() + head)
+        if stream is not None:
+            self._f.write(b"\nstream\n")
+            self._f.write(stream)
+            self._f.write(b"\nendstream")
+        self._f.write(b"\nendobj\n")
+        return num
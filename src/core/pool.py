@@ -0,0 +1,85 @@
+"""
+--+--pool
+  +--有界、保序的进程池映射
+===================================================================
+* `ordered_map(fn, jobs, workers)`：进程池并行执行，在途任务数有上限（默认 2×workers），
+  结果按提交顺序逐个产出，内存占用不随任务数增长。
+* workers ≤ 1 时在当前进程串行执行，便于调试；initializer 同样会执行，但 `in_worker()` 为 False，
+  各模块据此只在真正的池进程里调用 `cv2.setNumThreads(1)`，串行时主进程仍可用满 OpenCV 线程。
+* `Progress`：按固定间隔打印完成数与吞吐量。
+===================================================================
+"""
+from __future__ import annotations
+
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Deque, Iterable, Iterator, Optional, TypeVar
+
+J = TypeVar("J")
+R = TypeVar("R")
+
+_IN_WORKER = False
+
+
+def in_worker() -> bool:
+    """当前是否为 ordered_map 启动的池进程"""
+    return _IN_WORKER
+
+
+def _worker_init(initializer: Optional[Callable[[], None]]):
+    global _IN_WORKER
+    _IN_WORKER = True
+    if initializer:
+        initializer()
+
+
+def ordered_map(
+    fn: Callable[[J], R],
+    jobs: Iterable[J],
+    workers: Optional[int] = None,
+    max_inflight: Optional[int] = None,
+    initializer: Optional[Callable[[], None]] = None,
+) -> Iterator[R]:
+    workers = workers or os.cpu_count() or 1
+    max_inflight = max_inflight or 2 * workers
+
+    if workers <= 1:
+        if initializer:
+            initializer()
+        for job in jobs:
+            yield fn(job)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_worker_init, initargs=(initializer,)) as pool:
+        pending: Deque[Future] = deque()
+        for job in jobs:
+            pending.append(pool.submit(fn, job))
+            if len(pending) >= max_inflight:
+                yield pending.popleft().result()     # 按提交顺序收集 → 输出顺序确定
+        while pending:
+            yield pending.popleft().result()
+
+
+class Progress:
+    def __init__(self, total: int, label: str = "", every: float = 2.0):
+        self.total = total
+        self.label = label
+        self.every = every
+        self.done = 0
+        self.t0 = self._last = time.perf_counter()
+
+    def step(self, n: int = 1):
+        self.done += n
+        now = time.perf_counter()
+        if now - self._last >= self.every or self.done == self.total:
+            self._last = now
+            print(f"… {self.label} {self.done}/{self.total}（{self.rate():.1f} 份/秒）")
+
+    def rate(self) -> float:
+        dt = time.perf_counter() - self.t0
+        return self.done / dt if dt > 0 else 0.0
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.t0
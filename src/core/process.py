@@ -4,46 +4,112 @@
 ========================================
 **新增功能**
 🔹 记号从“直线”升级为**自由曲线**：左键按住拖动即实时绘制，抬起鼠标结束一条曲线；右键撤销最近一条曲线。
-🔹 曲线数据以点集形式保存 `[(x1,y1), (x2,y2), ...]`，后续可精确复现。
+🔹 曲线结束时做 RDP 化简（strokes.py），以 (N,2) int32 数组保存，落盘为 base64 差分编码。
 🔹 Ctrl+滚轮缩放、题‑小题‑学生遍历、多位分数输入等既有功能保持不变。
+🔹 分层渲染（render.py）：缩放后的底图与已完成曲线各自缓存，拖动时只补画最新一段。
+🔹 网格模式（grid.py，`Teacher(grid=N)`）：同一小题 N 名学生平铺一屏，一键一格打分。
+🔹 聚类模式（cluster.py，`Teacher(cluster=True)`）：相同答案只批代表一份，分数套用到全簇，离群成员网格复核，空白答案自动记分。
+🔹 涂卡自动判分（omr.py）：存在 omr.json 时涂卡小题直接套用识别分数，只有填涂可疑的卷面逐份人工复核。
+🔹 存在 align.json（align.py）时切片按卷面对齐变换取出，扫描偏移 / 倾斜不影响选区。
+🔹 学生索引（index.py）：整卷路径 / 考号一次扫描后查表；识别过考号时窗口标题显示考号。
+🔹 每个分数 / 曲线即时追加到批改日志（journal.py），中途崩溃或关窗后重启自动从断点继续。
+🔹 批改计时（telemetry.py，`Teacher(metrics=True)`）：取图 / 首帧 / 重绘 / 思考时间写入指标文件，`main.py stats` 汇总。
+🔹 多人分题（partition.py，`Teacher(grader="张三")`）：从共享协调库认领小题，只写本人日志，最后由 merge 合并。
 
 依赖：OpenCV‑Python ≥4.6、NumPy、dataclasses（Py3.7+ 标准库）。
 """
 from __future__ import annotations
 
-import json
+import time
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 import cv2
 import numpy as np
 
-from path import CONFIGS_PATH, STITCHED_PATH
+from path import CONFIGS_PATH
 from input import StudentProcessing, Question, SubQuestion, Region
+from crop import CropCache
+from sliced import SliceStore
+from align import load_alignment
+from journal import JournalState, ResultJournal, write_result
+from store import ResultStore
+from render import StrokeCanvas
+from strokes import simplify
+from grid import GridPage
+from cluster import Cluster, load_clusters
+from omr import load_omr
+from index import student_index
+from partition import Coordinator, grader_journal
+from telemetry import Telemetry
 
 
 class Teacher:
     WIN = "question"
-
-    def __init__(self):
+    CACHE_MB = 512      # 切片缓存内存上限
+    PREFETCH = 4        # 预取后续学生数
+    SIMPLIFY_TOL = 1.0  # 曲线 RDP 化简容差（像素）
+    GRID_TILE = (320, 160)  # 网格模式单格尺寸 (w, h)
+    BLANK_SCORE = 0     # 聚类模式下空白答案的分数
+    REVIEW_PAGE = 8     # 聚类复核每页格数
+
+    def __init__(self, resume: bool = True, grid: int = 0, cluster: bool = False,
+                 grader: Optional[str] = None, claim: str = "sub", metrics: bool = False):
         # ---------- 载入配置 ----------
         self.questions: List[Question] = StudentProcessing.load(Path(CONFIGS_PATH, "default.json"))
         self.total_questions = len(self.questions)
-        self.total_students = self._count_students()
+        self.index = student_index()                           # 学生下标 ↔ 整卷路径 / 考号
+        self.total_students = len(self.index)
 
         self.present_question = 0
         self.present_sub = 0
         self.present_student = 0
+        self.grid = grid                                    # >1 时按网格批改，每页 grid 名学生
+        self._grid_page: Optional[GridPage] = None
+        self.omr = load_omr(self.total_students) or {}
+        self.clusters: Optional[Dict[Tuple[int, int], List[Cluster]]] = None
+        if cluster:
+            self.clusters = load_clusters(self.total_students)
+            if self.clusters is None:
+                print("⚠ 未找到与当前学生数一致的 clusters.json，按逐份批改。请先运行 cluster。")
 
         # ---------- 成绩 & 记号 ----------
         max_sub = max(max(len(q.subs), 1) for q in self.questions)
         self.score_matrix = np.zeros((self.total_students, self.total_questions, max_sub), dtype=int)
-        # marks[(stu, q, sub)] -> List[List[(x,y)]]  (每条曲线是点集)
-        self.marks: Dict[Tuple[int, int, int], List[List[Tuple[int, int]]]] = {}
+        # marks[(stu, q, sub)] -> List[(N,2) int32 数组]  (每条曲线化简后的点集)
+        self.marks: Dict[Tuple[int, int, int], List[np.ndarray]] = {}
+
+        # ---------- 多人分题：认领协调库，日志按阅卷人分开 ----------
+        self.grader = grader
+        self.claim_unit = claim
+        self.coord: Optional[Coordinator] = None
+        if grader is not None:
+            self.coord = Coordinator()
+            self.coord.ensure(self.total_students, [max(1, len(q.subs)) for q in self.questions])
+
+        # ---------- 批改日志：断点续批 ----------
+        self.journal = ResultJournal(grader_journal(grader)) if grader is not None else ResultJournal()
+        if self.journal.exists():
+            if resume:
+                self._resume(max_sub)
+            else:
+                self.journal.path.unlink()
+        self.journal.open(self.total_students, self.total_questions, max_sub)
+
+        # ---------- 切片来源：优先 slice 阶段的按题存储，否则整卷缓存 ----------
+        self.crops = SliceStore.open(self.questions, self.total_students) or CropCache(
+            self.questions, self.index.read, self.total_students,
+            budget_mb=self.CACHE_MB, prefetch=self.PREFETCH, transform=load_alignment(),
+        )
+
+        # ---------- 计时（可选） ----------
+        self.tm: Optional[Telemetry] = Telemetry(grader) if metrics else None
 
         # ---------- 显示 ----------
         self.zoom = 1.0
         self._curr_img: Optional[np.ndarray] = None
+        self.canvas = StrokeCanvas()
+        self._origin: Tuple[int, int] = (0, 0)                   # 当前切片在整卷中的左上角
         self._stroke: Optional[List[Tuple[int, int]]] = None   # 正在绘制的曲线 (原始坐标)
 
         cv2.namedWindow(self.WIN)
@@ -51,16 +117,15 @@ class Teacher:
 
     # -------------------------------------------------- 运行主循环 --------------------------------------------------
     def run(self):
+        if self.coord is not None:
+            self._run_claimed()
+            return
         while self.present_question < self.total_questions:
             q = self.questions[self.present_question]
             sub_cnt = max(1, len(q.subs))
 
             while self.present_sub < sub_cnt:
-                while self.present_student < self.total_students:
-                    self._grade_item(q, self.present_sub)
-                    self.present_student += 1
-
-                self.present_student = 0
+                self._grade_sub(q, self.present_sub)
                 self.present_sub += 1
 
             self.present_sub = 0
@@ -68,38 +133,145 @@ class Teacher:
 
         self._finish()
 
+    def _run_claimed(self):
+        """多人分题：认领 → 批改 → 完成，直到协调库中没有可认领的小题"""
+        while (item := self.coord.claim(self.grader, self.claim_unit)) is not None:
+            if item != (self.present_question, self.present_sub):
+                self.present_student = 0            # 日志断点只对同一小题有效
+            self.present_question, self.present_sub = item
+            print(f"▶ {self.grader} 认领第 {item[0]+1} 题第 {item[1]+1} 小题")
+            self._grade_sub(self.questions[item[0]], item[1])
+            self.coord.complete(self.grader, item)
+        self._finish()
+
+    def _grade_sub(self, q: Question, sub_idx: int):
+        """批完当前大题的一个小题（全部学生）"""
+        item = (self.present_question, sub_idx)
+        clusters = self.clusters.get(item) if self.clusters else None
+        if item in self.omr:
+            self._grade_omr(q, sub_idx, self.omr[item])
+        elif clusters:
+            self._grade_clusters(q, sub_idx, clusters)
+        while self.present_student < self.total_students:
+            if self.grid > 1:
+                self._grade_grid(sub_idx)
+            else:
+                self._grade_item(q, sub_idx)
+                self.present_student += 1
+        self.present_student = 0
+
     # -------------------------------------------------- 批改单项 --------------------------------------------------
     def _grade_item(self, q: Question, sub_idx: int):
+        t0 = time.perf_counter()
         img, origin = self._crop(q, sub_idx)
+        self._origin = origin
+        key = (self.present_student, self.present_question, sub_idx)
+        cv2.setWindowTitle(self.WIN, f"{self.index.label(self.present_student)}"
+                                     f"  Q{self.present_question + 1}.{sub_idx + 1}")
+        # 续批时日志里已有的曲线为整卷坐标，先平移回切片坐标
+        if key in self.marks:
+            self.marks[key] = [stroke - np.array(origin, dtype=np.int32) for stroke in self.marks[key]]
         self._show(img)
+        if self.tm is not None:
+            self.tm.record("first_frame", key, time.perf_counter() - t0)
 
         score = self._read_score()
         self.score_matrix[self.present_student, self.present_question, sub_idx] = score
+        self.journal.score(key, score)
 
         # 将曲线坐标平移到整卷坐标
-        key = (self.present_student, self.present_question, sub_idx)
         if key in self.marks:
-            self.marks[key] = [[(x+origin[0], y+origin[1]) for (x, y) in stroke] for stroke in self.marks[key]]
+            self.marks[key] = [stroke + np.array(origin, dtype=np.int32) for stroke in self.marks[key]]
+
+    # -------------------------------------------------- 网格批改一页 --------------------------------------------------
+    def _grade_grid(self, sub_idx: int):
+        end = min(self.present_student + self.grid, self.total_students)
+        students = list(range(self.present_student, end))
+        crops = [self.crops.get(s, self.present_question, sub_idx)[0] for s in students]
+        self.crops.prefetch(end - 1, self.present_question, sub_idx, n=self.grid)
+
+        page = self._grid_page = GridPage(students, crops, self.GRID_TILE, labels=self._labels(students))
+        while True:
+            cv2.imshow(self.WIN, page.render())
+            if page.handle_key(cv2.waitKey(0) & 0xFF):
+                break
+        self._grid_page = None
+
+        for stu, score in zip(students, page.scores):
+            key = (stu, self.present_question, sub_idx)
+            self.score_matrix[key] = score
+            self.journal.score(key, score)
+        self.present_student = end
+
+    # -------------------------------------------------- 涂卡小题：套用识别结果 + 复核 --------------------------------------------------
+    def _grade_omr(self, q: Question, sub_idx: int, res: Dict):
+        """套用 omr.json 的分数；可疑卷面逐份显示人工打分。日志最后按学生顺序补记整题分数。"""
+        q_idx = self.present_question
+        self.score_matrix[:, q_idx, sub_idx] = res["scores"]
+        for stu in res["review"]:
+            self.present_student = stu
+            print(f"⚠ 涂卡待复核：第 {stu+1} 份，识别为 {res['answers'][stu]}，自动得分 {res['scores'][stu]}")
+            self._grade_item(q, sub_idx)
+
+        for stu in range(self.total_students):
+            self.journal.score((stu, q_idx, sub_idx), int(self.score_matrix[stu, q_idx, sub_idx]))
+        self.present_student = self.total_students
+
+    # -------------------------------------------------- 按簇批改整个小题 --------------------------------------------------
+    def _grade_clusters(self, q: Question, sub_idx: int, clusters: List[Cluster]):
+        """每簇批代表一份，分数套用到全簇；离群成员预填簇分数后网格复核。
+
+        整个小题作为一个单元：日志最后按学生顺序补记全部分数，中途中断则续批时整题重来。
+        """
+        q_idx = self.present_question
+        for c in clusters:
+            if c.blank:
+                self.score_matrix[c.members, q_idx, sub_idx] = self.BLANK_SCORE
+                print(f"✔ 第 {q_idx+1} 题第 {sub_idx+1} 小题：{len(c.members)} 份空白，记 {self.BLANK_SCORE} 分")
+                continue
+
+            self.present_student = c.rep
+            self._grade_item(q, sub_idx)
+            score = int(self.score_matrix[c.rep, q_idx, sub_idx])
+            self.score_matrix[c.members, q_idx, sub_idx] = score
+
+            review = [m for m in c.outliers if m != c.rep]
+            for i in range(0, len(review), self.REVIEW_PAGE):
+                students = review[i:i + self.REVIEW_PAGE]
+                crops = [self.crops.get(s, q_idx, sub_idx)[0] for s in students]
+                page = self._grid_page = GridPage(students, crops, self.GRID_TILE, scores=[score] * len(students),
+                                                  labels=self._labels(students))
+                while True:
+                    cv2.imshow(self.WIN, page.render())
+                    if page.handle_key(cv2.waitKey(0) & 0xFF):
+                        break
+                self._grid_page = None
+                self.score_matrix[students, q_idx, sub_idx] = page.scores
+
+        for stu in range(self.total_students):
+            self.journal.score((stu, q_idx, sub_idx), int(self.score_matrix[stu, q_idx, sub_idx]))
+        self.present_student = self.total_students
+
+    def _labels(self, students: List[int]) -> List[str]:
+        return [self.index.label(s) for s in students]
 
     # -------------------------------------------------- 裁剪题/小题 --------------------------------------------------
     def _crop(self, q: Question, sub_idx: int):
-        stu_img = self._read_stitched(self.present_student)
-        if stu_img is None:
-            raise FileNotFoundError("无法读取学生卷面！")
-
-        if not q.subs:
-            seg = q.segments[sub_idx] if len(q.segments) > 1 else q.segments[0]
-        else:
-            seg = q.subs[sub_idx].segments[0]
-        x, y, w, h = seg.to_tuple()
-        return stu_img[y:y+h, x:x+w], (x, y)
+        # 整卷只解码一次，切片来自缓存；同时预取后续学生的同一小题
+        t0 = time.perf_counter()
+        img, origin = self.crops.get(self.present_student, self.present_question, sub_idx)
+        if self.tm is not None:
+            self.tm.record("load", (self.present_student, self.present_question, sub_idx), time.perf_counter() - t0)
+        self.crops.prefetch(self.present_student, self.present_question, sub_idx)
+        return img, origin
 
     # -------------------------------------------------- 分数输入 --------------------------------------------------
     def _read_score(self):
+        t0 = time.perf_counter()
         buf = ""
         font = cv2.FONT_HERSHEY_SIMPLEX
         while True:
-            disp = self._apply_zoom(self._render_with_marks())
+            disp = self._render_with_marks().copy()
             cv2.putText(disp, f"Score: {buf}", (10, 30), font, 1, (0, 0, 255), 2)
             cv2.imshow(self.WIN, disp)
             key = cv2.waitKey(0) & 0xFF
@@ -108,37 +280,53 @@ class Teacher:
             elif key in (8, 127):
                 buf = buf[:-1]
             elif key == 13 and buf:
+                if self.tm is not None:
+                    self.tm.record("think", self._key(), time.perf_counter() - t0)
                 return int(buf)
 
     # -------------------------------------------------- 渲染当前图 + 记号 --------------------------------------------------
     def _render_with_marks(self):
-        if self._curr_img is None:
-            return np.zeros((10, 10, 3), dtype=np.uint8)
-        img = self._curr_img.copy()
-        key = (self.present_student, self.present_question, self.present_sub)
-        for stroke in self.marks.get(key, []):
-            if len(stroke) >= 2:
-                pts = np.array(stroke, dtype=np.int32).reshape((-1, 1, 2))
-                cv2.polylines(img, [pts], False, (0, 0, 255), 2)
-        # 若正在绘制
-        if self._stroke and len(self._stroke) >= 2:
-            pts = np.array(self._stroke, dtype=np.int32).reshape((-1, 1, 2))
-            cv2.polylines(img, [pts], False, (0, 0, 255), 1)
-        return img
+        """已缩放的显示帧（缓存图层，调用方如需在其上写字须先 copy）"""
+        key = self._key()
+        strokes = self.marks.get(key, [])
+        if self._stroke is not None:
+            return self.canvas.begin_stroke(strokes, self._stroke)
+        return self.canvas.committed(strokes)
 
     # -------------------------------------------------- 显示 --------------------------------------------------
-    def _apply_zoom(self, img: np.ndarray):
-        if abs(self.zoom - 1.0) < 1e-3:
-            return img
-        return cv2.resize(img, None, fx=self.zoom, fy=self.zoom,
-                          interpolation=cv2.INTER_AREA if self.zoom < 1 else cv2.INTER_LINEAR)
-
     def _show(self, img: np.ndarray):
+        t0 = time.perf_counter()
         self._curr_img = img
-        cv2.imshow(self.WIN, self._apply_zoom(self._render_with_marks()))
+        self.canvas.set_image(img)
+        cv2.imshow(self.WIN, self._render_with_marks())
+        if self.tm is not None:
+            self.tm.record("render", self._key(), time.perf_counter() - t0)
+
+    def _key(self) -> Tuple[int, int, int]:
+        return self.present_student, self.present_question, self.present_sub
 
     # -------------------------------------------------- 鼠标回调 --------------------------------------------------
     def _mouse_cb(self, event, x, y, flags, param):
+        if self.tm is None:
+            self._on_mouse(event, x, y, flags, param)
+            return
+        t0 = time.perf_counter()
+        kind = self._on_mouse(event, x, y, flags, param)
+        if kind is not None:                                # 只统计实际重绘的事件，整帧重建与曲线增量分开记
+            self.tm.record(kind, self._key(), time.perf_counter() - t0)
+
+    def _on_mouse(self, event, x, y, flags, param) -> Optional[str]:
+        """处理鼠标事件；返回本次重绘类型：'render'（整帧重建）、'stroke'（曲线增量）或 None（未重绘）"""
+        # ---- 网格模式：单击选格 ----
+        if self._grid_page is not None:
+            if event == cv2.EVENT_LBUTTONDOWN:
+                i = self._grid_page.hit(x, y)
+                if i is not None:
+                    self._grid_page.cursor = i
+                    cv2.imshow(self.WIN, self._grid_page.render())
+                    return "render"
+            return None
+
         # ---- 缩放 Ctrl+滚轮 ----
         if event == cv2.EVENT_MOUSEWHEEL and (flags & cv2.EVENT_FLAG_CTRLKEY):
             delta = (flags >> 16)
@@ -146,58 +334,83 @@ class Teacher:
                 delta -= 65536
             self.zoom *= 1.1 if delta > 0 else 1/1.1
             self.zoom = max(0.2, min(5.0, self.zoom))
+            self.canvas.set_zoom(self.zoom)
             if self._curr_img is not None:
-                cv2.imshow(self.WIN, self._apply_zoom(self._render_with_marks()))
-            return
+                cv2.imshow(self.WIN, self._render_with_marks())
+                return "render"
+            return None
 
         # ---- 自由曲线记号 ----
         real_pt = (int(x / self.zoom), int(y / self.zoom))
 
+        key = self._key()
+
         if event == cv2.EVENT_LBUTTONDOWN:
             self._stroke = [real_pt]
+            self.canvas.begin_stroke(self.marks.get(key, []))
+            return "render"
         elif event == cv2.EVENT_MOUSEMOVE and (flags & cv2.EVENT_FLAG_LBUTTON):
             if self._stroke is not None:
-                # 避免太密：只有距离大于1像素才记录
-                if np.hypot(real_pt[0]-self._stroke[-1][0], real_pt[1]-self._stroke[-1][1]) >= 1:
+                # 避免太密：只有距离大于1像素才记录；只补画最新一段
+                prev = self._stroke[-1]
+                if np.hypot(real_pt[0]-prev[0], real_pt[1]-prev[1]) >= 1:
                     self._stroke.append(real_pt)
-                cv2.imshow(self.WIN, self._apply_zoom(self._render_with_marks()))
+                    cv2.imshow(self.WIN, self.canvas.extend_stroke(prev, real_pt))
+                    return "stroke"
         elif event == cv2.EVENT_LBUTTONUP and self._stroke is not None:
-            key = (self.present_student, self.present_question, self.present_sub)
-            self.marks.setdefault(key, []).append(self._stroke)
+            stroke = simplify(self._stroke, self.SIMPLIFY_TOL)
+            strokes = self.marks.setdefault(key, [])
+            strokes.append(stroke)
+            self.journal.stroke(key, stroke + np.array(self._origin, dtype=np.int32))
             self._stroke = None
-            self._show(self._curr_img)  # 重绘
+            cv2.imshow(self.WIN, self.canvas.commit_stroke(stroke, strokes))
+            return "stroke"
         elif event == cv2.EVENT_RBUTTONDOWN:
-            key = (self.present_student, self.present_question, self.present_sub)
             if self.marks.get(key):
                 self.marks[key].pop()
-                self._show(self._curr_img)
-
-    # -------------------------------------------------- 读 stitched --------------------------------------------------
-    def _read_stitched(self, idx: int):
-        base = Path(STITCHED_PATH, f"{idx+1}")
-        for ext in (".png", ".jpg", ".jpeg", ".bmp"):
-            p = base.with_suffix(ext)
-            if p.exists():
-                return cv2.imread(str(p))
+                self.journal.undo(key)
+                self.canvas.invalidate_marks()
+                cv2.imshow(self.WIN, self._render_with_marks())
+                return "render"
         return None
 
-    # -------------------------------------------------- 学生数 --------------------------------------------------
-    def _count_students(self):
-        return len([p for p in Path(STITCHED_PATH).iterdir() if p.suffix.lower() in {".png", ".jpg", ".jpeg", ".bmp"}])
+    # -------------------------------------------------- 断点续批 --------------------------------------------------
+    def _resume(self, max_sub: int):
+        state = self.journal.replay()
+        if (state.total_students, state.total_questions, state.max_sub) != (self.total_students, self.total_questions, max_sub):
+            raise ValueError(f"批改日志与当前配置 / 学生数不一致，请确认后删除 {self.journal.path} 重新开始！")
+        self.score_matrix = state.scores
+        self.marks = state.marks
+        if state.last_scored is not None:
+            self.present_student, self.present_question, self.present_sub = self._next_item(*state.last_scored)
+            print(f"↻ 从批改日志恢复：第 {self.present_question+1} 题第 {self.present_sub+1} 小题，第 {self.present_student+1} 名学生")
+
+    def _next_item(self, stu: int, q_idx: int, sub_idx: int) -> Tuple[int, int, int]:
+        """按 题 → 小题 → 学生 的遍历顺序返回下一项 (stu, q, sub)"""
+        if stu + 1 < self.total_students:
+            return stu + 1, q_idx, sub_idx
+        if sub_idx + 1 < max(1, len(self.questions[q_idx].subs)):
+            return 0, q_idx, sub_idx + 1
+        return 0, q_idx + 1, 0
 
     # -------------------------------------------------- 结束 --------------------------------------------------
     def _finish(self):
-        # 曲线序列化：[[[x,y], ...], ...]
-        serial_marks = {"|".join(map(str, k)): [list(map(list, stroke)) for stroke in v] for k, v in self.marks.items()}
-        result = {
-            "total_students": int(self.total_students),
-            "total_questions": int(self.total_questions),
-            "scores": self.score_matrix.tolist(),
-            "marks": serial_marks,
-        }
-        Path(CONFIGS_PATH).mkdir(parents=True, exist_ok=True)
-        with open(Path(CONFIGS_PATH, "result.json"), "w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=Fal0se, indent=2)
+        self.crops.close()
+        self.journal.close()
+        if self.tm is not None:
+            self.tm.flush()
+        if self.coord is not None:
+            # 分题模式：日志保留给 merge 合并，不单独写 result.json
+            print(f"✔ {self.grader} 已无可认领的小题，当前进度：\n{self.coord.summary()}")
+            self.coord.close()
+            cv2.destroyAllWindows()
+            return
+        # 日志压缩为 result.json，成功后删除日志
+        result_path = write_result(JournalState(self.total_students, self.total_questions, self.score_matrix.shape[2],
+                                                self.score_matrix, self.marks))
+        with ResultStore() as store:
+            store.import_json(result_path)
+        self.journal.path.unlink(missing_ok=True)
         cv2.destroyAllWindows()
         print("✔ 批改完成，结果已保存到 result.json")
 
@@ -0,0 +1,155 @@
+"""
+--+--render
+  +--批改窗口分层渲染
+===================================================================
+三层缓存，鼠标事件只付出与新线段长度相关的代价：
+  ① base       —— 已缩放的切片（切换题目 / 缩放时重建）
+  ② committed  —— base + 已完成曲线（撤销时重建；新曲线完成时只在其上增量补画）
+  ③ frame      —— committed 的工作副本，拖动时只画最新一段线段
+
+曲线以切片原始坐标保存，绘制时统一乘以 zoom 映射到显示坐标。
+
+base 由 `ZoomCache` 提供：缩小时从 pyrDown 金字塔中最接近的一级出发再 INTER_AREA，
+最近用过的若干缩放倍率的结果按 LRU 记忆，切换题目时整体清空。
+输出尺寸始终按原图尺寸 × zoom 取整，与 `real_pt = x / zoom` 的坐标反算保持一致。
+
+依赖：OpenCV‑Python、NumPy。
+===================================================================
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+Point = Tuple[int, int]
+
+_COLOR = (0, 0, 255)    # BGR
+_THICK = 2              # 已完成曲线在 zoom=1 时的线宽
+_THIN = 1               # 正在绘制的曲线
+
+
+class ZoomCache:
+    """单张切片的缩放缓存：金字塔层 + 最近缩放结果"""
+
+    def __init__(self, max_frames: int = 8, min_zoom: float = 0.2):
+        self.max_frames = max_frames
+        self.min_zoom = min_zoom
+        self._img: Optional[np.ndarray] = None
+        self._levels: List[np.ndarray] = []          # levels[k] ≈ 原图 × 0.5**k
+        self._frames: "OrderedDict[float, np.ndarray]" = OrderedDict()
+
+    def set_image(self, img: Optional[np.ndarray]):
+        self._img = img
+        self._levels = []
+        self._frames.clear()
+
+    def get(self, zoom: float) -> np.ndarray:
+        if self._img is None:
+            return np.zeros((10, 10, 3), np.uint8)
+        if abs(zoom - 1.0) < 1e-3:
+            return self._img
+
+        key = round(zoom, 4)
+        hit = self._frames.get(key)
+        if hit is not None:
+            self._frames.move_to_end(key)
+            return hit
+
+        h, w = self._img.shape[:2]
+        dsize = (max(1, int(round(w * zoom))), max(1, int(round(h * zoom))))
+        if zoom < 1:
+            frame = cv2.resize(self._level_for(zoom), dsize, interpolation=cv2.INTER_AREA)
+        else:
+            frame = cv2.resize(self._img, dsize, interpolation=cv2.INTER_LINEAR)
+
+        self._frames[key] = frame
+        if len(self._frames) > self.max_frames:
+            self._frames.popitem(last=False)
+        return frame
+
+    def _level_for(self, zoom: float) -> np.ndarray:
+        """不小于目标倍率的最深一级金字塔（首次缩小时一次建好）"""
+        if not self._levels:
+            self._levels = [self._img]
+            while 0.5 ** len(self._levels) >= self.min_zoom and min(self._levels[-1].shape[:2]) >= 2:
+                self._levels.append(cv2.pyrDown(self._levels[-1]))
+        k = 0
+        while k + 1 < len(self._levels) and 0.5 ** (k + 1) >= zoom:
+            k += 1
+        return self._levels[k]
+
+
+class StrokeCanvas:
+    def __init__(self):
+        self._img: Optional[np.ndarray] = None
+        self._zoom = 1.0
+        self._zooms = ZoomCache()
+        self._base: Optional[np.ndarray] = None
+        self._committed: Optional[np.ndarray] = None
+        self._frame: Optional[np.ndarray] = None
+
+    # ---------- 状态变更 ---------- #
+    def set_image(self, img: np.ndarray):
+        self._img = img
+        self._zooms.set_image(img)
+        self._base = self._committed = self._frame = None
+
+    def set_zoom(self, zoom: float):
+        if zoom != self._zoom:
+            self._zoom = zoom
+            self._base = self._committed = self._frame = None
+
+    def invalidate_marks(self):
+        self._committed = self._frame = None
+
+    # ---------- 图层 ---------- #
+    def base(self) -> np.ndarray:
+        if self._base is None:
+            self._base = self._zooms.get(self._zoom)
+        return self._base
+
+    def committed(self, strokes: Sequence[List[Point]]) -> np.ndarray:
+        if self._committed is None:
+            self._committed = self.base().copy()
+            self._draw(self._committed, [s for s in strokes if len(s) >= 2], self._thick(_THICK))
+        return self._committed
+
+    # ---------- 曲线 ---------- #
+    def begin_stroke(self, strokes: Sequence[List[Point]], pending: Optional[Sequence[Point]] = None) -> np.ndarray:
+        """新建工作帧；pending 为正在绘制的曲线，重建帧（缩放 / 按键重绘）时补画，拖动中不会消失"""
+        self._frame = self.committed(strokes).copy()
+        if pending is not None and len(pending) >= 2:
+            self._draw(self._frame, [pending], self._thick(_THIN))
+        return self._frame
+
+    def extend_stroke(self, p0: Point, p1: Point) -> np.ndarray:
+        """只在工作帧上补画最新一段"""
+        if self._frame is None:
+            self._frame = self.base().copy()
+        cv2.line(self._frame, self._to_display(p0), self._to_display(p1), _COLOR, self._thick(_THIN))
+        return self._frame
+
+    def commit_stroke(self, stroke: List[Point], strokes: Sequence[List[Point]]) -> np.ndarray:
+        """曲线完成：在 committed 层上增量补画这一条（strokes 为含该曲线的全部曲线，仅在需要重建时使用）"""
+        self._frame = None
+        if self._committed is None:
+            return self.committed(strokes)
+        if len(stroke) >= 2:
+            self._draw(self._committed, [stroke], self._thick(_THICK))
+        return self._committed
+
+    # ---------- 内部 ---------- #
+    def _thick(self, t: int) -> int:
+        return max(1, int(round(t * self._zoom)))
+
+    def _to_display(self, p: Point) -> Point:
+        return int(p[0] * self._zoom), int(p[1] * self._zoom)
+
+    def _draw(self, canvas: np.ndarray, strokes: Sequence[List[Point]], thick: int):
+        if not strokes:
+            return
+        pts = [(np.asarray(s, dtype=np.float32) * self._zoom).astype(np.int32).reshape((-1, 1, 2)) for s in strokes]
+        cv2.polylines(canvas, pts, False, _COLOR, thick)
@@ -0,0 +1,150 @@
+"""
+--+--sliced
+  +--按题切片存储（stitch → slice → teacher）
+===================================================================
+* 读取 `default.json` 中的大题 / 小题区域，把每名学生整卷上的每个批改单元切出。
+* 每个批改单元写成一个 `.npy` 数组：形状 `(学生数, h, w, 3)`，uint8，可 `mmap` 只读加载。
+* `index.json` 记录各单元文件名、整卷坐标、尺寸与学生数。
+* 批改 / 导出 / 自动判分按题读取时只触碰该题对应的字节，无需整卷解码。
+* 存在 align.json 时按各卷面的对齐变换切片；align.json 更新后旧切片自动失效。
+
+输出：`src/data/sliced/{大题}_{小题}.npy` + `index.json`
+依赖：OpenCV‑Python、NumPy。
+===================================================================
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from path import CONFIGS_PATH, SLICED_PATH
+from input import StudentProcessing, Question
+from crop import Crop, item_regions
+from align import load_alignment, warp_region
+from index import student_index
+
+INDEX_NAME = "index.json"
+_PAD = 255          # 整卷尺寸不足时以白色补齐
+
+
+def _item_file(q_idx: int, sub_idx: int) -> str:
+    return f"{q_idx+1}_{sub_idx+1}.npy"
+
+# -------------------------------------------------- 写入 --------------------------------------------------
+
+def slice_all(config: str | Path = Path(CONFIGS_PATH, "default.json"), out_dir: str | Path = SLICED_PATH):
+    """逐个学生解码整卷一次，把全部批改单元写入各自的 memmap 数组"""
+    questions: List[Question] = StudentProcessing.load(config)
+    regions = item_regions(questions)
+    students = student_index()
+    total = len(students)
+    if total == 0:
+        raise RuntimeError("stitched 目录下无图片！请先运行 stitch。")
+    align = load_alignment()
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    arrays: Dict[Tuple[int, int], np.memmap] = {}
+    for (q_idx, sub_idx), r in regions.items():
+        arrays[(q_idx, sub_idx)] = np.lib.format.open_memmap(
+            out / _item_file(q_idx, sub_idx), mode="w+", dtype=np.uint8, shape=(total, r.h, r.w, 3)
+        )
+
+    for stu in range(total):
+        page = students.read(stu)
+        if page is None:
+            print(f"⚠ 未找到学生卷面：第 {stu+1} 份，以空白代替")
+        M = align(stu) if align else None
+        for k, r in regions.items():
+            dst = arrays[k][stu]
+            if page is not None and M is not None:
+                dst[...] = warp_region(page, M, r)
+                continue
+            dst[...] = _PAD
+            if page is None:
+                continue
+            src = page[r.y:r.y + r.h, r.x:r.x + r.w]
+            dst[:src.shape[0], :src.shape[1]] = src
+        print(f"✔ 已切片 {stu+1}/{total}")
+
+    for arr in arrays.values():
+        arr.flush()
+    del arrays
+
+    meta = {
+        "total_students": total,
+        "stems": [students.stem(i) for i in range(total)],
+        "align": align.stamp if align else None,
+        "items": [
+            {
+                "question": q_idx,
+                "sub": sub_idx,
+                "id": f"{q_idx+1}.{sub_idx+1}",
+                "file": _item_file(q_idx, sub_idx),
+                "origin": [r.x, r.y],
+                "shape": [r.h, r.w],
+            }
+            for (q_idx, sub_idx), r in regions.items()
+        ],
+    }
+    with open(out / INDEX_NAME, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 切片完成！输出目录：{out.resolve()}")
+
+# -------------------------------------------------- 读取 --------------------------------------------------
+
+class SliceStore:
+    """按题 mmap 只读访问切片；接口与 CropCache 一致，可直接替换"""
+
+    def __init__(self, root: str | Path, index: Dict):
+        self.root = Path(root)
+        self.total_students: int = index["total_students"]
+        self._meta = {(it["question"], it["sub"]): it for it in index["items"]}
+        self._arrays: Dict[Tuple[int, int], np.ndarray] = {}
+
+    @classmethod
+    def open(cls, questions: List[Question], total_students: int, root: str | Path = SLICED_PATH) -> Optional["SliceStore"]:
+        """索引存在且与当前配置 / 学生数一致时返回 SliceStore，否则返回 None"""
+        idx_file = Path(root, INDEX_NAME)
+        if not idx_file.exists():
+            return None
+        with open(idx_file, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        align = load_alignment()
+        students = student_index()
+        if (index.get("total_students") != total_students
+                or index.get("stems") != [students.stem(i) for i in range(total_students)]
+                or index.get("align") != (align.stamp if align else None)):
+            return None
+        store = cls(root, index)
+        for (q_idx, sub_idx), r in item_regions(questions).items():
+            it = store._meta.get((q_idx, sub_idx))
+            if it is None or it["origin"] != [r.x, r.y] or it["shape"] != [r.h, r.w]:
+                return None
+        return store
+
+    def column(self, q_idx: int, sub_idx: int) -> np.ndarray:
+        """整列（全部学生）的切片，形状 (学生数, h, w, 3)，只读 mmap"""
+        arr = self._arrays.get((q_idx, sub_idx))
+        if arr is None:
+            arr = np.load(self.root / self._meta[(q_idx, sub_idx)]["file"], mmap_mode="r")
+            self._arrays[(q_idx, sub_idx)] = arr
+        return arr
+
+    def get(self, stu: int, q_idx: int, sub_idx: int) -> Crop:
+        x, y = self._meta[(q_idx, sub_idx)]["origin"]
+        return np.array(self.column(q_idx, sub_idx)[stu]), (x, y)
+
+    def prefetch(self, stu: int, q_idx: int, sub_idx: int, n: Optional[int] = None):
+        pass    # mmap 由操作系统按页预读
+
+    def close(self):
+        self._arrays.clear()
+
+
+if __name__ == "__main__":
+    slice_all()
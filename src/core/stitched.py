@@ -1,71 +1,264 @@
-﻿import os
+﻿"""
+--+--stitched
+  +--多页纵向拼接（students/ 各页文件夹 → stitched/ 学生整卷）
+===================================================================
+* `stitch()` 可直接 import 调用，也可 `python stitched.py --workers N` 运行。
+* 进程池并行执行 解码 → 缩放 → 拼接 → JPEG 编码 → 写盘，每名学生一个任务。
+* 在途任务数有上限（默认 2×workers），内存占用不随学生数增长。
+* 按学生顺序收集结果，输出文件名与日志顺序确定；结束时汇总各阶段耗时。
+* 增量拼接：`stitched.manifest.json`（与 stitched/ 同级）记录每份输出的源文件路径 / 大小 / mtime / SHA‑1，
+  重跑时跳过源文件未变的学生，只重建变化者，并删除已不再对应任何学生的旧输出。
+
+依赖：OpenCV‑Python。
+===================================================================
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
 import cv2
-from core import *
-
-# ========= 1. 用户可修改的参数 ===============================================
-root_dir     = STUDENTS_PATH       # 各页文件夹所在根目录
-out_dir      = STITCHED_PATH   # 输出目录：建议放到 root_dir 之外
-allow_suffix = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff'}
-
-# ========= 2. 创建输出目录 ====================================================
-os.makedirs(out_dir, exist_ok=True)
-
-# ========= 3. 收集有效页文件夹（至少含 1 张图片） =============================
-page_dirs = []
-for d in sorted(os.listdir(root_dir)):
-    full = os.path.join(root_dir, d)
-    if not os.path.isdir(full):
-        continue
-    imgs = [f for f in os.listdir(full)
-            if os.path.splitext(f)[1].lower() in allow_suffix]
-    if imgs:
-        page_dirs.append(d)
-    else:
-        print(f'⚠ 跳过子文件夹 {d}（无可用图片）')
-
-if len(page_dirs) < 2:
-    raise RuntimeError('需要至少两个含图片的页文件夹才能进行拼接！')
-
-print(f'检测到页目录：{page_dirs}')
-
-# ========= 4. 读取各页的文件列表（按顺序对应） ===============================
-page_lists = []
-for p in page_dirs:
-    p_dir = os.path.join(root_dir, p)
-    files = sorted([f for f in os.listdir(p_dir)
-                    if os.path.splitext(f)[1].lower() in allow_suffix])
-    page_lists.append([os.path.join(p_dir, f) for f in files])
-    print(f'{p_dir} → {len(files)} 张')
-
-num_students = min(len(lst) for lst in page_lists)
-print(f'\n可配对学生数 = {num_students}\n')
-if num_students == 0:
-    raise RuntimeError('页文件夹里没有可配对的图片！')
-
-# ========= 5. 拼接函数 =======================================================
-def vconcat_resize(paths):
+
+from path import STUDENTS_PATH, STITCHED_PATH
+from pool import ordered_map, in_worker
+from index import reset_index
+
+ALLOW_SUFFIX = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff'}
+JPEG_QUALITY = 95
+MANIFEST_SUFFIX = '.manifest.json'
+
+# (学生序号, 各页图片路径, 输出路径)
+StitchJob = Tuple[int, List[str], str]
+
+# -------------------------------------------------- 统计 --------------------------------------------------
+
+@dataclass
+class StitchStats:
+    students: int = 0
+    skipped: int = 0
+    wall: float = 0.0
+    done: List[int] = field(default_factory=list)
+    stages: Dict[str, float] = field(default_factory=lambda: {"decode": 0.0, "resize": 0.0, "encode": 0.0, "write": 0.0})
+
+    def add(self, timings: Dict[str, float]):
+        self.students += 1
+        for k, v in timings.items():
+            self.stages[k] = self.stages.get(k, 0.0) + v
+
+    def report(self) -> str:
+        lines = [f'学生数 {self.students}，跳过未变化 {self.skipped}，总耗时 {self.wall:.2f}s'
+                 + (f'（{self.students / self.wall:.1f} 份/秒）' if self.wall > 0 else '')]
+        cpu = sum(self.stages.values()) or 1.0
+        for k, v in self.stages.items():
+            lines.append(f'  {k:<7} {v:8.2f}s  {v / cpu:6.1%}')
+        return '\n'.join(lines)
+
+# -------------------------------------------------- 收集页文件 --------------------------------------------------
+
+def _list_images(d: str) -> List[str]:
+    return sorted(f for f in os.listdir(d) if os.path.splitext(f)[1].lower() in ALLOW_SUFFIX)
+
+
+def collect_pages(root_dir: str = STUDENTS_PATH) -> List[List[str]]:
+    """返回各页文件夹内按顺序排列的图片路径：page_lists[页][学生]"""
+    page_dirs = []
+    for d in sorted(os.listdir(root_dir)):
+        full = os.path.join(root_dir, d)
+        if not os.path.isdir(full):
+            continue
+        if _list_images(full):
+            page_dirs.append(d)
+        else:
+            print(f'⚠ 跳过子文件夹 {d}（无可用图片）')
+
+    if len(page_dirs) < 2:
+        raise RuntimeError('需要至少两个含图片的页文件夹才能进行拼接！')
+    print(f'检测到页目录：{page_dirs}')
+
+    page_lists = []
+    for p in page_dirs:
+        p_dir = os.path.join(root_dir, p)
+        files = _list_images(p_dir)
+        page_lists.append([os.path.join(p_dir, f) for f in files])
+        print(f'{p_dir} → {len(files)} 张')
+    return page_lists
+
+
+def build_jobs(page_lists: List[List[str]], out_dir: str = STITCHED_PATH) -> List[StitchJob]:
+    num_students = min(len(lst) for lst in page_lists)
+    print(f'\n可配对学生数 = {num_students}\n')
+    if num_students == 0:
+        raise RuntimeError('页文件夹里没有可配对的图片！')
+
+    jobs = []
+    for i in range(num_students):
+        img_paths = [pl[i] for pl in page_lists]          # 各页第 i 张
+        first_name = os.path.splitext(os.path.basename(page_lists[0][i]))[0]
+        out_name = first_name if first_name.isdigit() else f'{i+1}'
+        jobs.append((i, img_paths, os.path.join(out_dir, f'{out_name}.jpg')))
+    return jobs
+
+# -------------------------------------------------- 单个任务（在子进程中运行） --------------------------------------------------
+
+def _init_worker():
+    if in_worker():
+        cv2.setNumThreads(1)    # 并行度由进程池提供；串行执行时不限制主进程
+
+
+def _stitch_one(job: StitchJob, quality: int = JPEG_QUALITY) -> Tuple[int, str, Dict[str, float]]:
+    idx, paths, out_path = job
+    t0 = time.perf_counter()
     mats = [cv2.imread(p, cv2.IMREAD_COLOR) for p in paths]
     if any(m is None for m in mats):
         bad = [p for p, m in zip(paths, mats) if m is None]
         raise RuntimeError(f'以下文件无法读取：{bad}')
+    t1 = time.perf_counter()
 
     min_w = min(m.shape[1] for m in mats)
     mats = [cv2.resize(m, (min_w, int(m.shape[0]*min_w/m.shape[1])),
                        interpolation=cv2.INTER_AREA)
             if m.shape[1] != min_w else m
             for m in mats]
-    return cv2.vconcat(mats)
+    merged = cv2.vconcat(mats)
+    del mats
+    t2 = time.perf_counter()
+
+    ok, buf = cv2.imencode('.jpg', merged, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError(f'JPEG 编码失败：{out_path}')
+    t3 = time.perf_counter()
+
+    with open(out_path, 'wb') as f:
+        f.write(buf.tobytes())
+    t4 = time.perf_counter()
+
+    return idx, out_path, {'decode': t1 - t0, 'resize': t2 - t1, 'encode': t3 - t2, 'write': t4 - t3}
+
+# -------------------------------------------------- 执行任务 --------------------------------------------------
+
+def run_jobs(jobs: List[StitchJob], workers: Optional[int] = None, max_inflight: Optional[int] = None,
+             quality: int = JPEG_QUALITY, stats: Optional[StitchStats] = None) -> StitchStats:
+    """执行拼接任务；workers=1 时在当前进程串行执行"""
+    stats = stats or StitchStats()
+    t0 = time.perf_counter()
+
+    for idx, out_path, timings in ordered_map(partial(_stitch_one, quality=quality), jobs,
+                                              workers=workers, max_inflight=max_inflight, initializer=_init_worker):
+        stats.add(timings)
+        stats.done.append(idx)
+        print(f'✔  已保存 {out_path}')
+
+    stats.wall = time.perf_counter() - t0
+    return stats
+
+# -------------------------------------------------- 增量清单 --------------------------------------------------
+
+def manifest_path(out_dir: str = STITCHED_PATH) -> str:
+    return os.path.normpath(out_dir) + MANIFEST_SUFFIX
+
+
+def load_manifest(out_dir: str = STITCHED_PATH) -> Dict[str, Any]:
+    p = manifest_path(out_dir)
+    if not os.path.exists(p):
+        return {'outputs': {}}
+    with open(p, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: Dict[str, Any], out_dir: str = STITCHED_PATH):
+    p = manifest_path(out_dir)
+    tmp = p + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, p)      # 原子替换，中途崩溃不会留下半截清单
+
+
+def _file_hash(path: str, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while block := f.read(chunk):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _fingerprint(path: str, old: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """大小与 mtime 均未变时沿用旧哈希，否则重新计算"""
+    st = os.stat(path)
+    if old and old['path'] == path and old['size'] == st.st_size and old['mtime_ns'] == st.st_mtime_ns:
+        return old
+    return {'path': path, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha1': _file_hash(path)}
+
+
+def plan_incremental(jobs: List[StitchJob], manifest: Dict[str, Any], quality: int = JPEG_QUALITY,
+                     force: bool = False) -> Tuple[List[StitchJob], Dict[str, Dict[str, Any]], List[str]]:
+    """返回 (需重建的任务, 新清单条目, 孤立输出路径)；force=True 时全部重建，孤立输出照常按清单计算"""
+    old_outputs: Dict[str, Any] = manifest.get('outputs', {})
+    todo: List[StitchJob] = []
+    entries: Dict[str, Dict[str, Any]] = {}
+
+    for job in jobs:
+        _, paths, out_path = job
+        name = os.path.basename(out_path)
+        old = old_outputs.get(name)
+        old_srcs = old['sources'] if old and len(old['sources']) == len(paths) else [None] * len(paths)
+        srcs = [_fingerprint(p, o) for p, o in zip(paths, old_srcs)]
+        entries[name] = {'sources': srcs, 'quality': quality}
+
+        unchanged = (
+            not force
+            and old is not None
+            and old.get('quality') == quality
+            and [s['sha1'] for s in old['sources']] == [s['sha1'] for s in srcs]
+            and os.path.exists(out_path)
+        )
+        if not unchanged:
+            todo.append(job)
+
+    out_dir = os.path.dirname(jobs[0][2]) if jobs else ''
+    orphans = [os.path.join(out_dir, name) for name in old_outputs if name not in entries]
+    return todo, entries, orphans
+
+# -------------------------------------------------- 对外接口 --------------------------------------------------
+
+def stitch(root_dir: str = STUDENTS_PATH, out_dir: str = STITCHED_PATH, workers: Optional[int] = None,
+           quality: int = JPEG_QUALITY, force: bool = False) -> StitchStats:
+    """增量拼接；force=True 时跳过“未变化”判断全部重建（仍按磁盘上的清单清理已移除学生的输出）"""
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = build_jobs(collect_pages(root_dir), out_dir)
+
+    manifest = load_manifest(out_dir)
+    todo, entries, orphans = plan_incremental(jobs, manifest, quality, force)
+
+    for p in orphans:
+        if os.path.exists(p):
+            os.remove(p)
+            print(f'🗑  已删除孤立输出 {p}')
 
-# ========= 6. 主循环：依序输出 ==============================================
-for i in range(num_students):
-    img_paths = [pl[i] for pl in page_lists]          # 各页第 i 张
-    merged    = vconcat_resize(img_paths)
+    stats = StitchStats(skipped=len(jobs) - len(todo))
+    todo_names = {os.path.basename(j[2]) for j in todo}
+    try:
+        run_jobs(todo, workers=workers, quality=quality, stats=stats)
+    finally:
+        # 只把成功重建或本来就未变化的输出写入清单；失败的学生下次仍会重建
+        done_names = {os.path.basename(jobs[i][2]) for i in stats.done}
+        kept = {k: v for k, v in entries.items() if k not in todo_names or k in done_names}
+        save_manifest({'version': 1, 'outputs': kept}, out_dir)
+        reset_index()       # 输出已变化，学生索引下次使用时重新扫描
 
-    first_name = os.path.splitext(os.path.basename(page_lists[0][i]))[0]
-    out_name   = first_name if first_name.isdigit() else f'{i+1}'
-    out_path   = os.path.join(out_dir, f'{out_name}.jpg')
+    print(f'\n✅ 全部完成！输出目录：{os.path.abspath(out_dir)}')
+    print(stats.report())
+    return stats
 
-    cv2.imwrite(out_path, merged, [cv2.IMWRITE_JPEG_QUALITY, 95])
-    print(f'✔  已保存 {out_path}')
 
-print(f'\n✅ 全部完成！输出目录：{os.path.abspath(out_dir)}')
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='多页纵向拼接')
+    ap.add_argument('--workers', type=int, default=None, help='并行进程数（默认 CPU 核数）')
+    ap.add_argument('--force', action='store_true', help='全部重建（仍清理已移除学生的输出）')
+    ns = ap.parse_args()
+    stitch(workers=ns.workers, force=ns.force)
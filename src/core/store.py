@@ -0,0 +1,275 @@
+"""
+--+--store
+  +--成绩 / 批注存储（SQLite）
+===================================================================
+* `scores(stu, q, sub)` 与 `marks(stu, q, sub, seq)` 两张表，主键即索引：
+  “第 17 名学生的全部批注”“第 3 题整列分数”均为索引查找，无需整文件解析。
+* `meta` 表保存学生数 / 大题数 / 最大小题数，可还原为稠密分数张量。
+* 与 `result.json` 双向转换（`import_json` / `export_json`），旧流程与外部工具保持兼容。
+* 每次写入在 meta 中记下 `written_ns`；`needs_import` 仅当 result.json 晚于数据库最后一次写入时为真，
+  直接写入数据库的分数（如 omr）不会被较旧的 JSON 覆盖。
+* 曲线以 strokes.encode 的紧凑字符串保存；旧库 / 旧 JSON 中的点列表照常读取。
+
+依赖：sqlite3（标准库）、NumPy。
+===================================================================
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from path import CONFIGS_PATH
+from strokes import ENCODING, encode, to_array
+
+RESULT_DB = Path(CONFIGS_PATH, "result.db")
+
+Key = Tuple[int, int, int]
+Stroke = np.ndarray        # (N,2) int32
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scores (
+    stu        INTEGER NOT NULL,
+    q          INTEGER NOT NULL,
+    sub        INTEGER NOT NULL,
+    score      REAL    NOT NULL,
+    updated_at REAL    NOT NULL,
+    PRIMARY KEY (stu, q, sub)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS scores_by_q ON scores (q, sub, stu);
+CREATE TABLE IF NOT EXISTS marks (
+    stu INTEGER NOT NULL,
+    q   INTEGER NOT NULL,
+    sub INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    pts TEXT    NOT NULL,
+    PRIMARY KEY (stu, q, sub, seq)
+) WITHOUT ROWID;
+"""
+
+
+class ResultStore:
+    def __init__(self, path: str | Path = RESULT_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- 元数据 ---------- #
+    def shape(self) -> Tuple[int, int, int]:
+        meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+        return meta.get("total_students", 0), meta.get("total_questions", 0), meta.get("max_sub", 1)
+
+    # ---------- 写入 ---------- #
+    def save_state(self, scores: np.ndarray, marks: Dict[Key, List[Stroke]]):
+        """整体替换为给定的分数张量与批注（单事务）"""
+        now = time.time()
+        s, q, m = scores.shape
+        with self.conn:
+            self.conn.execute("DELETE FROM scores")
+            self.conn.execute("DELETE FROM marks")
+            self._touch()
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("total_students", s), ("total_questions", q), ("max_sub", m)],
+            )
+            self.conn.executemany(
+                "INSERT INTO scores (stu, q, sub, score, updated_at) VALUES (?, ?, ?, ?, ?)",
+                ((int(i), int(j), int(k), float(scores[i, j, k]), now) for i, j, k in np.ndindex(s, q, m)),
+            )
+            self.conn.executemany(
+                "INSERT INTO marks (stu, q, sub, seq, pts) VALUES (?, ?, ?, ?, ?)",
+                ((*k, seq, encode(stroke)) for k, strokes in marks.items() for seq, stroke in enumerate(strokes)),
+            )
+
+    def ensure_shape(self, total_students: int, total_questions: int, max_sub: int):
+        """把分数张量形状更新为给定值：空库直接写入；变大时扩展；变小时删除越界的分数 / 批注并警告"""
+        new = (total_students, total_questions, max_sub)
+        old = self.shape()
+        if self._has_shape() and new == old:
+            return
+        with self.conn:
+            if any(n < o for n, o in zip(new, old)):
+                where = "stu >= ? OR q >= ? OR sub >= ?"
+                dropped = self.conn.execute(f"DELETE FROM scores WHERE {where}", new).rowcount
+                dropped_marks = self.conn.execute(f"DELETE FROM marks WHERE {where}", new).rowcount
+                print(f"⚠ 成绩库形状由 {old} 缩小为 {new}，删除越界分数 {dropped} 条、批注 {dropped_marks} 条")
+            self._touch()
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("total_students", total_students), ("total_questions", total_questions), ("max_sub", max_sub)],
+            )
+
+    def _touch(self):
+        """在当前事务内记下写入时间（纳秒）"""
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('written_ns', ?)", (time.time_ns(),))
+
+    def _has_shape(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM meta WHERE key = 'total_students'").fetchone() is not None
+
+    def _check_key(self, key: Key, shape: Tuple[int, int, int]):
+        if not all(0 <= k < n for k, n in zip(key, shape)):
+            raise IndexError(f"分数下标 {tuple(key)} 超出成绩库形状 {shape}（先调用 ensure_shape）")
+
+    def set_scores(self, items: Iterable[Tuple[Key, float]]):
+        """批量写入分数（单事务）"""
+        now = time.time()
+        shape = self.shape()
+        rows = []
+        for key, score in items:
+            self._check_key(key, shape)
+            rows.append((*key, float(score), now))
+        with self.conn:
+            self._touch()
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO scores (stu, q, sub, score, updated_at) VALUES (?, ?, ?, ?, ?)", rows
+            )
+
+    def set_score(self, key: Key, score: float):
+        self._check_key(key, self.shape())
+        with self.conn:
+            self._touch()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO scores (stu, q, sub, score, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (*key, float(score), time.time()),
+            )
+
+    # ---------- 查询 ---------- #
+    def score_tensor(self) -> np.ndarray:
+        s, q, m = self.shape()
+        out = np.zeros((s, q, m), dtype=float)
+        rows = np.array(self.conn.execute("SELECT stu, q, sub, score FROM scores").fetchall(), dtype=float).reshape(-1, 4)
+        idx = rows[:, :3].astype(int)
+        out[idx[:, 0], idx[:, 1], idx[:, 2]] = rows[:, 3]
+        return out
+
+    def score_list(self) -> List[Any]:
+        """与 result.json['scores'] 相同的嵌套列表"""
+        return _plain(self.score_tensor())
+
+    def question_column(self, q: int) -> np.ndarray:
+        """第 q 题（0 起）全部学生的小题分，形状 (学生数, 最大小题数)"""
+        s, _, m = self.shape()
+        out = np.zeros((s, m), dtype=float)
+        for stu, sub, score in self.conn.execute("SELECT stu, sub, score FROM scores WHERE q = ?", (q,)):
+            out[stu, sub] = score
+        return out
+
+    def student_marks(self, stu: int) -> Dict[Tuple[int, int], List[Stroke]]:
+        """第 stu 名学生（0 起）的全部批注：(q, sub) -> 曲线列表"""
+        res: Dict[Tuple[int, int], List[Stroke]] = {}
+        for q, sub, pts in self.conn.execute(
+            "SELECT q, sub, pts FROM marks WHERE stu = ? ORDER BY q, sub, seq", (stu,)
+        ):
+            res.setdefault((q, sub), []).append(_decode_pts(pts))
+        return res
+
+    def iter_marks(self) -> Iterator[Tuple[Key, List[Stroke]]]:
+        """按 (stu, q, sub) 顺序遍历全部批注"""
+        cur_key, cur = None, []
+        for stu, q, sub, pts in self.conn.execute("SELECT stu, q, sub, pts FROM marks ORDER BY stu, q, sub, seq"):
+            if (stu, q, sub) != cur_key:
+                if cur_key is not None:
+                    yield cur_key, cur
+                cur_key, cur = (stu, q, sub), []
+            cur.append(_decode_pts(pts))
+        if cur_key is not None:
+            yield cur_key, cur
+
+    def marks_by_student(self) -> Dict[int, List[np.ndarray]]:
+        """一次遍历把全部批注按学生分组，每条曲线为 (N,1,2) int32 数组，可直接交给 cv2.polylines"""
+        res: Dict[int, List[np.ndarray]] = {}
+        for stu, pts in self.conn.execute("SELECT stu, pts FROM marks ORDER BY stu, q, sub, seq"):
+            arr = _decode_array(pts)
+            if len(arr) >= 2:
+                res.setdefault(stu, []).append(arr)
+        return res
+
+    # ---------- result.json 兼容 ---------- #
+    def last_write_ns(self) -> int:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'written_ns'").fetchone()
+        if row is not None:
+            return row[0]
+        # 旧库没有 written_ns：以分数的最后更新时间代替
+        latest = self.conn.execute("SELECT MAX(updated_at) FROM scores").fetchone()[0]
+        return int(latest * 1e9) if latest is not None else 0
+
+    def needs_import(self, path: str | Path) -> bool:
+        """result.json 是否比数据库最后一次写入更新（且不是已导入的那一版）"""
+        mtime = Path(path).stat().st_mtime_ns
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'source_mtime_ns'").fetchone()
+        if row is not None and row[0] == mtime:
+            return False
+        return mtime > self.last_write_ns()
+
+    def import_json(self, path: str | Path):
+        path = Path(path)
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        if not isinstance(raw.get("scores"), list):
+            raise ValueError("当前版本仅支持批改流程导出的矩阵格式 result.json！")
+        mat = raw["scores"]
+        s = len(mat)
+        q = raw.get("total_questions", max((len(r) for r in mat), default=0))
+        m = max((len(subs) for r in mat for subs in r if isinstance(subs, list)), default=1)
+        scores = np.zeros((s, q, m), dtype=float)
+        for i, row in enumerate(mat):
+            for j, subs in enumerate(row[:q]):
+                if isinstance(subs, list):
+                    scores[i, j, :len(subs)] = subs
+        marks: Dict[Key, List[Stroke]] = {}
+        for key, strokes in raw.get("marks", {}).items():
+            try:
+                k = tuple(map(int, key.split("|")))
+            except ValueError:
+                continue
+            marks[k] = [to_array(stroke) for stroke in strokes]  # type: ignore[index]
+        self.save_state(scores, marks)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('source_mtime_ns', ?)", (path.stat().st_mtime_ns,)
+            )
+
+    def export_json(self, path: str | Path):
+        s, q, _ = self.shape()
+        result = {
+            "total_students": s,
+            "total_questions": q,
+            "scores": self.score_list(),
+            "marks": {"|".join(map(str, k)): [encode(st) for st in v] for k, v in self.iter_marks()},
+            "mark_encoding": ENCODING,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+def _plain(t: np.ndarray) -> List[Any]:
+    """整数分数仍输出为 int，与批改流程写出的 result.json 一致"""
+    return t.astype(int).tolist() if np.all(t == np.round(t)) else t.tolist()
+
+
+def _decode_pts(pts: str) -> Stroke:
+    """pts 列：新库为 base64 差分，旧库为 JSON 点列表"""
+    return to_array(json.loads(pts) if pts.startswith("[") else pts)
+
+
+def _decode_array(pts: str) -> np.ndarray:
+    return _decode_pts(pts).astype(np.int32).reshape((-1, 1, 2))
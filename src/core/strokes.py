@@ -0,0 +1,96 @@
+"""
+--+--strokes
+  +--手写曲线：化简 + 紧凑编码
+===================================================================
+* `simplify()`：曲线结束时做 Ramer–Douglas–Peucker 化简，结果为 (N,2) int32 数组。
+* `encode()` / `decode()`：`v2:` 前缀 + base64（首点绝对坐标 int32 + 后续差分 int16，均为小端），
+  在 JSON / SQLite 中以短字符串保存；一个勾通常从数百个 `[x, y]` 缩到几十字节。
+  拼接后的长卷坐标可超过 32767：首点用 int32 保存，超出 int16 的差分在线段上插入共线点拆开，绘制结果不变。
+* `to_array()`：同时兼容旧格式（`[[x, y], ...]` 列表、无前缀的全 int16 差分字符串）与新格式。
+
+依赖：NumPy。
+===================================================================
+"""
+from __future__ import annotations
+
+import base64
+from typing import Any, Sequence
+
+import numpy as np
+
+ENCODING = "delta-int16-base64-v2"  # 写入 result.json 的 mark_encoding 字段
+_PREFIX = "v2:"
+_STEP = np.iinfo(np.int16).max
+
+
+def simplify(pts: Sequence[Sequence[int]] | np.ndarray, tol: float = 1.0) -> np.ndarray:
+    """RDP 化简（迭代实现，每段的点到弦距离向量化计算）"""
+    p = np.asarray(pts, dtype=np.float64).reshape(-1, 2)
+    n = len(p)
+    if n < 3 or tol <= 0:
+        return p.astype(np.int32)
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j <= i + 1:
+            continue
+        a, seg = p[i], p[i + 1:j]
+        dx, dy = p[j] - a
+        length = np.hypot(dx, dy)
+        if length == 0:
+            dist = np.hypot(seg[:, 0] - a[0], seg[:, 1] - a[1])
+        else:
+            dist = np.abs(dx * (seg[:, 1] - a[1]) - dy * (seg[:, 0] - a[0])) / length
+        k = int(np.argmax(dist))
+        if dist[k] > tol:
+            m = i + 1 + k
+            keep[m] = True
+            stack.append((i, m))
+            stack.append((m, j))
+    return p[keep].astype(np.int32)
+
+
+def _split_deltas(d: np.ndarray) -> np.ndarray:
+    """把超出 int16 的差分拆成若干段（等价于在线段上插入共线点）"""
+    parts = np.maximum(-(-np.abs(d).max(axis=1) // _STEP), 1)
+    if np.all(parts == 1):
+        return d
+    out = []
+    for delta, k in zip(d, parts):
+        steps = np.round(np.arange(1, k + 1)[:, None] * delta / k).astype(np.int64)
+        out.append(np.diff(steps, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)))
+    return np.concatenate(out)
+
+
+def encode(stroke: Sequence[Sequence[int]] | np.ndarray) -> str:
+    a = np.asarray(stroke, dtype=np.int64).reshape(-1, 2)
+    if len(a) == 0:
+        return _PREFIX
+    if np.abs(a[0]).max() > np.iinfo(np.int32).max:
+        raise ValueError(f"曲线坐标超出 int32 范围：{a[0].tolist()}")
+    d = _split_deltas(np.diff(a, axis=0))
+    raw = a[0].astype("<i4").tobytes() + d.astype("<i2").tobytes()
+    return _PREFIX + base64.b64encode(raw).decode("ascii")
+
+
+def decode(s: str) -> np.ndarray:
+    if not s.startswith(_PREFIX):
+        # 旧格式：首点与差分均为 int16
+        d = np.frombuffer(base64.b64decode(s), dtype="<i2").reshape(-1, 2).astype(np.int32)
+        return np.cumsum(d, axis=0, dtype=np.int32)
+    raw = base64.b64decode(s[len(_PREFIX):])
+    if not raw:
+        return np.zeros((0, 2), dtype=np.int32)
+    first = np.frombuffer(raw[:8], dtype="<i4").reshape(1, 2)
+    d = np.frombuffer(raw[8:], dtype="<i2").reshape(-1, 2)
+    return np.cumsum(np.concatenate([first, d]), axis=0, dtype=np.int64).astype(np.int32)
+
+
+def to_array(obj: Any) -> np.ndarray:
+    """新格式 / 旧格式字符串或点列表 → (N,2) int32 数组"""
+    if isinstance(obj, str):
+        return decode(obj)
+    return np.asarray(obj, dtype=np.int32).reshape(-1, 2)
@@ -0,0 +1,151 @@
+"""
+--+--telemetry
+  +--批改会话计时（环形缓冲 → 指标文件）
+===================================================================
+* `Teacher(metrics=True)` 时启用，在以下位置打点（未启用时各处只多一次 None 判断）：
+    load         —— _crop：取切片（缓存命中 / 解码整卷）耗时
+    first_frame  —— _grade_item：进入一份到首帧显示完毕
+    render       —— _show / _mouse_cb：整帧重建（换题、缩放、撤销、落笔、网格选格）的处理耗时（含 imshow）
+    stroke       —— _mouse_cb：拖动 / 抬笔时曲线的增量补画耗时（含 imshow），与整帧重建分开统计
+    think        —— _read_score：首帧显示后到分数确认，即阅卷人思考 + 输入时间
+* 事件先写入预分配的 NumPy 环形缓冲，满 CAPACITY 条或会话结束时一次追加到
+  `data/configs/metrics/{阅卷人}.jsonl`；每个会话先写一行 session 头。
+* `summarize()`（`main.py stats`）：按题 / 小题汇总各指标 p50 / p90 / p99，并统计每位阅卷人的吞吐量。
+
+行格式：
+    {"ev":"session","t":1700000000.0,"grader":"default"}
+    {"ev":"think","t":1700000001.2,"key":[stu,q,sub],"ms":5321.0}
+
+依赖：NumPy。
+===================================================================
+"""
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from path import CONFIGS_PATH
+
+METRICS_DIR = Path(CONFIGS_PATH, "metrics")
+EVENTS = ("load", "first_frame", "render", "stroke", "think")
+CAPACITY = 4096
+PERCENTILES = (50, 90, 99)
+
+_EV_CODE = {name: i for i, name in enumerate(EVENTS)}
+
+
+class Telemetry:
+    """单个批改会话的打点器；record 只写数组，不做 I/O"""
+
+    def __init__(self, grader: Optional[str] = None, out_dir: str | Path = METRICS_DIR, capacity: int = CAPACITY):
+        self.grader = grader or "default"
+        self.path = Path(out_dir) / f"{self.grader}.jsonl"
+        self._t = np.zeros(capacity, dtype=np.float64)
+        self._ev = np.zeros(capacity, dtype=np.uint8)
+        self._key = np.zeros((capacity, 3), dtype=np.int32)
+        self._ms = np.zeros(capacity, dtype=np.float32)
+        self._n = 0
+        self._header = True
+
+    def record(self, ev: str, key: Tuple[int, int, int], seconds: float):
+        i = self._n
+        self._t[i] = time.time()
+        self._ev[i] = _EV_CODE[ev]
+        self._key[i] = key
+        self._ms[i] = seconds * 1000
+        self._n = i + 1
+        if self._n == len(self._t):
+            self.flush()
+
+    def flush(self):
+        lines = []
+        if self._header:
+            lines.append(json.dumps({"ev": "session", "t": round(time.time(), 3), "grader": self.grader},
+                                    ensure_ascii=False, separators=(",", ":")))
+            self._header = False
+        for i in range(self._n):
+            lines.append(json.dumps({"ev": EVENTS[self._ev[i]], "t": round(float(self._t[i]), 3),
+                                     "key": self._key[i].tolist(), "ms": round(float(self._ms[i]), 2)},
+                                    separators=(",", ":")))
+        self._n = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+# -------------------------------------------------- 汇总 --------------------------------------------------
+
+def _load(metrics_dir: Path) -> Dict[str, Dict[str, np.ndarray]]:
+    """阅卷人 -> {ev, key, ms, t} 列数组"""
+    res = {}
+    for p in sorted(metrics_dir.glob("*.jsonl")):
+        ev: List[int] = []
+        keys: List[List[int]] = []
+        ms: List[float] = []
+        ts: List[float] = []
+        with open(p, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue            # 崩溃时写了一半的末行
+                code = _EV_CODE.get(row.get("ev"))
+                if code is None:
+                    continue
+                ev.append(code)
+                keys.append(row["key"])
+                ms.append(row["ms"])
+                ts.append(row["t"])
+        if ev:
+            res[p.stem] = {"ev": np.array(ev), "key": np.array(keys).reshape(-1, 3),
+                           "ms": np.array(ms), "t": np.array(ts)}
+    return res
+
+
+def summarize(metrics_dir: str | Path = METRICS_DIR) -> Dict[str, Dict]:
+    """按题汇总各指标分位数（毫秒）与阅卷人吞吐量，并打印表格"""
+    data = _load(Path(metrics_dir))
+    if not data:
+        print(f"⚠ 没有指标数据：{metrics_dir}（以 teacher --metrics 批改后再查看）")
+        return {}
+
+    ev = np.concatenate([d["ev"] for d in data.values()])
+    key = np.concatenate([d["key"] for d in data.values()])
+    ms = np.concatenate([d["ms"] for d in data.values()])
+
+    # ---- 按 (题, 小题) ----
+    items: Dict[str, Dict] = {}
+    for q, sub in sorted({(int(a), int(b)) for a, b in key[:, 1:]}):
+        sel = (key[:, 1] == q) & (key[:, 2] == sub)
+        row = {}
+        for name, code in _EV_CODE.items():
+            v = ms[sel & (ev == code)]
+            if len(v):
+                row[name] = {"n": int(len(v)), **{f"p{p}": float(x) for p, x in zip(PERCENTILES, np.percentile(v, PERCENTILES))}}
+        items[f"{q + 1}.{sub + 1}"] = row
+
+    # ---- 阅卷人吞吐：份数 / 活跃时间（首帧 + 思考） ----
+    graders: Dict[str, Dict] = {}
+    for name, d in data.items():
+        think = d["ms"][d["ev"] == _EV_CODE["think"]]
+        active = (think.sum() + d["ms"][d["ev"] == _EV_CODE["first_frame"]].sum()) / 1000
+        graders[name] = {"items": int(len(think)), "active_min": round(float(active) / 60, 2),
+                         "per_min": round(len(think) / (active / 60), 2) if active > 0 else 0.0}
+
+    # ---- 打印 ----
+    cols = [("load", 50), ("load", 99), ("first_frame", 50), ("first_frame", 99), ("render", 50), ("render", 99), ("stroke", 99), ("think", 50), ("think", 90)]
+    print(f"{'小题':<8}" + "".join(f"{f'{e} p{p}':>16}" for e, p in cols) + f"{'份数':>8}")
+    for name, row in items.items():
+        cells = "".join(f"{row[e][f'p{p}']:>14.1f}ms" if e in row else f"{'-':>16}" for e, p in cols)
+        print(f"{name:<8}{cells}{row.get('think', {}).get('n', 0):>8}")
+    print()
+    for name, g in graders.items():
+        print(f"阅卷人 {name}：{g['items']} 份，活跃 {g['active_min']} 分钟，{g['per_min']} 份/分钟")
+    return {"items": items, "graders": graders}
+
+
+if __name__ == "__main__":
+    summarize()
@@ -8,18 +8,27 @@ QuickGrade 主入口（src/main.py）
 如果不带参数，默认直接启动批改界面（teacher）。
 
 可用子命令：
-  stitch   —— 将正/反面等『页』文件夹纵向拼接成 stitched/ 学生整卷
+  stitch   —— 将正/反面等『页』文件夹纵向拼接成 stitched/ 学生整卷（增量，--force 全部重建）
+  align    —— 以划区模板为基准计算每张整卷的对齐变换（ORB + RANSAC，并行、增量），写入 data/configs/align.json
   define   —— 交互式划分大题 / 小题区域并生成 data/configs/default.json
-  teacher  —— 启动批改 UI（核心改卷程序）
+  identify —— OCR 识别考号区域（并行、批量），写入 data/configs/student_ids.json
+  slice    —— 按 default.json 把每名学生各小题切片，按题存入 data/sliced/
+  omr      —— 识别涂卡区（选择题）并自动判分，可疑卷面留待 teacher 复核
+  cluster  —— 按小题对答案聚类（空白检测 + 相似答案归簇），写入 data/configs/clusters.json
+  teacher  —— 启动批改 UI（核心改卷程序，自动从批改日志断点续批；--grader 姓名 进入多人分题模式）
+  stats    —— 汇总 teacher --metrics 记录的取图 / 首帧 / 重绘 / 思考时间（按小题分位数）与阅卷人吞吐量
+  merge    —— 合并多人分题的各阅卷人日志为 result.json，冲突写入 data/configs/merge_conflicts.json
+  compact  —— 由批改日志生成 result.json（批改中途也可导出）
   export   —— 读取 result.json 导出成绩表（Excel）
   mark     —— 把总分 / 小题分与批注写回图片，输出到 data/save/
-  all      —— 按顺序依次执行 stitch → teacher → export → mark
+  pdf      —— 批注后的整卷合并为 PDF（有 classes.json 时每班一个），输出到 data/save/
+  all      —— 按顺序依次执行 stitch → align → slice → omr → teacher → export → mark
+  batch    —— 对 --root 下的多个工作区（每场考试 / 每个班级一个）并发执行非交互阶段，已完成的阶段自动跳过
 
 依赖：见 core/path.py 中的技术栈说明。
 """
 
 import argparse
-import runpy
 import sys
 from pathlib import Path
 
@@ -30,45 +39,123 @@ CUR_DIR = Path(__file__).resolve().parent
 if str(CUR_DIR) not in sys.path:
     sys.path.insert(0, str(CUR_DIR))
 
-# ------------------------ 核心对象 / 函数 -------------------------
-from core import Redistricting, StudentProcessing, Teacher  # type: ignore
-from core.output import export_excel, save_all_marked_images  # type: ignore
-
 # ------------------------ 子命令实现 -----------------------------
+# 核心模块在各子命令函数内按需导入：stitch 不加载 pandas，export 不加载批改 / 划区界面，
+# 启动开销只取决于所执行的子命令（bench/startup.py 按 STARTUP_BUDGET 测量）。
+
+def _cmd_stitch(args: argparse.Namespace) -> None:
+    """并行拼接各页，生成 stitched/ 下的整卷图片"""
+    from core.stitched import stitch  # type: ignore
+    stitch(workers=args.workers, force=args.force)
+
 
-def _cmd_stitch() -> None:
-    """运行 core.stitched 脚本，生成 stitched/ 下的整卷图片"""
-    runpy.run_module("core.stitched", run_name="__main__")
+def _cmd_align(args: argparse.Namespace) -> None:
+    """并行计算各整卷到模板的对齐变换，切片时按变换取区域"""
+    from core.align import align  # type: ignore
+    align(model=args.model, workers=args.workers, force=args.force)
 
 
-def _cmd_define() -> None:
+def _cmd_define(args: argparse.Namespace) -> None:
     """交互式划分题目区域并保存为 default.json"""
+    from core.input import Redistricting, StudentProcessing  # type: ignore
     red = Redistricting()          # 自动在 stitched/ 中找首张图
     questions = red.run()          # 手动框选大/小题
-    StudentProcessing(questions, config_name="default.json").save()
+    StudentProcessing(questions, config_name="default.json", id_region=red.id_region).save()
+
+
+def _cmd_identify(args: argparse.Namespace) -> None:
+    """OCR 识别考号，成绩表 / 批注图 / 批改界面按考号标注学生"""
+    from core.identify import identify  # type: ignore
+    identify(workers=args.workers)
+
 
+def _cmd_slice(args: argparse.Namespace) -> None:
+    """按题切片，批改 / 导出只读取对应题目的字节"""
+    from core.sliced import slice_all  # type: ignore
+    slice_all()
 
-def _cmd_teacher() -> None:
+
+def _cmd_omr(args: argparse.Namespace) -> None:
+    """涂卡区自动识别判分"""
+    from core.omr import recognize_all  # type: ignore
+    recognize_all()
+
+
+def _cmd_cluster(args: argparse.Namespace) -> None:
+    """对每个小题的答案聚类，相同答案只需批一次"""
+    from core.cluster import build_clusters  # type: ignore
+    build_clusters()
+
+
+def _cmd_teacher(args: argparse.Namespace) -> None:
     """启动核心批改 UI（手打 / 判分）"""
-    Teacher().run()
+    from core.process import Teacher  # type: ignore
+    Teacher(grid=args.grid, cluster=args.cluster, grader=args.grader, claim=args.claim,
+            metrics=args.metrics).run()
+
 
+def _cmd_stats(args: argparse.Namespace) -> None:
+    """批改会话计时汇总"""
+    from core.telemetry import summarize  # type: ignore
+    summarize()
 
-def _cmd_export() -> None:
+
+def _cmd_merge(args: argparse.Namespace) -> None:
+    """合并各阅卷人的分题批改结果"""
+    from core.partition import merge  # type: ignore
+    merge()
+
+
+def _cmd_compact(args: argparse.Namespace) -> None:
+    """把批改日志压缩为 result.json"""
+    from core.journal import ResultJournal  # type: ignore
+    print("✔ 已由批改日志生成 →", ResultJournal().compact())
+
+
+def _cmd_export(args: argparse.Namespace) -> None:
     """将 result.json 中的成绩导出为 Excel"""
+    from core.output import export_excel  # type: ignore
     export_excel()
 
 
-def _cmd_mark() -> None:
+def _cmd_mark(args: argparse.Namespace) -> None:
     """在原卷上写入分数 / 批注，输出到 data/save/"""
-    save_all_marked_images()
+    from core.output import ExportOptions, save_all_marked_images  # type: ignore
+    save_all_marked_images(ExportOptions(
+        fmt=args.format,
+        jpeg_quality=args.quality,
+        webp_quality=args.quality,
+        png_compression=args.png_compression,
+        regions_only=args.regions_only,
+        workers=args.workers,
+    ))
+
 
+def _cmd_pdf(args: argparse.Namespace) -> None:
+    """批注后的整卷流式合并为 PDF"""
+    from core.output import export_pdf  # type: ignore
+    export_pdf(quality=args.quality, workers=args.workers)
 
-def _cmd_all() -> None:
-    """全流程：拼接 → 批改 → 导表 → 批注写图"""
-    _cmd_stitch()
-    _cmd_teacher()
-    _cmd_export()
-    _cmd_mark()
+
+def _cmd_all(args: argparse.Namespace) -> None:
+    """全流程：拼接 → 对齐 → 切片 → 涂卡识别 → 批改 → 导表 → 批注写图"""
+    _cmd_stitch(args)
+    _cmd_align(args)
+    _cmd_slice(args)
+    _cmd_omr(args)
+    _cmd_teacher(args)
+    _cmd_export(args)
+    _cmd_mark(args)
+
+
+def _cmd_batch(args: argparse.Namespace) -> None:
+    """多工作区批量：stitch → align → slice → omr → export → mark，--workers 为全局进程预算"""
+    from core.batch import discover, run_batch  # type: ignore
+    workspaces = discover(args.root)
+    if not workspaces:
+        print(f"⚠ {args.root} 下没有工作区（含 students/ 的目录）")
+        return
+    run_batch(workspaces, budget=args.workers, force=args.force)
 
 # ------------------------ CLI 入口 -------------------------------
 
@@ -81,21 +168,103 @@ def main() -> None:
         "command",
         nargs="?",
         default="teacher",
-        choices=["stitch", "define", "teacher", "export", "mark", "all"],
+        choices=["stitch", "align", "define", "identify", "slice", "omr", "cluster", "teacher", "stats", "merge", "compact", "export", "mark", "pdf", "all", "batch"],
         help="要执行的操作 (默认: teacher)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="stitch / align / identify / mark / pdf 并行进程数；batch 为全部工作区共享的进程上限 (默认: CPU 核数)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="stitch / align 忽略增量缓存，全部重算；batch 忽略已记录的阶段状态",
+    )
+    parser.add_argument(
+        "--model",
+        choices=["affine", "homography"],
+        default="affine",
+        help="align 变换模型 (默认: affine)",
+    )
+    parser.add_argument(
+        "--grid",
+        type=int,
+        default=0,
+        help="teacher 网格批改：同一小题每屏平铺 N 名学生 (默认: 逐份批改)",
+    )
+    parser.add_argument(
+        "--cluster",
+        action="store_true",
+        help="teacher 按 clusters.json 每簇只批代表一份 (需先运行 cluster)",
+    )
+    parser.add_argument(
+        "--grader",
+        default=None,
+        help="teacher 多人分题：阅卷人姓名，从 data/configs/partition.db 认领小题 (默认: 单人批改全部)",
+    )
+    parser.add_argument(
+        "--claim",
+        choices=["sub", "question"],
+        default="sub",
+        help="多人分题每次认领一个小题或一整道大题 (默认: sub)",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="teacher 记录批改计时到 data/configs/metrics/，用 stats 查看",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["jpg", "png", "webp"],
+        default=None,
+        help="mark 输出格式 (默认: 沿用原图格式)",
+    )
+    parser.add_argument(
+        "--quality",
+        type=int,
+        default=95,
+        help="mark / pdf 的 JPEG / WebP 质量 0-100 (默认: 95)",
+    )
+    parser.add_argument(
+        "--png-compression",
+        type=int,
+        default=3,
+        help="mark 的 PNG 压缩级别 0-9 (默认: 3)",
+    )
+    parser.add_argument(
+        "--regions-only",
+        action="store_true",
+        help="mark 只输出带手工批注的大题区块",
+    )
+    parser.add_argument(
+        "--root",
+        default=".",
+        help="batch 工作区所在目录，其下每个含 students/ 的子目录为一个工作区 (默认: 当前目录)",
+    )
     args = parser.parse_args()
 
     dispatch = {
         "stitch": _cmd_stitch,
+        "align": _cmd_align,
         "define": _cmd_define,
+        "identify": _cmd_identify,
+        "slice": _cmd_slice,
+        "omr": _cmd_omr,
+        "cluster": _cmd_cluster,
         "teacher": _cmd_teacher,
+        "stats": _cmd_stats,
+        "merge": _cmd_merge,
+        "compact": _cmd_compact,
         "export": _cmd_export,
         "mark": _cmd_mark,
+        "pdf": _cmd_pdf,
         "all": _cmd_all,
+        "batch": _cmd_batch,
     }
 
-    dispatch[args.command]()
+    dispatch[args.command](args)
 
 
 if __name__ == "__main__":